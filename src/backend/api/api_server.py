@@ -16,37 +16,58 @@ app = FastAPI()
 from backend.api.preset_api import preset_router
 app.include_router(preset_router)
 
-from backend.utils.config import load_config
+from backend.utils.app_context import get_app_context, CONFIG_PATH
 
-CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../config.yaml'))
-# Load config
-config = load_config(CONFIG_PATH)
-
-# Create the global MidiHandler instance for the API
-from backend.midi.midi_handler import MidiHandler
-midi_handler = MidiHandler(
-    input_port_name=config['midi']['input_port'],
-    output_port_name=config['midi']['output_port']
-)
-
-# Import and include the layer status API
-from backend.api.layer_status import layer_status_router, set_midi_handler_for_status
-set_midi_handler_for_status(midi_handler)
+# Import and include the layer status API (uses the context's MidiHandler, built on demand)
+from backend.api.layer_status import layer_status_router
 app.include_router(layer_status_router)
 
+# Bridge latency metrics (JSON and Prometheus text), next to /api/layer-status
+from backend.api.metrics_api import metrics_router
+app.include_router(metrics_router)
+
+# Per-message trace ring buffer (replaces the old print/INFO logging)
+from backend.api.trace_api import trace_router
+app.include_router(trace_router)
+
+# Session capture for replay with backend/tools/replay.py
+from backend.api.capture_api import capture_router
+app.include_router(capture_router)
+
+def _invalidate_osc_mapping():
+    # Only an already running XctlOSC holds a compiled index; never build one here
+    osc = get_app_context().osc_if_built
+    if osc is not None:
+        osc.invalidate_mapping()
+
+@app.get("/api/bridge")
+async def bridge_status():
+    """State of the MIDI <-> OSC bridge service."""
+    return get_app_context().bridge.status()
+
+@app.post("/api/bridge/{action}")
+async def bridge_control(action: str):
+    """Start, stop or restart the bridge (restart re-reads config.yaml)."""
+    bridge = get_app_context().bridge
+    if action == 'start':
+        return await bridge.start()
+    if action == 'stop':
+        return await bridge.stop()
+    if action == 'restart':
+        return await bridge.restart()
+    return {"status": "error", "message": f"Unknown bridge action: {action}"}
+
+@app.get("/api/startup")
+async def startup_timing():
+    """Startup milestones (ms) and the time to the first accepted WebSocket vs. its target."""
+    return get_app_context().startup_report()
+
 from fastapi.responses import FileResponse
 from fastapi import Request, Body
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import yaml
 import mido
-from backend.utils.config import load_config
-from backend.midi.midi_handler import MidiHandler
-
-CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../config.yaml'))
-
-# Load config
-config = load_config(CONFIG_PATH)
 
 # Allow CORS for frontend requests
 app.add_middleware(
@@ -79,6 +100,7 @@ async def set_active_mapping(mapping: dict = Body(...), path: str = None):
     try:
         with open(mapping_path, 'w', encoding='utf-8') as f:
             json.dump(mapping, f, indent=2)
+        _invalidate_osc_mapping()
         return {"status": "ok", "message": f"Mapping updated at {mapping_path}"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -100,6 +122,7 @@ async def load_mapping(data: dict = Body(...)):
         active_mapping_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../mapping/active_mapping.json'))
         with open(active_mapping_path, 'w', encoding='utf-8') as f:
             json.dump(mapping, f, indent=2)
+        _invalidate_osc_mapping()
         return {"status": "ok", "message": f"Loaded mapping from {src_path} and set as active mapping."}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -107,7 +130,7 @@ async def load_mapping(data: dict = Body(...)):
 @app.get("/api/midi-settings")
 async def midi_settings():
     """Return the currently selected MIDI input/output ports."""
-    midi_cfg = config.get('midi', {})
+    midi_cfg = get_app_context().config.get('midi', {})
     return {
         "input": midi_cfg.get('input_port', ''),
         "output": midi_cfg.get('output_port', '')
@@ -124,9 +147,64 @@ async def set_midi_settings(data: dict = Body(...)):
     config_yaml['midi']['output_port'] = output_port
     with open(CONFIG_PATH, 'w') as f:
         yaml.safe_dump(config_yaml, f)
-    # Optionally, re-initialize MIDI handler here if needed
+    get_app_context().reload_config()
+    # POST /api/bridge/restart applies the new ports
     return {"status": "ok", "input": input_port, "output": output_port}
 
+@app.get("/api/midi-surfaces")
+async def midi_surfaces():
+    """Configured X-Touch units in strip order, with their state while the bridge runs."""
+    midi = get_app_context().midi_if_built
+    if midi is not None:
+        return midi.surfaces.status()
+    return get_app_context().config.get('midi', {}).get('surfaces') or []
+
+@app.post("/api/midi-surfaces")
+async def set_midi_surfaces(data: list = Body(...)):
+    """
+    Set and persist the units ([{"name", "input_port", "output_port", "strips"}, ...],
+    strips numbered across them in this order); [] = only midi.input_port/output_port.
+    """
+    surfaces = [
+        {k: v for k, v in s.items() if k in ('name', 'input_port', 'output_port', 'strips')}
+        for s in data if isinstance(s, dict)
+    ]
+    config_yaml = yaml.safe_load(open(CONFIG_PATH, 'r'))
+    config_yaml.setdefault('midi', {})['surfaces'] = surfaces
+    with open(CONFIG_PATH, 'w') as f:
+        yaml.safe_dump(config_yaml, f)
+    get_app_context().reload_config()
+    # POST /api/bridge/restart applies the new units
+    return {"status": "ok", "surfaces": surfaces}
+
+@app.get("/api/osc-targets")
+async def osc_targets():
+    """Configured OSC output targets with their send counters."""
+    osc = get_app_context().osc_if_built
+    if osc is not None:
+        return osc.target_stats()
+    from backend.osc.osc_server import parse_output_targets
+    targets = parse_output_targets(get_app_context().config.get('osc', {}))
+    return {name: {"ip": ip, "port": port} for name, (ip, port) in targets.items()}
+
+@app.post("/api/osc-targets")
+async def set_osc_targets(data: dict = Body(...)):
+    """
+    Replace the named OSC targets ({name: {"ip": ..., "port": ...}}); the
+    default target stays osc.output_ip/output_port. Applied live when the
+    bridge runs, and persisted to config.yaml.
+    """
+    osc = get_app_context().osc_if_built
+    if osc is not None:
+        osc.update_settings({'osc_targets': data})
+    else:
+        config_yaml = yaml.safe_load(open(CONFIG_PATH, 'r'))
+        config_yaml.setdefault('osc', {})['targets'] = {k: v for k, v in data.items() if k != 'default'}
+        with open(CONFIG_PATH, 'w') as f:
+            yaml.safe_dump(config_yaml, f)
+    get_app_context().reload_config()
+    return {"status": "ok", "targets": await osc_targets()}
+
 @app.get("/")
 async def root():
     return FileResponse(os.path.join(frontend_dir, "index.html"))
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Body, HTTPException
+import asyncio
+import os
+from backend.utils.app_context import get_app_context
+from backend.utils.capture import capture, CAPTURE_EXT
+
+capture_router = APIRouter()
+
+
+@capture_router.get("/api/capture")
+async def capture_status():
+    """Current capture state and the capture files on disk."""
+    directory = get_app_context().capture_dir
+    files = sorted(f for f in os.listdir(directory) if f.endswith(CAPTURE_EXT)) if os.path.isdir(directory) else []
+    return {**capture.status(), "directory": directory, "files": files}
+
+
+@capture_router.post("/api/capture/start")
+async def start_capture(data: dict = Body(default={})):
+    """Start recording all MIDI/OSC traffic; optional {"name": "..."} for the file name."""
+    try:
+        return await asyncio.to_thread(get_app_context().start_capture, data.get("name"))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@capture_router.post("/api/capture/stop")
+async def stop_capture():
+    # Joins the writer thread after its last flush
+    return await asyncio.to_thread(capture.stop)
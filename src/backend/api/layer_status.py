@@ -1,7 +1,8 @@
 from fastapi import APIRouter
+from backend.utils.app_context import get_app_context
 
 layer_status_router = APIRouter()
-_midi_handler = None
+_midi_handler = None  # explicit override (tests/tools); defaults to the app context's handler
 
 def set_midi_handler_for_status(handler):
     global _midi_handler
@@ -9,7 +10,8 @@ def set_midi_handler_for_status(handler):
 
 @layer_status_router.get("/api/layer-status")
 async def layer_status():
-    if _midi_handler is None:
+    # Never builds a MidiHandler: None until the bridge has opened MIDI
+    handler = _midi_handler or get_app_context().midi_if_built
+    if handler is None:
         return {"error": "MidiHandler not initialized"}
-    return _midi_handler.get_layer_status()
-
+    return handler.get_layer_status()
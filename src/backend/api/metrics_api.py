@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from backend.utils.app_context import get_app_context
+from backend.utils.metrics import metrics
+
+metrics_router = APIRouter()
+
+
+def _queue_depths():
+    # Read straight from the running handlers; never builds one
+    ctx = get_app_context()
+    depths = {}
+    midi = ctx.midi_if_built
+    if midi is not None:
+        depths.update(midi.surfaces.queue_depths())
+    osc = ctx.osc_if_built
+    if osc is not None:
+        depths['osc_out'] = {name: sender.queue_depth() for name, sender in list(osc.senders.items())}
+    if ctx.ws_hub is not None:
+        depths['ws_out'] = {str(i): n for i, n in enumerate(ctx.ws_hub.queue_depths())}
+    return depths
+
+
+@metrics_router.get("/api/metrics")
+async def get_metrics(format: str = "json"):
+    """
+    Bridge latency histograms, per-address OSC counters and queue depths.
+    ?format=prometheus returns the Prometheus text format. Recording starts with
+    the first scrape and stops after metrics.idle_timeout_s without one.
+    """
+    metrics.touch()
+    if format == "prometheus":
+        return PlainTextResponse(metrics.prometheus(_queue_depths()), media_type="text/plain; version=0.0.4")
+    return metrics.snapshot(_queue_depths())
+
+
+@metrics_router.post("/api/metrics/reset")
+async def reset_metrics():
+    metrics.reset()
+    return {"status": "reset"}
@@ -1,59 +1,65 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import Response
+import asyncio
 import os
-import json
 from backend.utils.user_data import get_user_data_dir
+from backend.utils.preset_store import PresetStore, PresetNotFound
 
 preset_router = APIRouter()
 
 PRESETS_DIR = get_user_data_dir()
 os.makedirs(PRESETS_DIR, exist_ok=True)
+# Atomic, cached preset persistence; disk I/O runs in worker threads, off the event loop
+preset_store = PresetStore(PRESETS_DIR)
 
 @preset_router.get("/api/presets")
-def list_presets():
+async def list_presets():
     # List all folders in PRESETS_DIR
-    return [f for f in os.listdir(PRESETS_DIR) if os.path.isdir(os.path.join(PRESETS_DIR, f))]
+    return await asyncio.to_thread(preset_store.list_presets)
 
 @preset_router.get("/api/presets/{name}")
-def get_preset(name: str):
-    preset_dir = os.path.join(PRESETS_DIR, name)
-    index_path = os.path.join(preset_dir, "layer_index.json")
-    if not os.path.exists(index_path):
+async def get_preset(name: str):
+    try:
+        # Single-file presets are served straight from their raw layer sections
+        body = await asyncio.to_thread(preset_store.get_packed_preset_json, name)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+        return await asyncio.to_thread(preset_store.get_preset, name)
+    except PresetNotFound:
         raise HTTPException(status_code=404, detail="Preset not found")
-    with open(index_path, "r", encoding="utf-8") as f:
-        layer_names = json.load(f)
-    layers = []
-    for i, lname in enumerate(layer_names):
-        layer_path = os.path.join(preset_dir, f"layer_{i+1}.json")
-        if not os.path.exists(layer_path):
-            raise HTTPException(status_code=500, detail=f"Missing layer file: layer_{i+1}.json")
-        with open(layer_path, "r", encoding="utf-8") as lf:
-            layer_data = json.load(lf)
-            layers.append(layer_data)
-    return {"layers": layers}
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @preset_router.post("/api/presets/{name}")
-def save_preset(name: str, preset: dict = Body(...)):
-    preset_dir = os.path.join(PRESETS_DIR, name)
-    os.makedirs(preset_dir, exist_ok=True)
+async def save_preset(name: str, preset: dict = Body(...)):
     layers = preset.get("layers", [])
-    # Save index
-    index_path = os.path.join(preset_dir, "layer_index.json")
-    layer_names = [layer.get("name", f"Layer {i+1}") for i, layer in enumerate(layers)]
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump(layer_names, f, indent=2)
-    # Save each layer
-    for i, layer in enumerate(layers):
-        layer_path = os.path.join(preset_dir, f"layer_{i+1}.json")
-        with open(layer_path, "w", encoding="utf-8") as lf:
-            json.dump(layer, lf, indent=2)
-    return {"status": "saved"}
+    written = await asyncio.to_thread(preset_store.save_preset, name, layers)
+    return {"status": "saved", "written": written}
 
 @preset_router.delete("/api/presets/{name}")
-def delete_preset(name: str):
-    import shutil
-    preset_dir = os.path.join(PRESETS_DIR, name)
-    if os.path.exists(preset_dir) and os.path.isdir(preset_dir):
-        shutil.rmtree(preset_dir)
+async def delete_preset(name: str):
+    try:
+        await asyncio.to_thread(preset_store.delete_preset, name)
         return {"status": "deleted"}
-    else:
+    except PresetNotFound:
         raise HTTPException(status_code=404, detail="Preset not found")
+
+@preset_router.post("/api/presets/{name}/pack")
+async def pack_preset(name: str):
+    # Export the directory layout to a single <name>.xctlpreset file
+    try:
+        count = await asyncio.to_thread(preset_store.pack_preset, name)
+        return {"status": "packed", "layers": count}
+    except PresetNotFound:
+        raise HTTPException(status_code=404, detail="Preset not found")
+
+@preset_router.post("/api/presets/{name}/unpack")
+async def unpack_preset(name: str):
+    # Import <name>.xctlpreset back into the directory layout
+    try:
+        written = await asyncio.to_thread(preset_store.unpack_preset, name)
+        return {"status": "unpacked", "written": written}
+    except PresetNotFound:
+        raise HTTPException(status_code=404, detail="Packed preset not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
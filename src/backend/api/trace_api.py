@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Body, HTTPException
+from backend.utils.trace import tracer
+
+trace_router = APIRouter()
+
+
+@trace_router.get("/api/trace")
+async def get_trace(subsystem: str = None, limit: int = None):
+    """Dump the trace ring buffer (oldest first), formatted on demand."""
+    return {**tracer.status(), "events": tracer.dump(subsystem, limit)}
+
+
+@trace_router.post("/api/trace/levels")
+async def set_trace_levels(levels: dict = Body(...)):
+    """Change levels at runtime, e.g. {"midi": "debug", "osc": "info", "default": "warning"}."""
+    try:
+        tracer.set_levels(levels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return tracer.status()
+
+
+@trace_router.delete("/api/trace")
+async def clear_trace():
+    tracer.clear()
+    return {"status": "cleared"}
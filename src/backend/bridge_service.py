@@ -0,0 +1,115 @@
+# bridge_service.py
+"""
+MIDI <-> OSC bridge lifecycle for XCTL_ backend.
+The bridge (MIDI ports, OSC server, meters, file watchers) starts with the
+process on the asyncio loop, independent of any browser; the web UI only
+observes it. Blocking setup/teardown (opening ports, joining threads) runs in
+a worker thread so the event loop stays responsive.
+"""
+import asyncio
+import logging
+
+
+class BridgeService:
+    """
+    start()/stop()/restart() coroutines around AppContext.start_handlers() and
+    stop_handlers(). Hooks registered with add_hook('start'|'stop', fn) run
+    after the bridge started or stopped; fn may be a plain function or a coroutine.
+    """
+    STATES = ('stopped', 'starting', 'running', 'failed', 'stopping')
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.logger = logging.getLogger('BridgeService')
+        self.state = 'stopped'
+        self.last_error = None
+        self._hooks = {'start': [], 'stop': []}
+        self._lifecycle_lock = None  # asyncio.Lock, created on the running loop
+
+    def add_hook(self, event, callback):
+        self._hooks[event].append(callback)
+
+    def status(self):
+        midi = self.ctx.midi_if_built
+        osc = self.ctx.osc_if_built
+        return {
+            'state': self.state,
+            'midi': bool(midi and midi.running),
+            'osc': bool(osc and osc.running),
+            'error': self.last_error,
+        }
+
+    async def start(self):
+        async with self._lock():
+            if self.state == 'running':
+                return self.status()
+            self.ctx.event_loop = asyncio.get_running_loop()
+            if self.state == 'failed':
+                # Retry from scratch: drop whatever the failed start left running
+                await asyncio.to_thread(self.ctx.stop_handlers)
+            self._set_state('starting')
+            try:
+                errors = await asyncio.to_thread(self.ctx.start_handlers)
+            except Exception as e:
+                errors = [str(e)]
+            if errors:
+                self.last_error = '; '.join(errors)
+                self.logger.error(f"Bridge start failed: {self.last_error}")
+                self._set_state('failed')
+            else:
+                self.last_error = None
+                self._set_state('running')
+                self.ctx.timer.mark('bridge started')
+            await self._run_hooks('start')
+            return self.status()
+
+    async def stop(self):
+        async with self._lock():
+            if self.state == 'stopped':
+                return self.status()
+            self._set_state('stopping')
+            try:
+                await asyncio.to_thread(self.ctx.stop_handlers)
+            except Exception as e:
+                self.logger.error(f"Bridge stop failed: {e}")
+            self._set_state('stopped')
+            await self._run_hooks('stop')
+            return self.status()
+
+    async def restart(self):
+        """Stop, re-read config.yaml and start again (e.g. after MIDI/OSC settings changed)."""
+        await self.stop()
+        self.ctx.reload_config()
+        return await self.start()
+
+    def stop_sync(self):
+        """Blocking stop for use after the event loop has exited."""
+        self._set_state('stopping')
+        self.ctx.stop_handlers()
+        self._set_state('stopped')
+
+    def _lock(self):
+        if self._lifecycle_lock is None:
+            self._lifecycle_lock = asyncio.Lock()
+        return self._lifecycle_lock
+
+    def _set_state(self, state):
+        self.state = state
+        self.logger.info(f"Bridge {state}")
+        if self.ctx.broadcast_ws and self.ctx.event_loop and self.ctx.event_loop.is_running():
+            try:
+                # Observers (web UI) get lifecycle changes like any other broadcast
+                asyncio.run_coroutine_threadsafe(
+                    self.ctx.broadcast_ws({'type': 'bridge_status', 'state': state, 'error': self.last_error}),
+                    self.ctx.event_loop)
+            except Exception as e:
+                self.logger.debug(f"Could not broadcast bridge state: {e}")
+
+    async def _run_hooks(self, event):
+        for callback in self._hooks[event]:
+            try:
+                result = callback(self)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"Bridge {event} hook failed: {e}")
@@ -6,26 +6,19 @@ Note:
 - FastAPI app (serving frontend/API) is in api/api_server.py
 - WebSocket endpoint logic is in websocket/ws_server.py
 - Modular OSC and MIDI logic are in osc/ and midi/ submodules
+- Shared config and lazily built handlers live in utils/app_context.py
 """
+from backend.utils.app_context import get_app_context  # first import: startup timing reference
+import asyncio
 import os
 import logging
-from backend.utils.config import load_config
-from backend.midi.midi_handler import MidiHandler
-from backend.osc.osc_server import XctlOSC
 # from backend.websocket.ws_server import WebSocketServer  # Placeholder for future
 
-import threading
 import uvicorn
-from fastapi import FastAPI, WebSocket
-from typing import Set
-import asyncio
+from fastapi import WebSocket
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import json
-import os
-from backend.utils.config import load_config
-from backend.midi.midi_handler import MidiHandler
-from backend.osc.osc_server import XctlOSC
 
 
 import socket
@@ -53,54 +46,52 @@ def run_websocket(port):
     uvicorn.run(ws_app, host="0.0.0.0", port=port, log_level="info")
 
 # --- WebSocket Client Management ---
-connected_websockets_lock = threading.Lock()
-connected_websockets: Set[WebSocket] = set()
+from backend.websocket.ws_hub import WebSocketHub
+ws_hub = WebSocketHub()
 
 async def broadcast_ws(message: dict):
-    with connected_websockets_lock:
-        ws_list = list(connected_websockets)
-    print(f"[DEBUG] Broadcasting to {len(ws_list)} websockets: {message}")
-    if not ws_list:
-        print("[DEBUG] No connected websockets to broadcast to.")
-        return
-    data = json.dumps(message)
-    to_remove = set()
-    for ws in ws_list:
-        try:
-            await ws.send_text(data)
-        except Exception as e:
-            print(f"[DEBUG] Failed to send to websocket: {e}")
-            to_remove.add(ws)
-    if to_remove:
-        with connected_websockets_lock:
-            for ws in to_remove:
-                connected_websockets.discard(ws)
+    # Only enqueues: per-client writer tasks in ws_hub do the sends
+    ws_hub.publish(message)
 
 
 def main():
-    CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.yaml')
-    config = load_config(CONFIG_PATH)
+    ctx = get_app_context()
+    config = ctx.config
 
     # Setup logging early
     logging.basicConfig(level=getattr(logging, config.get('logging', {}).get('level', 'INFO').upper(), logging.INFO))
     logger = logging.getLogger('Main')
-
-    # Print available MIDI ports (for user info)
+    ws_cfg = config.get('websocket', {})
+    ws_hub.max_lag = ws_cfg.get('max_lag', ws_hub.max_lag)
+    ws_hub.state_rate_hz = ws_cfg.get('state_rate_hz', ws_hub.state_rate_hz)
+    ctx.broadcast_ws = broadcast_ws
+    ctx.publish = ws_hub.publish
+    ctx.ws_hub = ws_hub
+    ctx.trace_topics = ws_hub.trace_topics
+
+    # Log available MIDI ports (for user info)
     import mido
-    print("Available MIDI input ports:", mido.get_input_names())
-    print("Available MIDI output ports:", mido.get_output_names())
+    logger.info(f"Available MIDI input ports: {mido.get_input_names()}")
+    logger.info(f"Available MIDI output ports: {mido.get_output_names()}")
 
-    # Handlers will be initialized on first WebSocket connection
-    global midi, osc, handlers_initialized
-    midi = None
-    osc = None
-    handlers_initialized = False
+    # Handlers (ctx.midi / ctx.osc) are built and started by ctx.bridge at server startup
 
     # Setup single FastAPI app
     frontend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../frontend/views/xctl-gui'))
     from backend.api.api_server import app as api_app
     app = api_app  # Use the API app (with all endpoints) as the main app
     app.mount("/static", StaticFiles(directory=frontend_dir, html=True), name="static")
+    ctx.timer.mark('app ready')
+
+    @app.on_event("startup")
+    async def on_startup():
+        ctx.timer.mark('server startup')
+        # The bridge runs headless from boot; browsers are optional observers
+        await ctx.bridge.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await ctx.bridge.stop()
 
     @app.get("/")
     async def root():
@@ -122,68 +113,56 @@ def main():
     @app.websocket("/ws")
     async def websocket_endpoint(websocket: WebSocket):
         await websocket.accept()
-        with connected_websockets_lock:
-            connected_websockets.add(websocket)
-        print(f"[DEBUG] WebSocket client connected: {websocket}")
-
-        # Initialize MIDI/OSC handlers on first connection, using the running event loop
-        global midi, osc, handlers_initialized
-        if not handlers_initialized:
-            loop = asyncio.get_running_loop()
-            CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.yaml')
-            config = load_config(CONFIG_PATH)
-            try:
-                midi_cfg = config['midi']
-                midi = MidiHandler(
-                    midi_cfg.get('input_port'),
-                    midi_cfg.get('output_port'),
-                    event_loop=loop,
-                    broadcast_ws=broadcast_ws
-                )
-                midi.open()
-                # --- Start mapping watcher ---
-                from backend.mapping.mapping_watcher import MappingWatcher
-                mapping_path = midi.mapping_path
-                global mapping_watcher
-                def on_mapping_change():
-                    print('[MappingWatcher] Detected mapping change, reloading...')
-                    midi.reload_mapping()
-                mapping_watcher = MappingWatcher(mapping_path, on_mapping_change, poll_interval=1.0)
-                mapping_watcher.start()
-            except Exception as e:
-                print(f"[ERROR] MIDI initialization failed: {e}")
-            try:
-                osc = XctlOSC(config_path=CONFIG_PATH, event_loop=loop, broadcast_ws=broadcast_ws, midi_handler=midi)
-                osc.start_osc_server()
-                print("[DEBUG] OSC server started.")
-                # Ensure MIDI handler can send OSC
-                midi.osc = osc
-            except Exception as e:
-                print(f"[ERROR] OSC initialization failed: {e}")
-            handlers_initialized = True
+        ctx.mark_first_websocket()
+        ws_hub.add(websocket)
+        logging.getLogger('Main').debug(f"WebSocket client connected: {websocket}")
+
+        ws_hub.send_to(websocket, {'type': 'bridge_status', **ctx.bridge.status()})
 
         try:
             while True:
                 data = await websocket.receive_text()
                 try:
                     msg = json.loads(data)
-                    if msg.get('type') == 'osc_send':
+                    osc = ctx.osc_if_built  # None while the bridge is stopped/restarting
+                    if osc is None and msg.get('type') in ('osc_send', 'osc_bundle'):
+                        ws_hub.send_to(websocket, {'type': 'error', 'message': 'bridge not running',
+                                                   'bridge': ctx.bridge.status()})
+                    elif msg.get('type') == 'osc_send':
                         address = msg.get('address')
                         args = msg.get('args', [])
-                        osc.send_message(address, *args)
-                        await websocket.send_text(json.dumps({'type': 'osc_ack', 'address': address}))
+                        osc.send_message(address, *args, target=msg.get('target'))
+                        ws_hub.send_to(websocket, {'type': 'osc_ack', 'address': address})
+                    elif msg.get('type') == 'osc_bundle':
+                        # Grouped recall, e.g. {"type": "osc_bundle", "timetag": null,
+                        #   "messages": [{"address": "/ch/1/fader", "args": [0.5]}, ...]}
+                        messages = msg.get('messages', [])
+                        with osc.bundle(msg.get('timetag')):
+                            for m in messages:
+                                osc.send_message(m.get('address'), *m.get('args', []), target=m.get('target'))
+                        ws_hub.send_to(websocket, {'type': 'osc_ack', 'count': len(messages)})
+                    elif msg.get('type') in ('subscribe', 'unsubscribe'):
+                        # Opt in/out of raw trace frames, e.g. {"type": "subscribe", "topics": ["midi"]}
+                        ws_hub.subscribe(websocket, msg.get('topics', []), enabled=msg.get('type') == 'subscribe')
                     elif msg.get('type') == 'update_settings':
-                        osc.update_settings(msg.get('settings', {}))
-                        await websocket.send_text(json.dumps({'type': 'settings_updated', 'settings': msg.get('settings', {})}))
+                        settings = msg.get('settings', {})
+                        if osc is not None:
+                            osc.update_settings(settings)
+                        else:
+                            # Nothing running to apply them to: persist for the next bridge start
+                            from backend.osc.osc_server import persist_osc_settings
+                            await asyncio.to_thread(persist_osc_settings, settings, ctx.config_path)
+                            ctx.reload_config()
+                        ws_hub.send_to(websocket, {'type': 'settings_updated', 'settings': settings,
+                                                   'applied': osc is not None})
                     else:
-                        await websocket.send_text(json.dumps({'type': 'error', 'message': 'Unknown message type'}))
+                        ws_hub.send_to(websocket, {'type': 'error', 'message': 'Unknown message type'})
                 except Exception as e:
-                    await websocket.send_text(json.dumps({'type': 'error', 'message': str(e)}))
+                    ws_hub.send_to(websocket, {'type': 'error', 'message': str(e)})
         except Exception:
-            print("WebSocket disconnected")
+            logging.getLogger('Main').debug("WebSocket disconnected")
         finally:
-            with connected_websockets_lock:
-                connected_websockets.discard(websocket)
+            ws_hub.remove(websocket)
 
 
     # Validate and select port
@@ -200,20 +179,8 @@ def main():
     logging.info(f"Starting FastAPI app (with WebSocket) on http://0.0.0.0:{free_fastapi_port} ...")
     uvicorn.run(app, host="0.0.0.0", port=free_fastapi_port, log_level="info")
 
-    try:
-        while True:
-            pass  # Main event loop placeholder
-    except KeyboardInterrupt:
-        logger.info("Shutting down...")
-        midi.close()
-        osc.shutdown()
-        # Stop mapping watcher if running
-        try:
-            if 'mapping_watcher' in globals() and mapping_watcher:
-                mapping_watcher.stop()
-        except Exception as e:
-            logger.error(f"Error stopping mapping watcher: {e}")
-        # Uvicorn servers will exit with main thread
+    logger.info("Shutting down...")
+    ctx.shutdown()
 
 if __name__ == '__main__':
     main()
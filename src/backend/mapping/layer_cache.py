@@ -0,0 +1,155 @@
+# layer_cache.py
+"""
+In-memory cache of every layer of a preset, parsed and compiled up front.
+Switching layers is then a dict lookup plus a reference swap on the MIDI
+thread; disk I/O only happens in refresh(), which re-reads just the files
+whose mtime/size changed. A preset stored as a single packed file is
+memory-mapped instead, and each layer is decoded on its first activation.
+"""
+import json
+import logging
+import os
+import threading
+
+from backend.mapping.routing import compile_midi_routes
+from backend.utils.preset_pack import PackedPreset, PACK_EXT
+
+
+def _file_stamp(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class CompiledLayer:
+    """
+    One layer: its mapping dict and compiled MIDI routing table. With a loader
+    (packed presets) both are built on first ensure_loaded() instead of up front.
+    """
+    __slots__ = ('key', 'name', 'file', 'path', 'stamp', 'mapping', 'midi_routes', '_loader')
+
+    def __init__(self, key, name, file, path, stamp, mapping=None, loader=None):
+        self.key = key
+        self.name = name
+        self.file = file
+        self.path = path
+        self.stamp = stamp
+        self.mapping = None
+        self.midi_routes = None
+        self._loader = loader
+        if loader is None:
+            self._load(mapping if mapping is not None else {})
+
+    def ensure_loaded(self):
+        if self.midi_routes is None:
+            self._load(self._loader())
+        return self
+
+    def _load(self, mapping):
+        routes = compile_midi_routes(mapping)
+        self.mapping = mapping
+        self.midi_routes = routes
+
+
+class LayerCache:
+    """
+    All layers of one preset directory (layer_index.json + layer_N.json).
+
+    index has the same shape as MidiHandler.layers_index
+    ({"layer_1": {"name": ..., "file": ...}, ...}); layers maps the same keys
+    to CompiledLayer. Both are replaced wholesale by refresh(), never mutated,
+    so readers on other threads always see a consistent dict.
+    """
+
+    def __init__(self, preset_dir):
+        self.preset_dir = preset_dir
+        self.index_path = os.path.join(preset_dir, "layer_index.json")
+        self.pack_path = preset_dir.rstrip(os.sep) + PACK_EXT
+        self.logger = logging.getLogger('LayerCache')
+        self.index = {}
+        self.layers = {}
+        self._index_stamp = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def packed(self):
+        """True when the preset is read from a single <preset>.xctlpreset file."""
+        return not os.path.isdir(self.preset_dir) and os.path.isfile(self.pack_path)
+
+    def get(self, layer_key):
+        layer = self.layers.get(layer_key)
+        return layer.ensure_loaded() if layer else None
+
+    def refresh(self, force=False, names=None):
+        """
+        Re-read layer_index.json and every layer file that changed on disk
+        (all of them with force=True). names, if given, is the set of file names
+        a watcher reported; other layer files are then reused without a stat.
+        Returns the set of layer keys that were added, removed or recompiled.
+        Raises if layer_index.json is unreadable.
+        """
+        if self.packed:
+            return self._refresh_packed(force)
+        with self._refresh_lock:
+            index_stamp = _file_stamp(self.index_path)
+            if names is not None and "layer_index.json" not in names and self._index_stamp is not None:
+                index_stamp = self._index_stamp
+            if force or index_stamp is None or index_stamp != self._index_stamp:
+                with open(self.index_path, 'r') as f:
+                    layer_names = json.load(f)
+                index = {
+                    f"layer_{i+1}": {"name": name, "file": f"layer_{i+1}.json"}
+                    for i, name in enumerate(layer_names)
+                }
+            else:
+                index = self.index
+            old_layers = self.layers
+            layers = {}
+            changed = set(old_layers) - set(index)
+            for key, info in index.items():
+                path = os.path.join(self.preset_dir, info["file"])
+                old = old_layers.get(key)
+                if not force and old and names is not None and info["file"] not in names and old.name == info["name"]:
+                    layers[key] = old
+                    continue
+                stamp = _file_stamp(path)
+                if not force and old and old.path == path and old.stamp == stamp and old.name == info["name"]:
+                    layers[key] = old
+                    continue
+                layers[key] = CompiledLayer(key, info["name"], info["file"], path, stamp, self._read_mappings(path))
+                changed.add(key)
+            self.index, self.layers, self._index_stamp = index, layers, index_stamp
+            if changed:
+                self.logger.info(f"Layer cache refreshed: {sorted(changed)}")
+            return changed
+
+    def _refresh_packed(self, force):
+        # A packed preset is one file: reload it as a whole when it changes, but
+        # only decode and compile each layer on its first activation.
+        with self._refresh_lock:
+            stamp = _file_stamp(self.pack_path)
+            if not force and stamp == self._index_stamp and self.layers:
+                return set()
+            pack = PackedPreset(self.pack_path)
+            index = {}
+            layers = {}
+            for i, name in enumerate(pack.layer_names):
+                key = f"layer_{i+1}"
+                index[key] = {"name": name, "file": f"layer_{i+1}.json"}
+                layers[key] = CompiledLayer(key, name, index[key]["file"], self.pack_path, stamp,
+                                            loader=lambda i=i: pack.layer_mappings(i))
+            changed = set(self.layers) | set(layers)
+            self.index, self.layers, self._index_stamp = index, layers, stamp
+            self.logger.info(f"Layer cache loaded packed preset {self.pack_path} ({len(layers)} layers)")
+            return changed
+
+    def _read_mappings(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f).get('mappings', {})
+        except Exception as e:
+            self.logger.error(f'Could not load mapping file {path}: {e}')
+            return {}
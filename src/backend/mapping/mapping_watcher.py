@@ -1,38 +1,196 @@
 """
-Watches active_mapping.json for changes and triggers a callback to reload mapping in the backend.
+Watches mapping/preset files for changes and triggers callbacks to reload them in the backend.
+Uses inotify on Linux (no wakeups while idle, changes seen within milliseconds)
+and falls back to mtime polling elsewhere or if inotify is unavailable.
 """
+import ctypes
+import ctypes.util
+import logging
 import os
-import time
+import select
+import struct
+import sys
 import threading
-from typing import Callable
+from typing import Callable, Optional, Set
 
-class MappingWatcher:
-    def __init__(self, mapping_path: str, on_change: Callable[[], None], poll_interval: float = 1.0):
-        self.mapping_path = mapping_path
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class DirectoryWatcher:
+    """
+    Calls on_change(names) with the set of file names that changed in a directory.
+    Bursts of writes (e.g. save_preset rewriting every layer) are debounced into
+    one callback once the directory has been quiet for `debounce` seconds.
+    """
+    def __init__(self, directory: str, on_change: Callable[[Set[str]], None], debounce: float = 0.05,
+                 poll_interval: float = 1.0, name_filter: Optional[Callable[[str], bool]] = None):
+        self.directory = directory
         self.on_change = on_change
+        self.debounce = debounce
         self.poll_interval = poll_interval
-        self._last_mtime = None
+        self.name_filter = name_filter
+        self.mode = None  # 'inotify' or 'poll', decided in start()
+        self.logger = logging.getLogger('DirectoryWatcher')
+        self._fd = None
+        self._wake_r = self._wake_w = None
         self._stop_event = threading.Event()
-        self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self._thread = None
+        self._baseline = None  # poll mode: stamps taken in start()
 
     def start(self):
-        self._last_mtime = os.path.getmtime(self.mapping_path) if os.path.exists(self.mapping_path) else None
         self._stop_event.clear()
+        self._fd = self._init_inotify()
+        if self._fd is not None:
+            self.mode = 'inotify'
+            self._wake_r, self._wake_w = os.pipe()
+            target = self._inotify_loop
+        else:
+            self.mode = 'poll'
+            self._baseline = self._scan()
+            target = self._poll_loop
+        self._thread = threading.Thread(target=target, name='DirectoryWatcher', daemon=True)
         self._thread.start()
 
     def stop(self):
         self._stop_event.set()
-        if self._thread.is_alive():
+        if self._wake_w is not None:
+            os.write(self._wake_w, b'x')
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
             self._thread.join()
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = None
 
-    def _watch_loop(self):
+    def _init_inotify(self):
+        libc = _load_libc()
+        if libc is None or not os.path.isdir(self.directory):
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _inotify_loop(self):
+        pending = set()
         while not self._stop_event.is_set():
-            try:
-                if os.path.exists(self.mapping_path):
-                    mtime = os.path.getmtime(self.mapping_path)
-                    if self._last_mtime is None or mtime != self._last_mtime:
-                        self._last_mtime = mtime
-                        self.on_change()
-            except Exception as e:
-                print(f"[MappingWatcher] Error: {e}")
-            time.sleep(self.poll_interval)
+            # Block indefinitely while idle; only wait `debounce` once a burst has started
+            timeout = self.debounce if pending else None
+            readable, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+            if self._stop_event.is_set():
+                return
+            if not readable:
+                self._fire(pending)
+                pending = set()
+                continue
+            gone = False
+            for name, mask in self._read_events():
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    gone = True
+                elif name and (self.name_filter is None or self.name_filter(name)):
+                    pending.add(name)
+            if gone:
+                # Watched directory was removed or replaced: keep working by polling
+                self.logger.warning(f"{self.directory} went away, falling back to polling")
+                self._fire(pending)
+                self.mode = 'poll'
+                self._poll_loop()
+                return
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            yield name, mask
+
+    def _poll_loop(self):
+        last = self._baseline if self._baseline is not None else self._scan()
+        while not self._stop_event.wait(self.poll_interval):
+            current = self._scan()
+            if current != last:
+                changed = {n for n in current.keys() | last.keys() if current.get(n) != last.get(n)}
+                last = current
+                self._fire(changed)
+
+    def _scan(self):
+        stamps = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if self.name_filter is None or self.name_filter(entry.name):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        stamps[entry.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return stamps
+
+    def _fire(self, names):
+        if not names:
+            return
+        try:
+            self.on_change(set(names))
+        except Exception as e:
+            self.logger.error(f"on_change failed for {self.directory}: {e}")
+
+
+class MappingWatcher:
+    """Watches a single file (active_mapping.json) and calls on_change() when it is rewritten."""
+    def __init__(self, mapping_path: str, on_change: Callable[[], None], poll_interval: float = 1.0,
+                 debounce: float = 0.05):
+        self.mapping_path = mapping_path
+        self.on_change = on_change
+        file_name = os.path.basename(mapping_path)
+        self._watcher = DirectoryWatcher(
+            os.path.dirname(os.path.abspath(mapping_path)),
+            lambda names: self.on_change(),
+            debounce=debounce,
+            poll_interval=poll_interval,
+            name_filter=lambda name: name == file_name,
+        )
+
+    @property
+    def mode(self):
+        return self._watcher.mode
+
+    def start(self):
+        self._watcher.start()
+
+    def stop(self):
+        self._watcher.stop()
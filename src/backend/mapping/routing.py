@@ -0,0 +1,162 @@
+# routing.py
+"""
+Compiled routing tables for the MIDI <-> OSC bridge.
+
+A layer mapping ({"fader_1": {"midi_cc": 70, "osc": ...}, ...}) is compiled once
+into flat dicts (MIDI key -> route, OSC address -> route) so the hot paths
+resolve an incoming message with a single lookup instead of scanning every
+mapping entry.
+"""
+import logging
+
+from backend.utils.value_mapping import CompiledMapper
+
+logger = logging.getLogger('routing')
+
+MIDI_CHANNELS = range(16)
+SEVEN_BIT_RANGE = (0, 127)
+PITCHBEND_RANGE = (-8192, 8191)  # mido 'pitch' of a 14-bit pitchwheel message
+
+
+def midi_range(entry):
+    """Native MIDI value range of a mapping entry (14-bit for pitch-bend faders)."""
+    return PITCHBEND_RANGE if entry.get('midi_pitchbend') else SEVEN_BIT_RANGE
+
+
+def parse_targets(value):
+    """Mapping "target" ("lights" or ["console", "recorder"]) -> tuple of names, None = default target."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return (value,)
+    return tuple(str(v) for v in value)
+
+
+def parse_surface(value):
+    """Mapping "surface" (index in midi.surfaces) -> int; missing = the first unit."""
+    if value in (None, ''):
+        return 0
+    surface = int(value)
+    if surface < 0:
+        raise ValueError(f"invalid surface {value}")
+    return surface
+
+
+def parse_control_key(key):
+    """Split a mapping key like 'fader_3' into ('fader', 3); channel defaults to 1."""
+    parts = key.split('_')
+    try:
+        channel = int(parts[1])
+    except (IndexError, ValueError):
+        channel = 1
+    return parts[0], channel
+
+
+def _has_number(entry, field):
+    """True if a mapping entry sets `field` (the mapping editor leaves unused fields as '')."""
+    return entry.get(field) not in (None, '')
+
+
+class MidiRoute:
+    """Pre-parsed routing data for one mapping entry (MIDI -> OSC)."""
+    __slots__ = ('key', 'event', 'channel', 'osc', 'entry', 'mapper', 'to_osc', 'coalesce_window', 'target',
+                 'surface')
+
+    def __init__(self, key, entry):
+        self.key = key
+        self.entry = entry
+        self.event, self.channel = parse_control_key(key)
+        self.osc = entry.get('osc')
+        self.mapper = CompiledMapper(entry, midi_range(entry))
+        self.to_osc = self.mapper.to_osc  # bound once: MIDI value -> OSC value
+        # Per-mapping override of the OSC coalescing window; None = global default
+        coalesce_ms = entry.get('coalesce_ms')
+        self.coalesce_window = coalesce_ms / 1000.0 if coalesce_ms not in (None, '') else None
+        # Named OSC output target(s) from "target"; None = the default target
+        self.target = parse_targets(entry.get('target'))
+        self.surface = parse_surface(entry.get('surface'))
+
+
+def compile_midi_routes(mapping):
+    """
+    Build {(surface, msg_type, midi_channel, number): MidiRoute} for a layer mapping.
+    Entries without an explicit 'midi_channel' answer on every MIDI channel, and
+    the first entry wins on duplicates (same semantics as the old linear scan).
+    Pitch-bend faders ("midi_pitchbend": true) are keyed with number None.
+    """
+    routes = {}
+    for key, entry in mapping.items():
+        if not isinstance(entry, dict):
+            continue
+        if 'midi_channel' in entry:
+            channels = (int(entry['midi_channel']),)
+        else:
+            channels = MIDI_CHANNELS
+        lookups = []
+        if _has_number(entry, 'midi_cc'):
+            lookups.append(('control_change', entry['midi_cc']))
+        if _has_number(entry, 'midi_note'):
+            lookups.append(('note_on', entry['midi_note']))
+            lookups.append(('note_off', entry['midi_note']))
+        if entry.get('midi_pitchbend'):
+            lookups.append(('pitchwheel', None))
+        if not lookups:
+            continue
+        try:
+            route = MidiRoute(key, entry)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping mapping '{key}': {e}")
+            continue
+        for msg_type, number in lookups:
+            for ch in channels:
+                routes.setdefault((route.surface, msg_type, ch, number), route)
+    return routes
+
+
+class OscRoute:
+    """Pre-parsed routing data for one mapping entry (OSC -> MIDI)."""
+    __slots__ = ('key', 'event', 'channel', 'osc', 'entry', 'msg_type', 'number', 'midi_channel',
+                 'mapper', 'to_midi', 'surface')
+
+    def __init__(self, key, entry, msg_type, number):
+        self.key = key
+        self.entry = entry
+        self.event, self.channel = parse_control_key(key)
+        self.osc = entry.get('osc')
+        self.msg_type = msg_type  # 'control_change', 'note', 'pitchwheel' or 'meter'
+        self.number = number
+        self.midi_channel = entry.get('midi_channel', 0)  # 0 = channel 1 for mido
+        self.surface = parse_surface(entry.get('surface'))  # unit the MIDI output goes to
+        self.mapper = CompiledMapper(entry, midi_range(entry), midi_to_osc=False)
+        self.to_midi = self.mapper.to_midi  # bound once: OSC value -> clamped MIDI value
+
+
+def compile_osc_routes(mapping):
+    """
+    Build {osc_address: OscRoute} for a mapping. The first entry wins on
+    duplicate addresses; precedence is meter, pitch bend, then 'midi_cc', then 'midi_note'.
+    Meter entries ("meter": true) carry their input scale ('db', 'linear' or
+    'level', from "meter_scale") as the route number.
+    """
+    routes = {}
+    for key, entry in mapping.items():
+        if not isinstance(entry, dict):
+            continue
+        address = entry.get('osc')
+        if not address or address in routes:
+            continue
+        if entry.get('meter'):
+            target = ('meter', entry.get('meter_scale') or 'db')
+        elif entry.get('midi_pitchbend'):
+            target = ('pitchwheel', None)
+        elif _has_number(entry, 'midi_cc'):
+            target = ('control_change', entry['midi_cc'])
+        elif _has_number(entry, 'midi_note'):
+            target = ('note', entry['midi_note'])
+        else:
+            continue
+        try:
+            routes[address] = OscRoute(key, entry, *target)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping mapping '{key}': {e}")
+    return routes
@@ -0,0 +1,185 @@
+# meter_engine.py
+"""
+Channel meter engine for the X-Touch.
+Turns OSC meter feeds (declared in the mapping with "meter": true) into the
+8-segment channel-pressure meters (value = channel offset * 16 + level 0-8) of
+every strip across the surfaces (meter_12 is strip 4 of the first extender),
+with peak-hold and decay, sending only when a channel's segment level changes
+and at most refresh_hz times per second.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from array import array
+
+import mido
+
+METER_CHANNELS = 8
+# dB threshold at which each of the 8 segments lights (4 green, 3 orange, 1 red)
+SEGMENT_DB = (-60.0, -48.0, -36.0, -24.0, -18.0, -12.0, -6.0, 0.0)
+METER_FLOOR_DB = -72.0
+METER_CEIL_DB = 12.0
+DB_STEPS_PER_UNIT = 4  # dB -> level table resolution (0.25 dB)
+AMPLITUDE_STEPS = 4096  # linear 0..1 -> dB table resolution
+
+
+def build_level_table(segments_db=SEGMENT_DB):
+    """Segment level (0-8) for every quantized dB value from METER_FLOOR_DB to METER_CEIL_DB."""
+    size = int((METER_CEIL_DB - METER_FLOOR_DB) * DB_STEPS_PER_UNIT) + 1
+    table = bytearray(size)
+    for i in range(size):
+        db = METER_FLOOR_DB + i / DB_STEPS_PER_UNIT
+        table[i] = sum(1 for threshold in segments_db if db >= threshold)
+    return table
+
+
+def build_amplitude_table():
+    """dB value for every quantized linear amplitude 0..1."""
+    return array('d', (20.0 * math.log10(i / AMPLITUDE_STEPS) if i else METER_FLOOR_DB
+                       for i in range(AMPLITUDE_STEPS + 1)))
+
+
+class MeterEngine:
+    """
+    Meter ballistics and output for the channel strips (8 per unit).
+
+    feed() is called from the OSC server thread and only records the loudest
+    value since the last tick. A worker thread ticks at refresh_hz while any
+    meter is lit: the display level follows the input up instantly, holds a
+    peak for peak_hold seconds, then falls at decay_db_per_s. A channel-pressure
+    message is sent when the segment level changes, and a lit level is re-sent
+    every keepalive seconds because the device decays meters on its own.
+    """
+
+    def __init__(self, send, event_loop=None, broadcast_ws=None, refresh_hz=30, peak_hold=0.5,
+                 decay_db_per_s=30.0, keepalive=0.1, segments_db=SEGMENT_DB, strips=None):
+        self.send = send  # callable(mido.Message, surface=), normally MidiHandler.send
+        # (surface index, strip on that unit) per global strip, normally SurfaceManager.strips
+        self.strips = list(strips or [(0, n) for n in range(1, METER_CHANNELS + 1)])
+        channels = len(self.strips)
+        self.event_loop = event_loop
+        self.broadcast_ws = broadcast_ws
+        self.interval = 1.0 / refresh_hz
+        self.peak_hold = peak_hold
+        self.decay_db_per_s = decay_db_per_s
+        self.keepalive = keepalive
+        self.segments_db = tuple(segments_db)
+        self.logger = logging.getLogger('MeterEngine')
+        self._level_table = build_level_table(self.segments_db)
+        self._amplitude_table = build_amplitude_table()
+        self._lock = threading.Lock()
+        self._input = [METER_FLOOR_DB] * channels  # loudest dB since the last tick
+        self._peak = [METER_FLOOR_DB] * channels  # owned by the worker thread
+        self._reset_pending = False
+        self._peak_time = [0.0] * channels
+        self._sent = [0] * channels
+        self._sent_time = [0.0] * channels
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='MeterEngine', daemon=True)
+        self._thread.start()
+
+    def feed(self, channel, value, scale='db'):
+        """
+        Record a meter value for a 1-based channel strip.
+        scale: 'db' (dBFS), 'linear' (amplitude 0..1) or 'level' (segments 0-8).
+        """
+        index = channel - 1
+        if not 0 <= index < len(self.strips):
+            return
+        try:
+            db = self.to_db(value, scale)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            if db > self._input[index]:
+                self._input[index] = db
+        self._wake.set()
+
+    def to_db(self, value, scale='db'):
+        if scale == 'linear':
+            i = int(float(value) * AMPLITUDE_STEPS)
+            return self._amplitude_table[min(max(i, 0), AMPLITUDE_STEPS)]
+        if scale == 'level':
+            level = int(value)
+            return self.segments_db[min(level, len(self.segments_db)) - 1] if level > 0 else METER_FLOOR_DB
+        return float(value)
+
+    def level(self, db):
+        """Segment level (0-8) for a dB value (single table lookup)."""
+        i = int((db - METER_FLOOR_DB) * DB_STEPS_PER_UNIT)
+        if i <= 0:
+            return self._level_table[0]
+        return self._level_table[min(i, len(self._level_table) - 1)]
+
+    def reset(self):
+        """Blank all meters (e.g. on layer change); applied by the worker on its next tick."""
+        with self._lock:
+            self._input = [METER_FLOOR_DB] * len(self.strips)
+            self._reset_pending = True
+        self._wake.set()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        last = time.monotonic()
+        while self._running:
+            if self._idle():
+                self._wake.wait()
+                self._wake.clear()
+                last = time.monotonic()
+                continue
+            self._wake.clear()
+            now = time.monotonic()
+            try:
+                self._tick(now, now - last)
+            except Exception as e:
+                self.logger.error(f"Meter update failed: {e}")
+            last = now
+            time.sleep(max(0.0, last + self.interval - time.monotonic()))
+
+    def _idle(self):
+        return (not any(self._sent)
+                and not self._reset_pending
+                and all(p <= METER_FLOOR_DB for p in self._peak)
+                and all(d <= METER_FLOOR_DB for d in self._input))
+
+    def _tick(self, now, dt):
+        with self._lock:
+            inputs, self._input = self._input, [METER_FLOOR_DB] * len(self.strips)
+            reset, self._reset_pending = self._reset_pending, False
+        if reset:
+            # Only this thread touches the peaks; the next sends blank the lit meters
+            self._peak = [METER_FLOOR_DB] * len(self.strips)
+            self._peak_time = [0.0] * len(self.strips)
+        peak, peak_time, sent, sent_time, strips = self._peak, self._peak_time, self._sent, self._sent_time, self.strips
+        fall = self.decay_db_per_s * dt
+        for i, db in enumerate(inputs):
+            if db >= peak[i]:
+                peak[i] = db
+                peak_time[i] = now
+            elif now - peak_time[i] >= self.peak_hold:
+                peak[i] = max(db, peak[i] - fall, METER_FLOOR_DB)
+            level = self.level(peak[i])
+            if level == sent[i] and not (level and now - sent_time[i] >= self.keepalive):
+                continue
+            surface, strip = strips[i]
+            self.send(mido.Message('aftertouch', channel=0, value=(strip - 1) * 16 + level), surface=surface)
+            sent_time[i] = now
+            if level != sent[i]:
+                sent[i] = level
+                self._broadcast({'type': 'ui_update', 'event': 'meter', 'channel': i + 1,
+                                 'value': level / len(self.segments_db)})
+
+    def _broadcast(self, message):
+        if not (self.event_loop and self.broadcast_ws):
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.broadcast_ws(message), self.event_loop)
+        except Exception as e:
+            self.logger.error(f"Failed to broadcast meter: {e}")
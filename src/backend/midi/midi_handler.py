@@ -4,11 +4,16 @@ MIDI connection and message handling for XCTL_ backend.
 Uses mido for MIDI I/O. Wraps input/output in a class for easy integration.
 """
 import os
+import asyncio
 import mido
-import threading
 import logging
 import time
 from backend.utils.user_data import get_user_data_dir
+from backend.mapping.routing import compile_midi_routes
+from backend.mapping.layer_cache import LayerCache
+from backend.midi.surface_manager import SurfaceManager, HANDSHAKE_REPLY
+from backend.utils.metrics import metrics
+from backend.utils.trace import tracer
 
 class MidiHandler:
     def get_layer_status(self):
@@ -21,64 +26,50 @@ class MidiHandler:
             'layer_names': {k: v.get('name', k) for k, v in self.layers_index.items()}
         }
 
-    def __init__(self, input_port_name, output_port_name, event_loop=None, broadcast_ws=None):
-        self.input_port_name = input_port_name
-        self.output_port_name = output_port_name
-        self.input_port = None
-        self.output_port = None
-        self.running = False
-        self.logger = logging.getLogger('MidiHandler')
-        self.event_loop = event_loop
-        self.broadcast_ws = broadcast_ws
-        self.osc = None  # Set this to an XctlOSC instance externally if OSC output is desired
-        # Use the new OS-native user preset directory and "Default" preset by default
-        preset_dir = os.path.join(get_user_data_dir(), "Default")
-        self.layers_index_path = os.path.join(preset_dir, "layer_index.json")
-        self.layers_dir = preset_dir  # Each layer file is in this folder
-        self.layers_index = {}  # Always initialize before reload_mapping
-        self.active_mapping = {}  # Always initialize before reload_mapping
-        self.active_layer = 'layer_1'  # Default active layer
-        self.reload_mapping()
-
-    def reload_mapping(self):
-        import json
+    def reload_mapping(self, changed_files=None):
+        """
+        Refresh the layer cache from disk (only files that changed are re-read
+        and recompiled) and re-apply the active layer. Meant for background
+        threads such as the preset watcher, which passes the file names it saw
+        change; layer switches never call it.
+        """
         preset_dir = os.path.join(get_user_data_dir(), "Default")
-        self.layers_index_path = os.path.join(preset_dir, "layer_index.json")
+        if self.layer_cache is None or self.layer_cache.preset_dir != preset_dir:
+            self.layer_cache = LayerCache(preset_dir)
+        self.layers_index_path = self.layer_cache.index_path
         self.layers_dir = preset_dir
         try:
-            with open(self.layers_index_path, 'r') as f:
-                layer_names = json.load(f)
-            # Build a dict: {"layer_1": {"name": ..., "file": ...}, ...}
-            self.layers_index = {
-                f"layer_{i+1}": {"name": name, "file": f"layer_{i+1}.json"}
-                for i, name in enumerate(layer_names)
-            }
+            changed = self.layer_cache.refresh(names=changed_files)
+            self.layers_index = self.layer_cache.index
             if self.active_layer not in self.layers_index:
                 self.active_layer = list(self.layers_index.keys())[0] if self.layers_index else 'layer_1'
             self._load_active_layer_mapping()
-            self.logger.info(f'Layers index reloaded. Active layer: {self.active_layer}')
+            if changed:
+                self._reset_meters()
+                self.logger.info(f'Layers index reloaded. Active layer: {self.active_layer}')
         except Exception as e:
             self.logger.error(f'Could not reload layers index: {e}')
             self.layers_index = {}
             self.active_layer = 'layer_1'
-            self.active_mapping = {}
+            self._set_active_mapping({})
 
     def _load_active_layer_mapping(self):
-        import json
-        layer_info = self.layers_index.get(self.active_layer)
-        if not layer_info:
+        # Pointer swap to the pre-compiled layer: no disk I/O, no compilation
+        layer = self.layer_cache.get(self.active_layer) if self.layer_cache else None
+        if not layer:
             self.logger.warning(f'No layer info for {self.active_layer}')
-            self.active_mapping = {}
+            self._set_active_mapping({})
             return
-        layer_file = os.path.join(self.layers_dir, layer_info["file"])
-        try:
-            with open(layer_file, 'r') as f:
-                layer_data = json.load(f)
-            self.active_mapping = layer_data.get('mappings', {})
-            self.logger.info(f'Loaded mappings for {self.active_layer} from {layer_file}')
-        except Exception as e:
-            self.logger.error(f'Could not load mapping file {layer_file}: {e}')
-            self.active_mapping = {}
+        self._midi_routes = layer.midi_routes
+        self.active_mapping = layer.mapping
+
+    def _set_active_mapping(self, mapping):
+        # Compile first, then publish both references so the MIDI thread never
+        # sees a routing table that doesn't belong to the active mapping.
+        # Only used for mappings that are not in the layer cache (e.g. errors).
+        routes = compile_midi_routes(mapping)
+        self.active_mapping = mapping
+        self._midi_routes = routes
 
     def get_active_mapping(self):
         # Return mappings dict for the active layer
@@ -88,85 +79,81 @@ class MidiHandler:
         if layer_key in self.layers_index:
             self.active_layer = layer_key
             self._load_active_layer_mapping()
+            self._reset_meters()
             self.logger.info(f'Active layer switched to: {layer_key}')
-            # DEBUG: Print active mapping summary after switching
-            mapping_keys = list(self.active_mapping.keys())
-            print(f'[DEBUG] Layer switched to: {layer_key}')
-            print(f'[DEBUG] Mapping keys: {mapping_keys}')
+            tracer.debug('layer', 'switched to %s, mapping keys %s', layer_key, list(self.active_mapping))
         else:
             self.logger.warning(f'Tried to switch to unknown layer: {layer_key}')
 
+    def _reset_meters(self):
+        # The strips may now show other channels: drop the previous layer's peaks
+        meter_engine = getattr(self.osc, 'meter_engine', None)
+        if meter_engine:
+            meter_engine.reset()
+
     def _send_full_scribble_strip(self, channel, top_text, bottom_text, color=0x07):
-        # Send full scribble (top+bottom) using the proven format
-        sysex = bytearray([0x00, 0x20, 0x32, 0x15, 0x4C, 0x20 + channel - 1, color])
+        # Send full scribble (top+bottom) using the proven format; channel is the global strip
+        located = self.surfaces.locate(channel)
+        if located is None:
+            return
+        surface, strip = located
+        sysex = bytearray([0x00, 0x20, 0x32, 0x15, 0x4C, 0x20 + strip - 1, color])
         sysex.extend(top_text.ljust(7)[:7].encode('ascii', errors='replace'))
         sysex.extend(bottom_text.ljust(7)[:7].encode('ascii', errors='replace'))
-        print(f"[DEBUG] SENDING FULL SCRIBBLE: {[hex(b) for b in sysex]}")
-        print(f"[DEBUG] Output port: {self.output_port}")
-        if self.output_port:
-            self.output_port.send(mido.Message('sysex', data=sysex))
-            print(f'[DEBUG] Sent full scribble for channel {channel}: {top_text} / {bottom_text}')
+        self.send(mido.Message('sysex', data=sysex), surface=surface)
+        tracer.debug('scribble', 'channel %s: %s / %s', channel, top_text, bottom_text)
+        self._broadcast({'type': 'ui_update', 'event': 'scribble', 'channel': channel, 'value': [top_text[:7], bottom_text[:7]]})
 
     def _send_layer_names_to_scribbles(self):
         # Defensive: avoid crash if layers_index is not set
         if not hasattr(self, 'layers_index') or not self.layers_index:
-            print("[ERROR] layers_index not initialized! Attempting reload...")
+            self.logger.error("layers_index not initialized! Attempting reload...")
             self.reload_mapping()
             if not self.layers_index:
-                print("[ERROR] layers_index still empty after reload!")
+                self.logger.error("layers_index still empty after reload!")
                 return
-        print(f"[DEBUG] self.layers_index: {self.layers_index}")
-        layer_items = list(self.layers_index.items())[:8]
+        strip_count = self.surfaces.strip_count
+        layer_items = list(self.layers_index.items())[:strip_count]
         # Show layer names for available layers
         for idx, (layer_key, layer_obj) in enumerate(layer_items):
             name = layer_obj.get('name', f'Layer {idx+1}')
-            print(f"[DEBUG] Layer {idx+1} key: {layer_key}, name: {name}")
+            tracer.debug('layer', 'layer %s key: %s, name: %s', idx + 1, layer_key, name)
             top = name[:7]
             bottom = f'Layer{idx+1}'[:7]
             self._send_full_scribble_strip(idx+1, top, bottom)
-            print(f'[DEBUG] Sent scribble strip {idx+1}: {top} / {bottom}')
         # Blank out unused scribble strips
-        for idx in range(len(layer_items), 8):
+        for idx in range(len(layer_items), strip_count):
             self._send_full_scribble_strip(idx+1, '', '')
-            print(f'[DEBUG] Blank scribble strip {idx+1}')
-        # Set only select button LEDs corresponding to available layers ON (velocity=127)
-        for idx in range(len(layer_items)):
-            note = 32 + idx
-            if self.output_port:
-                self.output_port.send(mido.Message('note_on', note=note, velocity=127))
-                print(f'[DEBUG] Set select button LED: note {note} (velocity=127)')
-        # Ensure unused select buttons are OFF
-        for idx in range(len(layer_items), 8):
-            note = 32 + idx
-            if self.output_port:
-                self.output_port.send(mido.Message('note_on', note=note, velocity=0))
-                print(f'[DEBUG] Set select button LED: note {note} (velocity=0)')
+        # Select button LEDs ON (velocity=127) for available layers, OFF for the rest
+        for idx, (surface, strip) in enumerate(self.surfaces.strips):
+            velocity = 127 if idx < len(layer_items) else 0
+            self.send(mido.Message('note_on', note=31 + strip, velocity=velocity), surface=surface)
 
     def _restore_scribbles(self):
         # Restore scribble strips to normal channel display (implementation depends on your setup)
         # Here, just send a placeholder (could be improved to restore actual channel names)
         active_mapping = self.get_active_mapping()
-        for idx in range(8):
+        for idx in range(self.surfaces.strip_count):
             channel_name = f'Ch {idx+1}'
             self._send_scribble_strip(idx+1, channel_name)
-            print(f'[DEBUG] Restored scribble strip {idx+1}: {channel_name}')
         # Turn off select button LEDs
-        for note in range(32, 40):
-            if self.output_port:
-                msg = mido.Message('note_on', note=note, velocity=0)
-                self.output_port.send(msg)
-                print(f'[DEBUG] Turned off select button LED: note {note}')
+        for surface, strip in self.surfaces.strips:
+            msg = mido.Message('note_on', note=31 + strip, velocity=0)
+            self.send(msg, surface=surface)
 
-    import time
     def _send_scribble_strip(self, channel, text, color=0x07):
-        # Send SysEx for scribble strip (channel: 1-8, text: up to 7 chars, using new header)
-        sysex = bytearray([0x00, 0x20, 0x32, 0x15, 0x4C, 0x20 + channel - 1, color])
+        # Send SysEx for scribble strip (channel: global strip, text: up to 7 chars, using new header)
+        located = self.surfaces.locate(channel)
+        if located is None:
+            return
+        surface, strip = located
+        sysex = bytearray([0x00, 0x20, 0x32, 0x15, 0x4C, 0x20 + strip - 1, color])
         text_bytes = text.encode('ascii', errors='replace')[:7].ljust(7, b' ')
         sysex.extend(text_bytes)
         sysex.extend(b'       ')  # pad bottom row with spaces (for 14-byte format)
-        if self.output_port:
-            self.output_port.send(mido.Message('sysex', data=sysex))
-            print(f'[DEBUG] Sent NEW scribble SysEx for channel {channel}: {text}')
+        self.send(mido.Message('sysex', data=sysex), surface=surface)
+        tracer.debug('scribble', 'channel %s: %s', channel, text)
+        self._broadcast({'type': 'ui_update', 'event': 'scribble', 'channel': channel, 'value': [text[:7], '']})
 
     def _notify_layer_change(self, layer_key):
         # Notify frontend/UI via WebSocket
@@ -185,218 +172,267 @@ class MidiHandler:
             self.logger.error(f'Failed to notify frontend of layer change: {e}')
 
 
-    def open(self):
-        self.logger.info(f"Opening MIDI ports: IN={self.input_port_name}, OUT={self.output_port_name}")
-        available_inputs = mido.get_input_names()
-        available_outputs = mido.get_output_names()
+    def open(self, input_port=None, output_port=None, ports=None):
+        """
+        Open every configured surface by port name, or use already opened mido
+        ports (e.g. a simulated X-Touch): input_port/output_port for the first
+        unit, or ports=[(input, output), ...] by unit.
+        """
+        if ports is None and input_port is not None and output_port is not None:
+            ports = [(input_port, output_port)]
+        self.surfaces.open(ports)
+        self.running = True
+        if self.input_mode == 'async' and self.event_loop:
+            self.logger.info("MIDI input in async mode")
 
-        # Handle input port
-        if not self.input_port_name or self.input_port_name not in available_inputs:
-            if available_inputs:
-                self.logger.warning(f"Input port '{self.input_port_name}' not available. Using '{available_inputs[0]}' instead.")
-                self.input_port_name = available_inputs[0]
-            else:
-                raise RuntimeError("No available MIDI input ports found.")
+    # The first unit's ports and scheduler (single-surface setups, status)
+    @property
+    def input_port_name(self):
+        return self.surfaces.main.input_port_name
 
-        # Handle output port
-        if not self.output_port_name or self.output_port_name not in available_outputs:
-            if available_outputs:
-                self.logger.warning(f"Output port '{self.output_port_name}' not available. Using '{available_outputs[0]}' instead.")
-                self.output_port_name = available_outputs[0]
-            else:
-                raise RuntimeError("No available MIDI output ports found.")
+    @property
+    def output_port_name(self):
+        return self.surfaces.main.output_port_name
 
-        self.input_port = mido.open_input(self.input_port_name)
-        self.output_port = mido.open_output(self.output_port_name)
-        self.running = True
-        self.thread = threading.Thread(target=self._listen, daemon=True)
-        self.thread.start()
-
-        # Start handshake thread for X-Touch
-        self._handshake_thread = threading.Thread(target=self._send_handshake_loop, daemon=True)
-        self._handshake_thread.start()
-
-    def _send_handshake_loop(self):
-        # Send the required handshake SysEx every 6 seconds
-        sysex = bytearray([0x00, 0x00, 0x66, 0x14, 0x00])
-        while self.running:
-            try:
-                if self.output_port:
-                    self.output_port.send(mido.Message('sysex', data=sysex))
-                    self.logger.info(f"[HANDSHAKE] Sent: {[hex(b) for b in sysex]}")
-            except Exception as e:
-                self.logger.error(f"[HANDSHAKE] Failed to send: {e}")
-            time.sleep(6)
-
-    def _listen(self):
-        self.logger.info("MIDI listener started")
-        for msg in self.input_port:
-            self.handle_message(msg)
-            if not self.running:
-                break
+    @property
+    def input_port(self):
+        return self.surfaces.main.input_port
+
+    @property
+    def output_port(self):
+        return self.surfaces.main.output_port
+
+    @property
+    def scheduler(self):
+        return self.surfaces.main.scheduler
+
+    @property
+    def input_dropped(self):
+        return self.surfaces.input_dropped
+
+    @property
+    def strip_count(self):
+        return self.surfaces.strip_count
 
     # --- Layer selection mode state ---
     _LAYER_SELECT_NOTES = set(range(32, 40))  # select_1 to select_8
     _REC_1_NOTE = 8
     _REC_8_NOTE = 15
 
-    def __init__(self, input_port_name, output_port_name, event_loop=None, broadcast_ws=None):
-        self.input_port_name = input_port_name
-        self.output_port_name = output_port_name
-        self.input_port = None
-        self.output_port = None
+    # --- Motor faders (14-bit pitch bend on MIDI channels 1-9) ---
+    _FADER_TOUCH_NOTE_BASE = 104  # touch sense: notes 104-112 -> faders on MIDI channels 0-8
+    _FADER_TOUCH_NOTES = set(range(104, 113))
+    MOTOR_ECHO_WINDOW = 0.25  # seconds a motor write is remembered for echo suppression
+    MOTOR_ECHO_TOLERANCE = 64  # pitch units (of 16384) treated as "the value we wrote"
+
+    def __init__(self, input_port_name, output_port_name, event_loop=None, broadcast_ws=None, min_send_interval=0.001,
+                 input_mode='thread', publish=None, surfaces=None):
+        self.min_send_interval = min_send_interval  # X-Touch needs >= 1 ms between messages
         self.running = False
         self.logger = logging.getLogger('MidiHandler')
         self.event_loop = event_loop
         self.broadcast_ws = broadcast_ws
+        # Synchronous publisher (WebSocketHub.publish) used instead of
+        # run_coroutine_threadsafe when already running on the event loop
+        self.publish = publish
+        # 'thread': blocking iterator on a listener thread; 'async': port callback
+        # feeding a ring buffer that the event loop drains in batches
+        self.input_mode = input_mode
+        # One port pair per unit (midi.surfaces); without surfaces, the single
+        # input_port_name/output_port_name pair
+        configs = surfaces or [{'name': 'main', 'input_port': input_port_name, 'output_port': output_port_name}]
+        self.surfaces = SurfaceManager(configs, self.handle_message, event_loop=event_loop, input_mode=input_mode,
+                                       min_send_interval=min_send_interval)
         self.osc = None  # Set this to an XctlOSC instance externally if OSC output is desired
         self.mapping_path = os.path.join(os.path.dirname(__file__), '..', 'mapping', 'active_mapping.json')
         self.layers = {}  # All layers loaded from file
+        self.layer_cache = None  # LayerCache of the active preset, built by reload_mapping()
+        self.layers_index = {}
+        self.active_mapping = {}
+        self.trace_topics = set()  # WebSocket trace topics with subscribers (shared with the hub)
+        self._midi_routes = {}  # (surface, msg_type, midi_channel, cc/note) -> MidiRoute
         self.active_layer = 'layer_1'  # Default active layer
         self.reload_mapping()
-        self._pressed_notes = set()
+        self._pressed_notes = set()  # (surface, note)
         self._in_layer_select_mode = False
+        self._touched_faders = set()  # (surface, MIDI channel) of faders under a finger
+        self._motor_positions = {}  # (surface, MIDI channel) -> (pitch, monotonic time) last written to the motor
+        self._deferred_motor = {}  # (surface, MIDI channel) -> pitch received from OSC while touched
 
-    def handle_message(self, msg):
-        from backend.utils.value_mapping import remap_from_mapping
-        print(f"MIDI RECEIVED: {msg}")
-        self.logger.debug(f"Received MIDI: {msg}")
+    def handle_message(self, msg, stamp=0, surface=0):
+        """Handle one message from unit `surface` (index in self.surfaces)."""
+        if not stamp and metrics.enabled:
+            stamp = metrics.stamp()
+        tracer.debug('midi', 'in %s', msg)
         midi_dict = msg.dict() if hasattr(msg, 'dict') else None
         ui_update = None
-        active_mapping = self.active_mapping
+
+        # --- Unit (re)connected: it shows nothing we wrote before ---
+        if msg.type == 'sysex' and tuple(msg.data[:3]) == HANDSHAKE_REPLY and msg.data[4:5] == (0x01,):
+            self.surfaces.invalidate(surface)
+            tracer.info('handshake', 'surface %s connected', surface)
+
+        # --- Fader touch sense ---
+        if msg.type in ('note_on', 'note_off') and msg.note in self._FADER_TOUCH_NOTES:
+            self._update_fader_touch((surface, msg.note - self._FADER_TOUCH_NOTE_BASE),
+                                     msg.type == 'note_on' and msg.velocity > 0)
 
         # --- Layer select mode logic ---
         if midi_dict and midi_dict.get('type') in ('note_on', 'note_off'):
             note = midi_dict.get('note')
             velocity = midi_dict.get('velocity', 0)
             if midi_dict['type'] == 'note_on' and velocity > 0:
-                self._pressed_notes.add(note)
+                self._pressed_notes.add((surface, note))
             else:
-                self._pressed_notes.discard(note)
+                self._pressed_notes.discard((surface, note))
 
-            # Enter layer-select mode when BOTH rec_1 and rec_8 are pressed
+            # Enter layer-select mode when BOTH rec_1 and rec_8 of one unit are pressed
             if not self._in_layer_select_mode:
-                if self._REC_1_NOTE in self._pressed_notes and self._REC_8_NOTE in self._pressed_notes:
+                if (surface, self._REC_1_NOTE) in self._pressed_notes and (surface, self._REC_8_NOTE) in self._pressed_notes:
                     self._in_layer_select_mode = True
-                    print('[DEBUG] Entered layer-select mode')
-                    self.logger.info('Entered layer-select mode')
+                    tracer.info('layer', 'entered layer-select mode')
                     self._send_layer_names_to_scribbles()
                     return
 
-            # If in layer select mode, detect select_1 to select_8 press
+            # If in layer select mode, detect a select button press on any unit
             if self._in_layer_select_mode:
                 if midi_dict['type'] == 'note_on' and note in self._LAYER_SELECT_NOTES:
-                    layer_idx = note - 32  # select_1 (32) -> 0, ... select_8 (39) -> 7
+                    # select_1 (32) -> 0, ... select_8 (39) -> 7, then on through the extenders' strips
+                    layer_idx = self.surfaces.strip(surface, note - 31) - 1
                     # Use self.layers_index for deterministic button-to-layer mapping
                     layer_keys = list(self.layers_index.keys())
                     if 0 <= layer_idx < len(layer_keys):
                         self.set_active_layer(layer_keys[layer_idx])
-                        self.reload_mapping()
                         # Notify frontend/UI (send only one correct message)
                         if self.broadcast_ws and self.event_loop:
-                            try:
-                                import asyncio
-                                layer_names = {k: v.get('name', k) for k, v in self.layers_index.items()}
-                                mapping_keys = list(self.active_mapping.keys()) if hasattr(self, 'active_mapping') and self.active_mapping else []
-                                debug_msg = {
-                                    'type': 'layer_change',
-                                    'active_layer': layer_keys[layer_idx],
-                                    'layer_names': layer_names,
-                                    'mapping_keys': mapping_keys
-                                }
-                                print(f'[DEBUG] Broadcasting layer_change: {debug_msg}')
-                                future = asyncio.run_coroutine_threadsafe(self.broadcast_ws(debug_msg), self.event_loop)
-                                try:
-                                    future.result()
-                                except Exception as e:
-                                    print(f'[DEBUG] Failed to broadcast layer_change: {e}')
-                            except Exception as e:
-                                print(f'[DEBUG] Exception in layer_change broadcast: {e}')
+                            layer_names = {k: v.get('name', k) for k, v in self.layers_index.items()}
+                            mapping_keys = list(self.active_mapping.keys()) if self.active_mapping else []
+                            debug_msg = {
+                                'type': 'layer_change',
+                                'active_layer': layer_keys[layer_idx],
+                                'layer_names': layer_names,
+                                'mapping_keys': mapping_keys
+                            }
+                            tracer.debug('layer', 'broadcasting layer_change: %s', debug_msg)
+                            # Fire and forget: never wait on the event loop from the input path
+                            self._broadcast(debug_msg)
                     self._restore_scribbles()
                     self._in_layer_select_mode = False
-                    print('[DEBUG] Exited layer-select mode (layer selected)')
-                    self.logger.info('Exited layer-select mode (layer selected)')
+                    tracer.info('layer', 'exited layer-select mode (layer selected)')
                     return
                 # Do NOT exit mode on rec_1/rec_8 release; only exit on layer select.
 
         # --- Normal mapping logic ---
-        if midi_dict:
-            if midi_dict.get('type') == 'control_change':
-                for key, entry in active_mapping.items():
-                    if entry.get('midi_cc') == midi_dict.get('control'):
-                        try:
-                            channel = int(key.split('_')[1])
-                        except (IndexError, ValueError):
-                            channel = 1
-                        value = midi_dict.get('value', 0)
-                        ui_update = {
-                            'type': 'ui_update',
-                            'event': key.split('_')[0],
-                            'channel': channel,
-                            'value': value
-                        }
-                        osc_address = entry.get('osc')
-                        if osc_address and self.osc:
-                            from backend.utils.value_mapping import remap_from_mapping
-                            osc_value = remap_from_mapping(value, entry, direction="midi_to_osc")
-                            self.osc.send_message(osc_address, osc_value)
-                        break
-            elif midi_dict.get('type') in ('note_on', 'note_off'):
-                for key, entry in active_mapping.items():
-                    if entry.get('midi_note') == midi_dict.get('note'):
-                        try:
-                            channel = int(key.split('_')[1])
-                        except (IndexError, ValueError):
-                            channel = 1
-                        if midi_dict.get('type') == 'note_on':
-                            midi_val = midi_dict.get('velocity', 127)
-                        else:
-                            midi_val = 0
-                        value = True if midi_val == 127 else False
-                        ui_update = {
-                            'type': 'ui_update',
-                            'event': key.split('_')[0],
-                            'channel': channel,
-                            'value': value
-                        }
-                        osc_address = entry.get('osc')
-                        if osc_address and self.osc:
-                            from backend.utils.value_mapping import remap_from_mapping
-                            osc_value = remap_from_mapping(midi_val, entry, direction="midi_to_osc")
-                            self.osc.send_message(osc_address, osc_value)
-                        break
-
-        # Broadcast to WebSocket clients (threadsafe)
+        if msg.type == 'control_change':
+            route = self._midi_routes.get((surface, 'control_change', msg.channel, msg.control))
+            if route:
+                value = msg.value
+                ui_update = {
+                    'type': 'ui_update',
+                    'event': route.event,
+                    'channel': route.channel,
+                    'value': value
+                }
+                if route.osc and self.osc:
+                    self.osc.send_message(route.osc, route.to_osc(value), coalesce=True, window=route.coalesce_window,
+                                          target=route.target, stamp=stamp)
+        elif msg.type in ('note_on', 'note_off'):
+            route = self._midi_routes.get((surface, msg.type, msg.channel, msg.note))
+            if route:
+                midi_val = msg.velocity if msg.type == 'note_on' else 0
+                ui_update = {
+                    'type': 'ui_update',
+                    'event': route.event,
+                    'channel': route.channel,
+                    'value': midi_val == 127
+                }
+                if route.osc and self.osc:
+                    self.osc.send_message(route.osc, route.to_osc(midi_val), target=route.target, stamp=stamp)
+        elif msg.type == 'pitchwheel':
+            # The fader moved under a finger (or the motor): the device no longer
+            # shows the last position we wrote, so the next write must go out
+            self.surfaces.invalidate(surface, ('pitch', msg.channel))
+            if self._is_motor_echo((surface, msg.channel), msg.pitch):
+                return
+            route = self._midi_routes.get((surface, 'pitchwheel', msg.channel, None))
+            if route:
+                ui_update = {
+                    'type': 'ui_update',
+                    'event': route.event,
+                    'channel': route.channel,
+                    'value': (msg.pitch + 8192) >> 7  # UI faders are 7-bit
+                }
+                if route.osc and self.osc:
+                    self.osc.send_message(route.osc, route.to_osc(msg.pitch), coalesce=True, window=route.coalesce_window,
+                                          target=route.target, stamp=stamp)
+
+        # Broadcast to WebSocket clients (threadsafe). Unmapped traffic (pings,
+        # unassigned buttons) is only traced when a client subscribed to 'midi'.
+        if ui_update:
+            self._broadcast(ui_update)
+        elif 'midi' in self.trace_topics:
+            self._broadcast({
+                'type': 'midi',
+                'message': str(msg),
+                'data': msg.dict()
+            })
+
+    def _broadcast(self, message):
+        if self.publish and self.input_mode == 'async' and self._on_loop_thread():
+            self.publish(message)
+            return
+        if not (self.event_loop and self.broadcast_ws):
+            return
         try:
-            import asyncio
-            if self.event_loop and self.broadcast_ws:
-                if ui_update:
-                    asyncio.run_coroutine_threadsafe(
-                        self.broadcast_ws(ui_update),
-                        self.event_loop
-                    )
-                else:
-                    asyncio.run_coroutine_threadsafe(
-                        self.broadcast_ws({
-                            'type': 'midi',
-                            'message': str(msg),
-                            'data': midi_dict
-                        }),
-                        self.event_loop
-                    )
-            else:
-                self.logger.error("No event loop or broadcast_ws provided for MIDI broadcast.")
+            asyncio.run_coroutine_threadsafe(self.broadcast_ws(message), self.event_loop)
         except Exception as e:
             self.logger.error(f"Failed to broadcast MIDI: {e}")
 
-    def send(self, msg):
-        self.logger.debug(f"Sending MIDI: {msg}")
-        self.output_port.send(msg)
+    def _on_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self.event_loop
+        except RuntimeError:
+            return False
+
+    def send_fader(self, midi_channel, pitch, stamp=0, surface=0):
+        """
+        Move a motor fader to a 14-bit position (mido pitch, -8192..8191).
+        While the fader is touched the write is held back so it doesn't fight the
+        user's finger; the latest held value is applied on release.
+        """
+        fader = (surface, midi_channel)
+        if fader in self._touched_faders:
+            self._deferred_motor[fader] = pitch
+            return False
+        self._motor_positions[fader] = (pitch, time.monotonic())
+        self.send(mido.Message('pitchwheel', channel=midi_channel, pitch=pitch), stamp, surface)
+        return True
+
+    def _update_fader_touch(self, fader, touched):
+        self.surfaces.invalidate(fader[0], ('pitch', fader[1]))
+        if touched:
+            self._touched_faders.add(fader)
+            return
+        self._touched_faders.discard(fader)
+        pitch = self._deferred_motor.pop(fader, None)
+        if pitch is not None:
+            self.send_fader(fader[1], pitch, surface=fader[0])
+
+    def _is_motor_echo(self, fader, pitch):
+        # A fader nobody is touching that reports (close to) the position we just
+        # drove it to is the motor, not the user: don't bounce it back to OSC.
+        if fader in self._touched_faders:
+            return False
+        written = self._motor_positions.get(fader)
+        return (written is not None
+                and time.monotonic() - written[1] < self.MOTOR_ECHO_WINDOW
+                and abs(pitch - written[0]) <= self.MOTOR_ECHO_TOLERANCE)
+
+    def send(self, msg, stamp=0, surface=0):
+        """Queue a message for unit `surface` through its paced, de-duplicating scheduler."""
+        self.surfaces.send(msg, stamp, surface)
 
     def close(self):
         self.running = False
-        if self.input_port:
-            self.input_port.close()
-        if self.output_port:
-            self.output_port.close()
+        self.surfaces.close()
         self.logger.info("MIDI ports closed")
@@ -0,0 +1,161 @@
+# midi_scheduler.py
+"""
+Outbound MIDI scheduler for the X-Touch.
+Shadows what is currently shown on the device (LEDs, rings, motor faders,
+scribble strips, meters), drops writes that would not change anything, merges
+pending updates to the same target and paces output to the device's rate limit
+(>= 1 ms between messages) with priority classes.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from backend.utils.capture import capture, MIDI_OUT
+from backend.utils.metrics import metrics
+
+# Priority classes, highest first. Meters are last so they can never starve LEDs.
+PRIORITY_SYSTEM = 0   # handshake and other non-display SysEx
+PRIORITY_BUTTON = 1   # button LEDs (note on/off)
+PRIORITY_CONTROL = 2  # encoder rings, 7-segment, motor faders, scribble strips
+PRIORITY_METER = 3    # channel-pressure meters
+PRIORITIES = (PRIORITY_SYSTEM, PRIORITY_BUTTON, PRIORITY_CONTROL, PRIORITY_METER)
+
+SCRIBBLE_HEADER = (0x00, 0x20, 0x32, 0x15, 0x4C)
+
+
+def classify(msg):
+    """
+    Return (target, priority) for an outbound message. target identifies the
+    physical element the message drives, or None if it must always be sent.
+    """
+    msg_type = msg.type
+    if msg_type in ('note_on', 'note_off'):
+        return ('note', msg.channel, msg.note), PRIORITY_BUTTON
+    if msg_type == 'control_change':
+        return ('cc', msg.channel, msg.control), PRIORITY_CONTROL
+    if msg_type == 'pitchwheel':
+        return ('pitch', msg.channel), PRIORITY_CONTROL
+    if msg_type == 'aftertouch':
+        # X-Touch meters: value = meter index * 16 + level
+        return ('meter', msg.channel, msg.value >> 4), PRIORITY_METER
+    if msg_type == 'sysex':
+        data = msg.data
+        if len(data) > 6 and tuple(data[:5]) == SCRIBBLE_HEADER:
+            return ('scribble', data[5]), PRIORITY_CONTROL
+        return None, PRIORITY_SYSTEM
+    return None, PRIORITY_CONTROL
+
+
+class MidiOutScheduler:
+    """
+    Single writer thread in front of a mido output port.
+
+    submit() never blocks on the port. Pending updates are kept per priority
+    class, keyed by target (latest wins), and a write equal to what the device
+    already shows is skipped. Meters are never skipped against the shadow
+    because the device decays them on its own.
+    """
+
+    def __init__(self, output_port, min_interval=0.001, name='MidiOutScheduler', surface=0):
+        self.output_port = output_port
+        self.min_interval = min_interval
+        self.surface = surface  # index of the unit behind output_port (for captures)
+        self.logger = logging.getLogger(name)
+        self.shadow = {}  # target -> bytes last written to the device
+        self._generation = 0  # bumped by invalidate(): shadow writes from before it are stale
+        self.sent = 0
+        self.skipped = 0
+        self.merged = 0
+        self._cond = threading.Condition()
+        self._pending = [OrderedDict() for _ in PRIORITIES]
+        self._seq = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, msg, stamp=0):
+        """Queue msg for the device; stamp is the metrics entry stamp of the OSC input behind it."""
+        target, priority = classify(msg)
+        data = msg.bytes()
+        with self._cond:
+            pending = self._pending[priority]
+            if target is None:
+                self._seq += 1
+                key = self._seq
+            else:
+                key = target
+                if key in pending:
+                    self.merged += 1
+                    pending[key] = (target, msg, data, stamp)
+                    return
+                if priority != PRIORITY_METER and self.shadow.get(target) == data:
+                    self.skipped += 1
+                    return
+            pending[key] = (target, msg, data, stamp)
+            self._cond.notify()
+
+    def invalidate(self, target=None):
+        """Forget what the device shows (all targets, or one) so the next write goes out."""
+        with self._cond:
+            self._generation += 1
+            if target is None:
+                self.shadow.clear()
+            else:
+                self.shadow.pop(target, None)
+
+    def queue_depth(self):
+        return sum(len(p) for p in self._pending)
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        next_slot = 0.0
+        while True:
+            with self._cond:
+                while self._running and not any(self._pending):
+                    self._cond.wait()
+                if not self._running:
+                    return
+            # Wait for the next slot outside the lock so updates keep merging meanwhile
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._cond:
+                item = self._take()
+                generation = self._generation
+            if item is None:
+                continue
+            target, msg, data, stamp = item
+            try:
+                self.output_port.send(msg)
+                self.sent += 1
+                if target is not None:
+                    with self._cond:
+                        # An invalidation since the dequeue means the device may no
+                        # longer show this: leave the target unknown
+                        if self._generation == generation:
+                            self.shadow[target] = data
+                if stamp:
+                    metrics.observe('osc_to_midi', stamp)
+                if capture.active:
+                    capture.record(MIDI_OUT, msg, self.surface)
+            except Exception as e:
+                self.logger.error(f"MIDI send failed: {e}")
+            next_slot = time.monotonic() + self.min_interval
+
+    def _take(self):
+        for pending in self._pending:
+            while pending:
+                _, item = pending.popitem(last=False)
+                target, msg, data, _ = item
+                # A pending update may have been reverted (e.g. LED on then off)
+                if target is not None and msg.type != 'aftertouch' and self.shadow.get(target) == data:
+                    self.skipped += 1
+                    continue
+                return item
+        return None
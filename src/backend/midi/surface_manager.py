@@ -0,0 +1,293 @@
+# surface_manager.py
+"""
+Several X-Touch units (e.g. an X-Touch plus X-Touch Extenders) driven as one
+control surface.
+
+Each Surface owns one MIDI port pair with its own input listener (thread or
+async ring buffer), handshake thread and paced MidiOutScheduler, so a unit
+whose port stalls or disappears never holds up the others. SurfaceManager
+lays the units' strips end to end: with an X-Touch and two Extenders, strips
+1-8 are the X-Touch, 9-16 the first Extender and 17-24 the second.
+
+Configured with midi.surfaces (in order):
+    surfaces:
+      - {name: xtouch, input_port: ..., output_port: ...}
+      - {name: ext1, input_port: ..., output_port: ..., strips: 8}
+Without it, midi.input_port/output_port is the only unit. Mapping entries
+name the strip globally in their key and pick their unit with "surface"
+(index in that list, default 0), keeping that unit's own MIDI addressing:
+    "fader_12": {"surface": 1, "midi_pitchbend": true, "midi_channel": 3, ...}
+Meters ("meter_12") and scribble strips need no "surface"; they go to the
+unit that holds the key's strip.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import mido
+
+from backend.midi.midi_scheduler import MidiOutScheduler
+from backend.utils.capture import capture, MIDI_IN, MIDI_OUT
+from backend.utils.metrics import metrics
+from backend.utils.trace import tracer
+
+STRIPS_PER_SURFACE = 8
+HANDSHAKE_SYSEX = (0x00, 0x00, 0x66, 0x14, 0x00)
+HANDSHAKE_REPLY = (0x00, 0x00, 0x66)  # + model id, 0x01: the unit answered / (re)connected
+HANDSHAKE_INTERVAL = 6.0  # seconds
+
+
+class Surface:
+    """One unit: a MIDI port pair with its own listener, handshake and output scheduler."""
+
+    INPUT_BUFFER_SIZE = 4096  # async mode: messages buffered between loop wakeups
+
+    def __init__(self, index, name, input_port_name, output_port_name, handle, strips=STRIPS_PER_SURFACE,
+                 offset=0, event_loop=None, input_mode='thread', min_send_interval=0.001):
+        self.index = index
+        self.name = name
+        self.input_port_name = input_port_name
+        self.output_port_name = output_port_name
+        self.handle = handle  # callable(msg, stamp, surface index)
+        self.strips = strips
+        self.offset = offset  # global strip number of this unit's first strip, minus one
+        self.event_loop = event_loop
+        self.input_mode = input_mode
+        self.min_send_interval = min_send_interval
+        self.input_port = None
+        self.output_port = None
+        self.scheduler = None  # MidiOutScheduler, created in open()
+        self.running = False
+        self.thread = None
+        self.logger = logging.getLogger(f'Surface.{name}')
+        self._inbox = deque(maxlen=self.INPUT_BUFFER_SIZE)
+        self._drain_scheduled = False
+        self.input_dropped = 0
+
+    def open(self, input_port=None, output_port=None, fallback=False):
+        """
+        Open the configured ports by name, or use already opened mido ports.
+        With fallback, a missing port is replaced by the first available one
+        (only sensible for a single unit).
+        """
+        if input_port is not None and output_port is not None:
+            self.input_port_name, self.output_port_name = input_port.name, output_port.name
+        self.logger.info(f"Opening MIDI ports: IN={self.input_port_name}, OUT={self.output_port_name}")
+        if output_port is None or input_port is None:
+            self.input_port_name = self._resolve(self.input_port_name, mido.get_input_names(), 'input', fallback)
+            self.output_port_name = self._resolve(self.output_port_name, mido.get_output_names(), 'output', fallback)
+
+        if self.scheduler is not None:
+            self.scheduler.stop()  # reopened: the fresh scheduler starts with an empty shadow
+            self.scheduler = None
+        async_input = self.input_mode == 'async' and self.event_loop
+        try:
+            self.output_port = output_port or mido.open_output(self.output_port_name)
+            if async_input:
+                # Port callback -> ring buffer -> batched drain on the event loop
+                if input_port is not None:
+                    input_port.callback = self._on_input
+                    self.input_port = input_port
+                else:
+                    self.input_port = mido.open_input(self.input_port_name, callback=self._on_input)
+            else:
+                self.input_port = input_port or mido.open_input(self.input_port_name)
+        except Exception:
+            self.close()
+            raise
+
+        # Both ports are open: only now start sending and listening
+        self.scheduler = MidiOutScheduler(self.output_port, min_interval=self.min_send_interval,
+                                          name=f'MidiOut.{self.name}', surface=self.index)
+        self.running = True
+        if not async_input:
+            self.thread = threading.Thread(target=self._listen, name=f'MidiIn.{self.name}', daemon=True)
+            self.thread.start()
+
+        # Start handshake thread for X-Touch
+        self._handshake_thread = threading.Thread(target=self._send_handshake_loop,
+                                                  name=f'Handshake.{self.name}', daemon=True)
+        self._handshake_thread.start()
+
+    def _resolve(self, port_name, available, direction, fallback):
+        if port_name and port_name in available:
+            return port_name
+        if fallback and available:
+            self.logger.warning(f"{direction.capitalize()} port '{port_name}' not available. Using '{available[0]}' instead.")
+            return available[0]
+        if fallback:
+            raise RuntimeError(f"No available MIDI {direction} ports found.")
+        raise RuntimeError(f"MIDI {direction} port '{port_name}' not available.")
+
+    def _send_handshake_loop(self):
+        # Send the required handshake SysEx every 6 seconds
+        sysex = bytearray(HANDSHAKE_SYSEX)
+        while self.running:
+            try:
+                self.send(mido.Message('sysex', data=sysex))
+                tracer.debug('handshake', '%s: sent %s', self.name, sysex)
+            except Exception as e:
+                self.logger.error(f"[HANDSHAKE] Failed to send: {e}")
+            time.sleep(HANDSHAKE_INTERVAL)
+
+    def _listen(self):
+        self.logger.info("MIDI listener started")
+        for msg in self.input_port:
+            if capture.active:
+                capture.record(MIDI_IN, msg, self.index)
+            try:
+                self.handle(msg, 0, self.index)
+            except Exception as e:
+                self.logger.error(f"MIDI input handling failed: {e} | {msg}")
+            if not self.running:
+                break
+
+    def _on_input(self, msg):
+        """
+        Port callback (MIDI backend thread, async mode). Only appends to the ring
+        buffer; the loop is woken once per burst, not once per message.
+        """
+        if capture.active:
+            capture.record(MIDI_IN, msg, self.index)
+        inbox = self._inbox
+        if len(inbox) == inbox.maxlen:
+            self.input_dropped += 1  # the append below evicts the oldest message
+        inbox.append((msg, metrics.stamp()))
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            try:
+                self.event_loop.call_soon_threadsafe(self._drain_input)
+            except RuntimeError:
+                self._drain_scheduled = False  # loop closed (shutting down)
+
+    def _drain_input(self):
+        """Handle every buffered message in one event loop callback."""
+        # Clear the flag before draining: a message appended from here on
+        # either gets drained below or schedules a new drain.
+        self._drain_scheduled = False
+        inbox = self._inbox
+        handle, index = self.handle, self.index
+        while inbox and self.running:
+            msg, stamp = inbox.popleft()
+            try:
+                handle(msg, stamp, index)
+            except Exception as e:
+                self.logger.error(f"MIDI input handling failed: {e} | {msg}")
+
+    def send(self, msg, stamp=0):
+        """Queue a message for the unit; dropped while its ports are not open."""
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.submit(msg, stamp)
+        elif self.output_port is not None:
+            self.output_port.send(msg)
+            if capture.active:
+                capture.record(MIDI_OUT, msg, self.index)
+
+    def close(self):
+        self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+        for port in (self.input_port, self.output_port):
+            if port:
+                try:
+                    port.close()
+                except Exception as e:
+                    self.logger.error(f"Error closing MIDI port: {e}")
+        self.input_port = self.output_port = None
+
+    def status(self):
+        return {
+            'name': self.name,
+            'input_port': self.input_port_name,
+            'output_port': self.output_port_name,
+            'strips': [self.offset + 1, self.offset + self.strips],
+            'running': self.running,
+            'input_dropped': self.input_dropped,
+        }
+
+
+class SurfaceManager:
+    """The configured units, in order, and the global strip numbering across them."""
+
+    def __init__(self, configs, handle, event_loop=None, input_mode='thread', min_send_interval=0.001):
+        self.logger = logging.getLogger('SurfaceManager')
+        self.surfaces = []
+        offset = 0
+        for index, cfg in enumerate(configs):
+            strips = int(cfg.get('strips') or STRIPS_PER_SURFACE)
+            self.surfaces.append(Surface(index, cfg.get('name') or f'surface_{index + 1}', cfg.get('input_port'),
+                                         cfg.get('output_port'), handle, strips=strips, offset=offset,
+                                         event_loop=event_loop, input_mode=input_mode,
+                                         min_send_interval=min_send_interval))
+            offset += strips
+        self.strip_count = offset
+        # Global strip n (1-based) -> (surface index, strip on that unit, 1-based) at strips[n - 1]
+        self.strips = [(s.index, local) for s in self.surfaces for local in range(1, s.strips + 1)]
+
+    @property
+    def main(self):
+        return self.surfaces[0]
+
+    def locate(self, strip):
+        """(surface index, strip on that unit) for a global 1-based strip, or None."""
+        if 1 <= strip <= self.strip_count:
+            return self.strips[strip - 1]
+        return None
+
+    def strip(self, surface, local):
+        """Global strip number of strip `local` (1-based) on unit `surface`."""
+        return self.surfaces[surface].offset + local
+
+    def open(self, ports=None):
+        """
+        Open every unit; ports is an optional [(input, output), ...] of already
+        opened mido ports by unit. The first unit must open (its errors are
+        raised); a unit after it that fails is logged and left closed.
+        """
+        for surface in self.surfaces:
+            input_port, output_port = ports[surface.index] if ports and surface.index < len(ports) else (None, None)
+            if surface.index == 0:
+                surface.open(input_port, output_port, fallback=len(self.surfaces) == 1)
+                continue
+            try:
+                surface.open(input_port, output_port)
+            except Exception as e:
+                self.logger.error(f"Could not open surface '{surface.name}': {e}")
+
+    def send(self, msg, stamp=0, surface=0):
+        surfaces = self.surfaces
+        if surface < len(surfaces):
+            surfaces[surface].send(msg, stamp)
+
+    def invalidate(self, surface, target=None):
+        """Forget what unit `surface` shows (all targets, or one) so the next write to it goes out."""
+        surfaces = self.surfaces
+        if surface < len(surfaces):
+            scheduler = surfaces[surface].scheduler
+            if scheduler is not None:
+                scheduler.invalidate(target)
+
+    def close(self):
+        for surface in self.surfaces:
+            surface.close()
+
+    @property
+    def running(self):
+        return any(s.running for s in self.surfaces)
+
+    @property
+    def input_dropped(self):
+        return sum(s.input_dropped for s in self.surfaces)
+
+    def queue_depths(self):
+        """{'midi_in': {name: depth}, 'midi_out': {name: depth}} for the metrics gauges."""
+        return {
+            'midi_in': {s.name: len(s._inbox) for s in self.surfaces},
+            'midi_out': {s.name: s.scheduler.queue_depth() for s in self.surfaces if s.scheduler is not None},
+        }
+
+    def status(self):
+        return [s.status() for s in self.surfaces]
@@ -0,0 +1,348 @@
+# osc_sender.py
+"""
+Background OSC sender for XCTL_ backend.
+Callers (MIDI listener, WebSocket handlers) only enqueue; a single worker thread
+owns the UDP socket, encodes and sends, and reconnects with backoff on failure.
+"""
+import errno
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.parsing import osc_types
+
+from backend.utils.capture import capture, OSC_OUT
+from backend.utils.metrics import metrics
+
+
+class OscSender:
+    """
+    Bounded, non-blocking OSC output queue drained by one worker thread.
+
+    Policies are chosen per message:
+    - coalesce=True: latest value wins per address (faders, encoders). A newer
+      value replaces the pending one in place, keeping its queue position.
+      With window > 0 an address is sent at most once per window; values
+      arriving inside the window are held back and only the latest one goes
+      out when it closes, so the final position is never lost.
+    - coalesce=False: every message is kept in order (buttons, one-shot events).
+    When the queue is full the oldest pending non-coalesced message is dropped,
+    or the new one if only coalesced values are pending: the pending value of a
+    coalesced address is its final one and is never dropped (their number is
+    bounded by the addresses in use, so they may exceed max_queue).
+
+    With bundle=True, everything the worker dequeues in one wakeup (one
+    processing tick) goes out as OSC bundles packed up to `mtu` bytes instead
+    of one datagram per message. group() collects messages explicitly (a
+    client's snapshot recall) into bundles of their own, with an optional timetag.
+    """
+    RECONNECT_BACKOFF_MIN = 0.05
+    RECONNECT_BACKOFF_MAX = 2.0
+
+    def __init__(self, host, port, max_queue=1024, name='OscSender', bundle=False, mtu=1400):
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.bundle = bundle
+        self.mtu = mtu
+        self.bundles_sent = 0
+        self.logger = logging.getLogger(name)
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # address (coalesced) or (address, seq) -> (address, args, window, stamp)
+        self._delayed = {}  # address -> [due, args, window, stamp], held back by a coalescing window
+        self._last_sent = {}  # address -> monotonic time the last windowed value was dequeued
+        self._seq = 0
+        self._local = threading.local()  # per-thread open group() buffer
+        self._sock = None
+        self._addr = None
+        self._reconnect = True
+        self._retry_at = 0.0
+        self._backoff = self.RECONNECT_BACKOFF_MIN
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def send(self, address, args, coalesce=False, window=0.0, stamp=0):
+        """
+        Enqueue an OSC message and return immediately. stamp: metrics entry
+        stamp of the MIDI input behind it (timed up to the actual send).
+        """
+        group = getattr(self._local, 'group', None)
+        if group is not None:
+            # Inside group(): latest value per address for coalesced controls
+            group[address if coalesce else (address, len(group))] = (address, args, stamp)
+            return
+        with self._cond:
+            if coalesce:
+                key = address
+                if key in self._pending:
+                    self._pending[key] = (address, args, window, stamp)
+                    return
+                delayed = self._delayed.get(address)
+                if delayed is not None:
+                    delayed[1] = args
+                    delayed[3] = stamp
+                    return
+                if window > 0:
+                    due = self._last_sent.get(address, 0.0) + window
+                    if due > time.monotonic():
+                        self._delayed[address] = [due, args, window, stamp]
+                        self._cond.notify()
+                        return
+            else:
+                self._seq += 1
+                key = (address, self._seq)
+            if not self._make_room() and not coalesce:
+                self.dropped += 1
+                return
+            self._pending[key] = (address, args, window, stamp)
+            self._cond.notify()
+
+    @contextmanager
+    def group(self, timetag=None):
+        """
+        Collect the messages sent by this thread inside the block and enqueue
+        them as one unit, sent as bundle(s) even when bundle mode is off.
+        timetag: send time in seconds since the epoch (time.time()), or None
+        for "immediately". Nested groups join the outermost one.
+        """
+        if getattr(self._local, 'group', None) is not None:
+            yield
+            return
+        self._local.group = OrderedDict()
+        try:
+            yield
+            messages = list(self._local.group.values())
+        finally:
+            self._local.group = None
+        if not messages:
+            return
+        with self._cond:
+            self._seq += 1
+            if not self._make_room():
+                self.dropped += len(messages)
+                return
+            self._pending[(None, self._seq)] = (None, (messages, timetag), 0.0, 0)
+            self._cond.notify()
+
+    def _make_room(self):
+        """
+        With the condition held: drop the oldest non-coalesced entry if the queue
+        is full. Returns False if it is full of coalesced values only.
+        """
+        if len(self._pending) < self.max_queue:
+            return True
+        for key in self._pending:
+            if isinstance(key, tuple):  # (address, seq) or (None, seq) for a group
+                address, args, _, _ = self._pending.pop(key)
+                self.dropped += 1 if address is not None else len(args[0])
+                return True
+        return False
+
+    def set_target(self, host, port):
+        """Point the sender at a new destination; the worker reconnects in the background."""
+        with self._cond:
+            self.host = host
+            self.port = port
+            self._reconnect = True
+            self._retry_at = 0.0
+            self._backoff = self.RECONNECT_BACKOFF_MIN
+            self._cond.notify()
+
+    def reconnect(self):
+        """Ask the worker to recreate its socket without blocking the caller."""
+        with self._cond:
+            self._reconnect = True
+            self._cond.notify()
+
+    def queue_depth(self):
+        return len(self._pending) + len(self._delayed)
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._close_socket()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._wait_for_batch()
+                if batch is None and not self._running:
+                    return
+            if batch is None:
+                self._connect()
+                continue
+            self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        """Send one dequeued batch: plain messages, tick bundles and explicit groups."""
+        units = []  # (messages, timetag, as_bundle), in queue order
+        loose = []
+        for address, args, stamp in batch:
+            if address is None:
+                if loose:
+                    units.append((loose, None, self.bundle))
+                    loose = []
+                messages, timetag = args
+                units.append((messages, timetag, True))
+            else:
+                loose.append((address, args, stamp))
+        if loose:
+            units.append((loose, None, self.bundle))
+        for i, (messages, timetag, as_bundle) in enumerate(units):
+            if not self._send_messages(messages, timetag, as_bundle):
+                # Socket is unusable: shed the rest of this batch instead of
+                # failing (and logging) once per message.
+                self.dropped += sum(len(m) for m, _, _ in units[i + 1:])
+                break
+
+    def _send_messages(self, messages, timetag, as_bundle):
+        encoded = []
+        for address, args, stamp in messages:
+            dgram = self._encode(address, args)
+            if dgram is not None:
+                encoded.append((address, dgram, stamp))
+        if not as_bundle or (len(encoded) == 1 and timetag is None):
+            for i, (address, dgram, stamp) in enumerate(encoded):
+                if not self._send_dgram(dgram, address):
+                    self.dropped += len(encoded) - i - 1
+                    return False
+                if stamp:
+                    metrics.observe('midi_to_osc', stamp)
+            return True
+        for dgram, stamps in self._pack_bundles(encoded, timetag):
+            if not self._send_dgram(dgram, f"bundle of {len(stamps)}", len(stamps)):
+                return False
+            self.bundles_sent += 1
+            for stamp in stamps:
+                if stamp:
+                    metrics.observe('midi_to_osc', stamp)
+        return True
+
+    def _pack_bundles(self, encoded, timetag):
+        """Yield (bundle datagram, stamps of its messages), each at most mtu bytes where possible."""
+        header = b'#bundle\x00' + osc_types.write_date(osc_types.IMMEDIATELY if timetag is None else timetag)
+        parts = [header]
+        size = len(header)
+        stamps = []
+        for _, dgram, stamp in encoded:
+            element = struct.pack('>i', len(dgram)) + dgram
+            if stamps and size + len(element) > self.mtu:
+                yield b''.join(parts), stamps
+                parts, size, stamps = [header], len(header), []
+            # A single message larger than the MTU still goes out (IP fragments it)
+            parts.append(element)
+            size += len(element)
+            stamps.append(stamp)
+        if stamps:
+            yield b''.join(parts), stamps
+
+    def _wait_for_batch(self):
+        """
+        Block (with the condition held) until messages are ready, then take them.
+        Returns None when the worker should reconnect or stop instead.
+        """
+        while self._running and not self._reconnect:
+            now = time.monotonic()
+            if self._pending:
+                break
+            if self._delayed:
+                timeout = min(d[0] for d in self._delayed.values()) - now
+                if timeout <= 0:
+                    break
+                self._cond.wait(timeout)
+            else:
+                self._cond.wait()
+        if not self._running or self._reconnect:
+            return None
+        batch = []
+        for address, args, window, stamp in self._pending.values():
+            if window > 0:
+                self._last_sent[address] = now
+            batch.append((address, args, stamp))
+        self._pending.clear()
+        if self._delayed:
+            for address, (due, args, window, stamp) in list(self._delayed.items()):
+                if due <= now:
+                    del self._delayed[address]
+                    self._last_sent[address] = now
+                    batch.append((address, args, stamp))
+        return batch
+
+    def _connect(self):
+        with self._cond:
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                # Wait on the condition so stop()/set_target() can cut the backoff short
+                self._cond.wait(delay)
+                if not self._running or time.monotonic() < self._retry_at:
+                    return
+        self._close_socket()
+        try:
+            family, _, _, _, addr = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            self._sock, self._addr = sock, addr
+            with self._cond:
+                self._reconnect = False
+            self.logger.info(f"OSC output ready for {self.host}:{self.port}")
+        except Exception as e:
+            self.logger.error(f"OSC output to {self.host}:{self.port} unavailable: {e}")
+            self._schedule_retry()
+
+    def _schedule_retry(self):
+        with self._cond:
+            self.errors += 1
+            self._reconnect = True
+            self._retry_at = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, self.RECONNECT_BACKOFF_MAX)
+
+    def _encode(self, address, args):
+        try:
+            msg = OscMessageBuilder(address=address)
+            for arg in args:
+                msg.add_arg(arg)
+            return msg.build().dgram
+        except Exception as e:
+            self.errors += 1
+            self.logger.error(f"OSC encode failed: {e} | Address: {address} | Args: {args}")
+            return None
+
+    def _send_dgram(self, dgram, label, count=1):
+        """Send one datagram carrying `count` messages. Returns False if the socket needs reconnecting."""
+        try:
+            self._sock.sendto(dgram, self._addr)
+        except BlockingIOError:
+            # Kernel send buffer full: drop rather than stall the worker
+            self.dropped += count
+            return True
+        except OSError as e:
+            self.logger.error(f"OSC send failed: {e} | Address: {label} | Dest: {self.host}:{self.port}")
+            if e.errno == errno.EMSGSIZE:
+                self.errors += 1
+                return True
+            self._schedule_retry()
+            return False
+        self.sent += count
+        self._backoff = self.RECONNECT_BACKOFF_MIN
+        if capture.active:
+            capture.record(OSC_OUT, dgram)
+        return True
+
+    def _close_socket(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
@@ -5,8 +5,7 @@ Refactored from original xctl_osc.py to fit modular backend structure.
 """
 import logging
 from threading import Lock, Thread
-from pythonosc import osc_server, udp_client, dispatcher
-from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc import osc_server, dispatcher, osc_packet
 import time
 import socket
 import asyncio
@@ -14,19 +13,69 @@ import websockets
 import json
 import os
 import threading  # <-- Added for thread logging
+from contextlib import ExitStack, contextmanager
 
 from backend.utils.config import load_config
+from backend.mapping.routing import compile_osc_routes
+from backend.osc.osc_sender import OscSender
+from backend.utils.metrics import metrics
+from backend.utils.trace import tracer
+from backend.utils.capture import capture, OSC_IN
+
+DEFAULT_TARGET = 'default'  # osc.output_ip/output_port
+
+
+def parse_output_targets(osc_cfg):
+    """
+    {name: (ip, port)} from the osc config: the 'default' target is
+    output_ip/output_port, further named targets come from osc.targets, e.g.
+    targets: {lights: {ip: 10.0.0.5, port: 8000}}.
+    """
+    targets = {}
+    for name, target in (osc_cfg.get("targets") or {}).items():
+        if isinstance(target, dict) and target.get("ip") and target.get("port"):
+            targets[str(name)] = (target["ip"], int(target["port"]))
+    targets[DEFAULT_TARGET] = (osc_cfg.get("output_ip", "127.0.0.1"), osc_cfg.get("output_port", 1200))
+    return targets
+
+
+def persist_osc_settings(settings, config_path):
+    """
+    Write update_settings() keys (osc_output_ip, osc_output_port, osc_input_port,
+    osc_targets) to config.yaml while no XctlOSC is running to apply them.
+    Returns the keys written.
+    """
+    import yaml
+    names = {'osc_output_ip': 'output_ip', 'osc_output_port': 'output_port', 'osc_input_port': 'input_port'}
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    osc_cfg = config.setdefault('osc', {})
+    written = []
+    for key, name in names.items():
+        if key in settings:
+            osc_cfg[name] = settings[key]
+            written.append(key)
+    if 'osc_targets' in settings:
+        osc_cfg['targets'] = {name: t for name, t in (settings['osc_targets'] or {}).items() if name != DEFAULT_TARGET}
+        written.append('osc_targets')
+    if written:
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(config, f)
+    return written
 
 class XctlOSC:
     """
     Main OSC controller class with server and client components.
     Loads configuration from config.yaml.
     """
-    def __init__(self, config_path=None, event_loop=None, broadcast_ws=None, midi_handler=None):
+    def __init__(self, config_path=None, event_loop=None, broadcast_ws=None, midi_handler=None, config=None):
         self.event_loop = event_loop
         self.broadcast_ws = broadcast_ws
         CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.yaml')
-        config = load_config(config_path or CONFIG_PATH)
+        self.config_path = config_path or CONFIG_PATH
+        # An already loaded config (shared AppContext config) avoids re-reading the file
+        if config is None:
+            config = load_config(self.config_path)
         osc_cfg = config["osc"]
         ws_cfg = config.get("websocket", {})
 
@@ -34,6 +83,23 @@ class XctlOSC:
         self.osc_input_port = osc_cfg.get("input_port", 9000)
         self.osc_output_port = osc_cfg.get("output_port", 1200)
         self.osc_output_ip = osc_cfg.get("output_ip", "127.0.0.1")
+        self.send_queue_size = osc_cfg.get("send_queue_size", 1024)
+        # Minimum spacing between coalesced values on one address (mapping entries
+        # can override it with "coalesce_ms")
+        self.coalesce_window = osc_cfg.get("coalesce_window_ms", 5) / 1000.0
+        # One OscSender (own queue, worker and socket) per named output target, so
+        # a slow or unreachable host never delays the others; created on first send
+        self.output_targets = parse_output_targets(osc_cfg)
+        self.senders = {}
+        self._senders_lock = Lock()
+        self._unknown_targets = set()
+        # Pack the messages of one tick (and explicit bundle() groups) into OSC bundles
+        self.bundle_output = osc_cfg.get("bundle", False)
+        self.bundle_mtu = osc_cfg.get("bundle_mtu", 1400)
+        # 'async': UDP socket read on the event loop; 'thread': ThreadingOSCUDPServer
+        self.server_mode = osc_cfg.get("server_mode", "async")
+        self.publish = None  # synchronous broadcast (WebSocketHub.publish) for the async mode
+        self._async_sock = None
 
         self._lock = Lock()
         self._setup_logging(config.get("logging", {}))
@@ -43,6 +109,15 @@ class XctlOSC:
 
         # MIDI handler should be injected from main
         self.midi_handler = midi_handler
+        self.meter_engine = None  # MeterEngine, injected from main; fed by "meter" mappings
+        self.trace_topics = set()  # WebSocket trace topics with subscribers (shared with the hub)
+
+        # OSC address -> OscRoute, compiled from the active mapping file here and
+        # rebuilt off the hot path by invalidate_mapping() whenever that file is rewritten.
+        self.mapping_path = os.path.join(os.path.dirname(__file__), '..', 'mapping', 'active_mapping.json')
+        self._osc_routes_lock = Lock()
+        self._osc_routes_generation = 0
+        self._osc_routes = self._load_osc_routes()
 
 
     def _setup_logging(self, log_cfg):
@@ -59,7 +134,24 @@ class XctlOSC:
         self.logger = logging.getLogger('XctlOSC')
 
     def start_osc_server(self):
-        """Start the OSC UDP server with error handling"""
+        """
+        Start the OSC UDP server with error handling.
+        osc.server_mode 'async' (default) reads the socket on the event loop;
+        'thread' (or no running event loop) uses the threaded pythonosc server,
+        which is also tried if the async bind fails. Raises RuntimeError if the
+        input port cannot be bound either way.
+        """
+        if self.server_mode == 'async' and self.event_loop and self.event_loop.is_running():
+            try:
+                self._run_on_loop(self._start_async_server)
+                self._running = True
+                self.logger.info(f"OSC Server (async) started on port {self.osc_input_port}")
+                return
+            except NotImplementedError:
+                # e.g. Windows proactor loop has no add_reader()
+                self.logger.warning("Event loop cannot watch sockets; falling back to threaded OSC server")
+            except Exception as e:
+                self.logger.error(f"Async server startup failed: {str(e)}; trying the threaded server")
         try:
             self.dispatcher = dispatcher.Dispatcher()
             self.dispatcher.set_default_handler(self._default_handler)
@@ -67,122 +159,245 @@ class XctlOSC:
                 ("127.0.0.1", self.osc_input_port),
                 self.dispatcher
             )
-            self._running = True
-            self.logger.info(f"OSC Server started on port {self.osc_input_port}")
-            self.server_thread = Thread(
-                target=self.server.serve_forever,
-                daemon=True
-            )
-            self.server_thread.start()
         except Exception as e:
             self.logger.error(f"Server startup failed: {str(e)}")
             self._attempt_recovery()
+            raise RuntimeError(f"OSC input port {self.osc_input_port} unavailable: {e}") from e
+        self._running = True
+        self.logger.info(f"OSC Server started on port {self.osc_input_port}")
+        self.server_thread = Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        )
+        self.server_thread.start()
+
+    # --- asyncio server mode ---
+    MAX_DATAGRAMS_PER_WAKEUP = 256  # bound one reader callback so other loop work keeps running
+    MAX_DATAGRAM_SIZE = 65535
+
+    def _start_async_server(self):
+        """(Event loop thread) Bind a non-blocking UDP socket and watch it with add_reader."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            sock.bind(("127.0.0.1", self.osc_input_port))
+            self.event_loop.add_reader(sock.fileno(), self._drain_socket)
+        except BaseException:
+            sock.close()
+            raise
+        self._async_sock = sock
+
+    def _stop_async_server(self):
+        """(Event loop thread) Stop watching and close the socket."""
+        sock, self._async_sock = self._async_sock, None
+        if sock is not None:
+            try:
+                self.event_loop.remove_reader(sock.fileno())
+            finally:
+                sock.close()
+
+    def _drain_socket(self):
+        """Read every queued datagram (up to a bound) and dispatch it straight to the OSC->MIDI path."""
+        sock = self._async_sock
+        if sock is None:
+            return
+        for _ in range(self.MAX_DATAGRAMS_PER_WAKEUP):
+            try:
+                dgram = sock.recv(self.MAX_DATAGRAM_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self.logger.error(f"OSC receive failed: {e}")
+                return
+            stamp = metrics.stamp()
+            try:
+                packet = osc_packet.OscPacket(dgram)
+            except osc_packet.ParseError as e:
+                tracer.warning('osc', 'dropping malformed datagram: %s', e)
+                continue
+            for timed_msg in packet.messages:
+                msg = timed_msg.message
+                try:
+                    self._default_handler(msg.address, *msg.params, stamp=stamp)
+                except Exception as e:
+                    self.logger.error(f"OSC handler failed for {msg.address}: {e}")
+
+    def _run_on_loop(self, fn, timeout=5.0):
+        """Run fn on the event loop thread and wait for it (direct call if already there)."""
+        try:
+            if asyncio.get_running_loop() is self.event_loop:
+                return fn()
+        except RuntimeError:
+            pass
+        async def call():
+            return fn()
+        return asyncio.run_coroutine_threadsafe(call(), self.event_loop).result(timeout)
 
-    def _default_handler(self, address, *args):
+    def _default_handler(self, address, *args, stamp=0):
         """Default handler for incoming OSC messages"""
-        print(f"OSC RECEIVED: {address} {args}")  # Immediate feedback
-        # Broadcast to WebSocket clients (threadsafe)
+        if metrics.enabled:
+            stamp = stamp or metrics.stamp()
+            metrics.count('osc_in', address)
+        if capture.active:
+            capture.record(OSC_IN, (address, args))
+        tracer.debug('osc', 'in %s %s', address, args)
+        # Raw OSC frames only go to WebSocket clients subscribed to 'osc'
+        if 'osc' in self.trace_topics:
+            self._broadcast({
+                'type': 'osc',
+                'address': address,
+                'args': args
+            })
+        # --- OSC to MIDI mapping ---
         try:
-            import asyncio
-            if self.event_loop and self.broadcast_ws:
-                print(f"[DEBUG] Scheduling OSC broadcast on main event loop: {address} {args}")
-                asyncio.run_coroutine_threadsafe(
-                    self.broadcast_ws({
-                        'type': 'osc',
-                        'address': address,
-                        'args': args
-                    }),
-                    self.event_loop
-                )
-            else:
-                self.logger.error("No event loop or broadcast_ws provided for OSC broadcast.")
+            route = self._get_osc_routes().get(address)
+            if route and args and route.msg_type == 'meter':
+                if self.meter_engine:
+                    self.meter_engine.feed(route.channel, args[0], route.number)
+            elif route and args:
+                import mido
+                midi_value = route.to_midi(args[0])
+                if route.msg_type == 'pitchwheel':
+                    midi_msg = None  # motor fader: goes through MidiHandler.send_fader
+                    ui_value = (midi_value + 8192) >> 7
+                elif route.msg_type == 'control_change':
+                    midi_msg = mido.Message('control_change', control=route.number, value=midi_value, channel=route.midi_channel)
+                    ui_value = midi_value
+                else:
+                    midi_type = 'note_on' if midi_value > 0 else 'note_off'
+                    midi_msg = mido.Message(midi_type, note=route.number, velocity=midi_value, channel=route.midi_channel)
+                    ui_value = midi_value == 127
+                tracer.debug('osc', '%s %s -> %s %s', address, args[0], route.msg_type, midi_value)
+                self._broadcast({'type': 'ui_update', 'event': route.event, 'channel': route.channel, 'value': ui_value})
+                if self.midi_handler:
+                    try:
+                        if midi_msg is None:
+                            self.midi_handler.send_fader(route.midi_channel, midi_value, stamp=stamp,
+                                                         surface=route.surface)
+                        else:
+                            self.midi_handler.send(midi_msg, stamp=stamp, surface=route.surface)
+                    except Exception as send_exc:
+                        self.logger.error(f"[OSC->MIDI] Failed to send MIDI via midi_handler: {send_exc}")
+        except Exception as e:
+            self.logger.error(f"OSC to MIDI mapping failed: {e}")
+        if address == "/live/volume":
+            self._handle_volume_control(*args)
+
+    def _broadcast(self, message):
+        if self._async_sock is not None and self.publish:
+            # async server mode: already on the event loop thread
+            self.publish(message)
+            return
+        if not (self.event_loop and self.broadcast_ws):
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.broadcast_ws(message), self.event_loop)
         except Exception as e:
             self.logger.error(f"Failed to broadcast OSC: {e}")
-        with self._lock:
-            self.logger.debug(f"Received OSC: {address} {args}")
-            # --- OSC to MIDI mapping ---
-            try:
-                import json
-                from backend.utils.value_mapping import remap_from_mapping
-                mapping_path = os.path.join(os.path.dirname(__file__), '..', 'mapping', 'active_mapping.json')
-                with open(mapping_path, 'r') as f:
-                    active_mapping = json.load(f)
-                for key, entry in active_mapping.items():
-                    if entry.get('osc') == address:
-                        if 'midi_cc' in entry:
-                            self.logger.info(f"[OSC->MIDI] Mapping OSC {address} value {args[0]} using mapping {entry}")
-                            midi_value = remap_from_mapping(args[0], entry, direction="osc_to_midi")
-                            self.logger.info(f"[OSC->MIDI] Remapped value: {midi_value}")
-                            midi_value = max(0, min(127, int(round(midi_value))))  # Clamp and round
-                            import mido
-                            midi_channel = entry.get('midi_channel', 0)  # 0 = channel 1 for mido
-                            midi_msg = mido.Message('control_change', control=entry['midi_cc'], value=midi_value, channel=midi_channel)
-                            self.logger.info(f"[OSC->MIDI] Sending MIDI: {midi_msg}")
-                            self.logger.info(f"[DEBUG] midi_handler exists: {self.midi_handler is not None}")
-                            if self.midi_handler:
-                                self.logger.info(f"[DEBUG] MIDI send from thread: {threading.current_thread().name}")
-                                try:
-                                    self.midi_handler.send(midi_msg)
-                                except Exception as send_exc:
-                                    self.logger.error(f"[OSC->MIDI] Failed to send MIDI via midi_handler: {send_exc}")
-                        elif 'midi_note' in entry:
-                            self.logger.info(f"[OSC->MIDI] Mapping OSC {address} value {args[0]} using mapping {entry}")
-                            midi_value = remap_from_mapping(args[0], entry, direction="osc_to_midi")
-                            self.logger.info(f"[OSC->MIDI] Remapped value: {midi_value}")
-                            midi_value = max(0, min(127, int(round(midi_value))))  # Clamp and round
-                            import mido
-                            midi_type = 'note_on' if midi_value > 0 else 'note_off'
-                            midi_channel = entry.get('midi_channel', 0)  # 0 = channel 1 for mido
-                            midi_msg = mido.Message(midi_type, note=entry['midi_note'], velocity=midi_value, channel=midi_channel)
-                            self.logger.info(f"[OSC->MIDI] Sending MIDI: {midi_msg}")
-                            self.logger.info(f"[DEBUG] midi_handler exists: {self.midi_handler is not None}")
-                            if self.midi_handler:
-                                self.logger.info(f"[DEBUG] MIDI send from thread: {threading.current_thread().name}")
-                                try:
-                                    self.midi_handler.send(midi_msg)
-                                except Exception as send_exc:
-                                    self.logger.error(f"[OSC->MIDI] Failed to send MIDI via midi_handler: {send_exc}")
-                        break
-            except Exception as e:
-                self.logger.error(f"OSC to MIDI mapping failed: {e}")
-            if address == "/live/volume":
-                self._handle_volume_control(*args)
+
+    def _get_osc_routes(self):
+        return self._osc_routes
+
+    def _load_osc_routes(self):
+        try:
+            with open(self.mapping_path, 'r') as f:
+                return compile_osc_routes(json.load(f))
+        except Exception as e:
+            self.logger.error(f"Could not load OSC mapping {self.mapping_path}: {e}")
+            return {}
+
+    def _rebuild_osc_routes(self, generation):
+        routes = self._load_osc_routes()
+        with self._osc_routes_lock:
+            # Only publish if no later invalidation started a newer rebuild
+            if generation == self._osc_routes_generation:
+                self._osc_routes = routes
+
+    def invalidate_mapping(self):
+        """
+        Recompile the OSC->MIDI index from the mapping file on a worker thread;
+        inbound messages keep using the previous index until the new one is
+        published, so no disk I/O ever happens on the receive path.
+        """
+        with self._osc_routes_lock:
+            self._osc_routes_generation += 1
+            generation = self._osc_routes_generation
+        Thread(target=self._rebuild_osc_routes, args=(generation,), name='OscRoutes', daemon=True).start()
 
     def _handle_volume_control(self, channel, value):
         """Process volume control messages"""
         try:
             if not 0 <= value <= 1.0:
                 raise ValueError("Volume value out of range")
-            self.logger.info(f"Setting volume on channel {channel} to {value}")
+            tracer.info('osc', 'setting volume on channel %s to %s', channel, value)
             # Here you would typically forward to MIDI or other systems
         except Exception as e:
             self.logger.error(f"Volume control error: {str(e)}")
 
-    def send_message(self, address, *args):
-        """Thread-safe OSC message sending with error handling"""
-        with self._lock:
-            try:
-                if not hasattr(self, 'client') or self.client._sock is None:
-                    self._initialize_client()
-                msg = OscMessageBuilder(address=address)
-                for arg in args:
-                    msg.add_arg(arg)
-                self.logger.info(f"[OSC SEND] To {self.osc_output_ip}:{self.osc_output_port} | Address: {address} | Args: {args}")
-                self.client.send(msg.build())
-                self.logger.debug(f"Sent OSC: {address} {args}")
-            except Exception as e:
-                self.logger.error(f"Message send failed: {str(e)} | Address: {address} | Args: {args} | Dest: {self.osc_output_ip}:{self.osc_output_port}")
-                self._attempt_recovery()
-            except Exception as e:
-                self.logger.error(f"Message send failed: {str(e)}")
-                self._attempt_recovery()
+    def send_message(self, address, *args, coalesce=False, window=None, target=None, stamp=0):
+        """
+        Queue an OSC message for the sender thread(s) and return immediately.
+        coalesce=True keeps only the latest value for this address within the
+        coalescing window (seconds; defaults to osc.coalesce_window_ms).
+        target: None for the default target, a target name or a tuple of names.
+        stamp: metrics entry stamp of the MIDI input that caused this message.
+        """
+        if window is None:
+            window = self.coalesce_window
+        if metrics.enabled:
+            metrics.count('osc_out', address)
+        try:
+            if target is None:
+                self._get_sender().send(address, args, coalesce, window, stamp)
+                return
+            for name in ((target,) if isinstance(target, str) else target):
+                sender = self._get_sender(name)
+                if sender is not None:
+                    sender.send(address, args, coalesce, window, stamp)
+        except Exception as e:
+            self.logger.error(f"Message enqueue failed: {str(e)} | Address: {address} | Args: {args}")
+
+    @contextmanager
+    def bundle(self, timetag=None):
+        """
+        Context manager: messages sent by this thread inside the block go out
+        together as OSC bundle(s) per target. timetag is an absolute time.time()
+        value, or None for "immediately". Recalls are driven by the client
+        (WebSocket "osc_bundle"): layer switches send no OSC of their own.
+        """
+        with ExitStack() as stack:
+            for name in list(self.output_targets):
+                sender = self._get_sender(name)
+                if sender is not None:
+                    stack.enter_context(sender.group(timetag))
+            yield
+
+    @property
+    def running(self):
+        """True while the OSC server is receiving."""
+        return self._running
+
+    def target_stats(self):
+        """Destination and queue counters of every configured output target."""
+        stats = {}
+        for name, (ip, port) in self.output_targets.items():
+            sender = self.senders.get(name)
+            stats[name] = {
+                'ip': ip,
+                'port': port,
+                'queued': sender.queue_depth() if sender else 0,
+                'sent': sender.sent if sender else 0,
+                'dropped': sender.dropped if sender else 0,
+                'errors': sender.errors if sender else 0,
+                'bundles': sender.bundles_sent if sender else 0,
+            }
+        return stats
 
     def send_osc_message(self, address, value):
-        """Send OSC message with debug logging"""
+        """Queue a single-value OSC message; returns False if it could not be queued"""
         try:
-            self.logger.info(f"[OSC SEND] To {self.osc_output_ip}:{self.osc_output_port} | Address: {address} | Value: {value}")
-            self.client.send_message(address, value)
-            self.logger.debug(f"Sent OSC: {address} {value}")
+            tracer.debug('osc', 'out %s %s', address, value)
+            self._get_sender().send(address, (value,))
             return True
         except Exception as e:
             self.logger.error(f"Failed to send OSC: {str(e)} | Address: {address} | Value: {value} | Dest: {self.osc_output_ip}:{self.osc_output_port}")
@@ -205,6 +420,14 @@ class XctlOSC:
             if 'osc_input_port' in settings and settings['osc_input_port'] != getattr(self, 'osc_input_port', None):
                 self.osc_input_port = settings['osc_input_port']
                 changed = True
+            named_targets = None
+            if 'osc_targets' in settings:
+                # {name: {"ip": ..., "port": ...}} replaces every named (non-default) target
+                named_targets = {name: t for name, t in (settings['osc_targets'] or {}).items() if name != DEFAULT_TARGET}
+                targets = parse_output_targets({'targets': named_targets, 'output_ip': self.osc_output_ip,
+                                                'output_port': self.osc_output_port})
+                if targets != self.output_targets:
+                    changed = True
             midi_port_name = None
             if 'midi_output_port' in settings:
                 midi_port_name = settings['midi_output_port']
@@ -228,45 +451,90 @@ class XctlOSC:
                     config['osc']['output_ip'] = self.osc_output_ip
                     config['osc']['output_port'] = self.osc_output_port
                     config['osc']['input_port'] = self.osc_input_port
+                    if named_targets is not None:
+                        config['osc']['targets'] = named_targets
                     if midi_changed:
                         config['osc']['midi_output_port'] = settings.get('midi_output_port', config['osc'].get('midi_output_port'))
                     with open(CONFIG_PATH, 'w') as f:
                         yaml.safe_dump(config, f)
                 except Exception as e:
                     self.logger.error(f"Failed to persist OSC settings to config.yaml: {e}")
+                if named_targets is not None:
+                    targets = parse_output_targets({'targets': named_targets})
+                else:
+                    targets = dict(self.output_targets)
+                targets[DEFAULT_TARGET] = (self.osc_output_ip, self.osc_output_port)
+                self.output_targets = targets
                 self._initialize_client()
                 return True
             return False
 
+    def _get_sender(self, name=DEFAULT_TARGET):
+        sender = self.senders.get(name)
+        if sender is None:
+            sender = self._create_sender(name)
+        return sender
+
+    def _create_sender(self, name):
+        with self._senders_lock:
+            sender = self.senders.get(name)
+            if sender is not None:
+                return sender
+            target = self.output_targets.get(name)
+            if target is None:
+                if name not in self._unknown_targets:
+                    self._unknown_targets.add(name)
+                    self.logger.warning(f"Unknown OSC target '{name}', messages for it are dropped")
+                return None
+            ip, port = target
+            self.logger.info(f"Initializing OSC Client '{name}' to {ip}:{port}")
+            sender = OscSender(ip, port, max_queue=self.send_queue_size, name=f'OscSender[{name}]',
+                               bundle=self.bundle_output, mtu=self.bundle_mtu)
+            self.senders[name] = sender
+            return sender
+
     def _initialize_client(self):
+        """Apply output_targets to the running senders: retarget, drop removed ones, create the default."""
         self.logger.info(f"Initializing OSC Client to {self.osc_output_ip}:{self.osc_output_port}")
         try:
-            self.client = udp_client.SimpleUDPClient(self.osc_output_ip, self.osc_output_port)
-            self.logger.info(f"OSC Client connected to {self.osc_output_ip}:{self.osc_output_port}")
+            with self._senders_lock:
+                self._unknown_targets.clear()
+                for name, sender in list(self.senders.items()):
+                    target = self.output_targets.get(name)
+                    if target is None:
+                        del self.senders[name]
+                        sender.stop()
+                    elif (sender.host, sender.port) != target:
+                        sender.set_target(*target)
+            self._get_sender()
         except Exception as e:
             self.logger.error(f"Client initialization failed: {str(e)}")
             raise
 
     def _attempt_recovery(self):
+        # Never sleeps on the caller's thread: the senders reconnect with backoff
         self.logger.warning("Attempting recovery...")
-        time.sleep(1)
-        try:
-            if hasattr(self, 'client'):
-                del self.client
-            self._initialize_client()
-        except Exception:
-            self.logger.error("Recovery failed - manual intervention needed")
+        for sender in list(self.senders.values()):
+            sender.reconnect()
 
     def shutdown(self):
         with self._lock:
             self._running = False
+            if self._async_sock is not None and self.event_loop and not self.event_loop.is_closed():
+                try:
+                    self._run_on_loop(self._stop_async_server)
+                except Exception as e:
+                    self.logger.error(f"Failed to stop async OSC server: {e}")
             if hasattr(self, 'server'):
                 self.server.shutdown()
-            if hasattr(self, 'client'):
-                self.client._sock.close()
-            if hasattr(self, 'ws_server'):
+                self.server.server_close()  # release the UDP port so a restart can bind it again
+            with self._senders_lock:
+                senders, self.senders = list(self.senders.values()), {}
+            for sender in senders:
+                sender.stop()
+            if self.ws_server:
                 self.ws_server.close()
-            if hasattr(self, 'ws_thread'):
+            if self.ws_thread:
                 self.ws_thread.join()
             self.logger.info("OSC services shut down")
 
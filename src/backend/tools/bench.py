@@ -0,0 +1,386 @@
+# bench.py
+"""
+Bridge benchmark: drives MidiHandler and XctlOSC without the physical device.
+
+A simulated X-Touch (in-process mido ports) feeds MIDI into the bridge and
+records what the bridge writes back, and a local UDP sink stands in for the
+OSC peer. Scripted scenarios:
+
+    fader_sweep   8 touch-free faders sweeping (14-bit pitch bend) -> OSC
+    button_storm  mute buttons hammered on/off -> OSC (never coalesced)
+    osc_feedback  OSC fader feedback flood into the bridge -> motor faders
+
+For each scenario it reports message counts and rates in and out, messages
+shed by the bounded queues, the p50/p99 latency from a message entering the
+bridge to its output being handed to the socket / MIDI port (the metrics
+stamps, recorded sample by sample), process CPU (harness threads included)
+and, with --allocations, traced allocation peak and growth. Output is
+coalesced and paced exactly as in production, so "out" is usually lower than
+"in" by design.
+
+Usage (from src/):
+    python -m backend.tools.bench
+    python -m backend.tools.bench --scenario fader_sweep --count 20000 --rate 2000
+    python -m backend.tools.bench --save baseline.json
+    python -m backend.tools.bench --compare baseline.json --tolerance 0.25
+--compare exits with status 1 if a scenario's p99 latency or output rate is
+worse than the baseline by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+
+import mido
+from mido.ports import BaseInput, BaseOutput
+
+from backend.mapping.routing import compile_osc_routes
+from backend.midi.midi_handler import MidiHandler
+from backend.osc.osc_server import XctlOSC
+from backend.utils.metrics import metrics, Histogram
+
+SCENARIOS = ('fader_sweep', 'button_storm', 'osc_feedback')
+MUTE_NOTE_BASE = 16  # mute_1..mute_8 (clear of the rec 1 + rec 8 layer-select chord)
+
+
+def bench_mapping():
+    """Fixed mapping so results don't depend on the user's presets."""
+    mapping = {}
+    for n in range(1, 9):
+        mapping[f'fader_{n}'] = {'midi_pitchbend': True, 'midi_channel': n - 1, 'osc': f'/bench/fader/{n}'}
+        mapping[f'mute_{n}'] = {'midi_note': MUTE_NOTE_BASE + n - 1, 'osc': f'/bench/mute/{n}'}
+    return mapping
+
+
+# --- Simulated X-Touch ---
+class StubInput(BaseInput):
+    """Input port fed by inject(); calls the port callback directly like a backend thread would."""
+
+    def _open(self, **kwargs):
+        self.callback = None
+        self._queue = queue.Queue()
+
+    def inject(self, msg):
+        callback = self.callback
+        if callback is not None:
+            callback(msg)
+        else:
+            self._queue.put(msg)
+
+    def _receive(self, block=True):
+        try:
+            return self._queue.get(timeout=0.05) if block else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class StubOutput(BaseOutput):
+    """Output port that counts what the bridge writes to the device."""
+
+    def _open(self, **kwargs):
+        self.counts = {}
+        self.last_write = 0.0
+
+    def _send(self, msg):
+        self.counts[msg.type] = self.counts.get(msg.type, 0) + 1
+        self.last_write = time.perf_counter()
+
+
+class VirtualXTouch:
+    def __init__(self):
+        self.input = StubInput('XCTL bench in')
+        self.output = StubOutput('XCTL bench out')
+
+    def written(self, msg_type):
+        return self.output.counts.get(msg_type, 0)
+
+
+# --- OSC peer ---
+class UdpSink:
+    """Counts OSC messages (bundle elements included) arriving on a local UDP port."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self.messages = 0
+        self.last_receive = 0.0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='UdpSink', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            try:
+                data = self.sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self.messages += count_osc_messages(data)
+            self.last_receive = time.perf_counter()
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        self.sock.close()
+
+
+def count_osc_messages(data):
+    if not data.startswith(b'#bundle\x00'):
+        return 1
+    count, i = 0, 16
+    while i + 4 <= len(data):
+        size = struct.unpack_from('>i', data, i)[0]
+        count += count_osc_messages(data[i + 4:i + 4 + size])
+        i += 4 + size
+    return count
+
+
+class RecordingHistogram(Histogram):
+    """Histogram that also keeps every sample, for exact percentiles."""
+
+    def reset(self):
+        super().reset()
+        self.samples = []
+
+    def observe(self, ns):
+        super().observe(ns)
+        self.samples.append(ns)
+
+
+def percentile_ms(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e6, 3)
+
+
+def _free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# --- Bridge under test ---
+class Bench:
+    """
+    MidiHandler + XctlOSC wired to a VirtualXTouch and a UdpSink. mapping=None
+    keeps the user's active layer and active_mapping.json (used by replay.py).
+    """
+
+    def __init__(self, input_mode='async', server_mode='async', midi_interval_ms=1.0, bundle=True, mapping=None):
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, name='bench-loop', daemon=True)
+        self._loop_thread.start()
+        self.xtouch = VirtualXTouch()
+        self.sink = UdpSink()
+        self.midi = MidiHandler(None, None, event_loop=self.loop, min_send_interval=midi_interval_ms / 1000.0,
+                                input_mode=input_mode)
+        if mapping is not None:
+            self.midi._set_active_mapping(mapping)
+        self.midi.open(input_port=self.xtouch.input, output_port=self.xtouch.output)
+        self.osc_port = _free_udp_port()
+        config = {'osc': {'input_port': self.osc_port, 'output_ip': '127.0.0.1', 'output_port': self.sink.port,
+                          'server_mode': server_mode, 'bundle': bundle},
+                  'logging': {'level': 'WARNING'}}
+        self.osc = XctlOSC(config=config, event_loop=self.loop, midi_handler=self.midi)
+        if mapping is not None:
+            self.osc._osc_routes = compile_osc_routes(mapping)  # instead of active_mapping.json
+        self.midi.osc = self.osc
+        self.osc.start_osc_server()
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        metrics.always_on = True
+        metrics.enabled = True
+
+    def close(self):
+        self.osc.shutdown()
+        self.midi.close()
+        self.sink.stop()
+        self.client.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._loop_thread.join(timeout=2.0)
+        metrics.always_on = False
+        metrics.enabled = False
+
+    def _dropped(self):
+        """Messages shed by the bounded queues (MIDI inbox, OSC send queues)."""
+        return self.midi.input_dropped + sum(sender.dropped for sender in list(self.osc.senders.values()))
+
+    # --- Scenarios: each injects `count` messages and returns (latency stage, output counter) ---
+    def fader_sweep(self, count, rate):
+        def messages():
+            for i in range(count):
+                channel = i % 8
+                pitch = -8192 + (i // 8 * 64) % 16384
+                yield mido.Message('pitchwheel', channel=channel, pitch=pitch)
+        self._inject_midi(messages(), rate)
+        return 'midi_to_osc', lambda: self.sink.messages
+
+    def button_storm(self, count, rate):
+        def messages():
+            for i in range(count):
+                note = MUTE_NOTE_BASE + (i // 2) % 8
+                yield mido.Message('note_on', note=note, velocity=127 if i % 2 == 0 else 0)
+        self._inject_midi(messages(), rate)
+        return 'midi_to_osc', lambda: self.sink.messages
+
+    def osc_feedback(self, count, rate):
+        from pythonosc.osc_message_builder import OscMessageBuilder
+        dgrams = []
+        for n in range(1, 9):
+            for step in range(64):
+                builder = OscMessageBuilder(address=f'/bench/fader/{n}')
+                builder.add_arg(step / 63.0)
+                dgrams.append(builder.build().dgram)
+        target = ('127.0.0.1', self.osc_port)
+        interval = 1.0 / rate if rate else 0.0
+        start = time.perf_counter()
+        for i in range(count):
+            if interval:
+                wait_until(start + i * interval)
+            self.client.sendto(dgrams[(i % 8) * 64 + (i // 8) % 64], target)
+        return 'osc_to_midi', lambda: self.xtouch.written('pitchwheel')
+
+    def _inject_midi(self, messages, rate):
+        inject = self.xtouch.input.inject
+        interval = 1.0 / rate if rate else 0.0
+        start = time.perf_counter()
+        for i, msg in enumerate(messages):
+            if interval:
+                wait_until(start + i * interval)
+            inject(msg)
+
+    def record_latencies(self):
+        """Keep every latency sample from here on (for exact percentiles)."""
+        for stage in metrics.histograms:
+            metrics.histograms[stage] = RecordingHistogram()
+
+    def run(self, scenario, count, rate, allocations=False, settle=0.3, timeout=30.0):
+        self.record_latencies()
+        out_before = {'midi_to_osc': self.sink.messages, 'osc_to_midi': self.xtouch.written('pitchwheel')}
+        dropped_before = self._dropped()
+        if allocations:
+            tracemalloc.start()
+            blocks_before = sys.getallocatedblocks()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        stage, out_counter = getattr(self, scenario)(count, rate)
+        injected = time.perf_counter()
+        # Wait until the output has been quiet for `settle` seconds
+        last, last_change = out_counter(), time.perf_counter()
+        while time.perf_counter() - last_change < settle and time.perf_counter() - wall_start < timeout:
+            time.sleep(0.01)
+            current = out_counter()
+            if current != last:
+                last, last_change = current, time.perf_counter()
+        last_output = self.sink.last_receive if stage == 'midi_to_osc' else self.xtouch.output.last_write
+        wall_end = max(last_output, injected)
+        cpu = time.process_time() - cpu_start
+        result = {
+            'scenario': scenario,
+            'in': count,
+            'out': out_counter() - out_before[stage],
+            'in_per_s': round(count / max(injected - wall_start, 1e-9)),
+            'out_per_s': round((out_counter() - out_before[stage]) / max(wall_end - wall_start, 1e-9)),
+            'p50_ms': percentile_ms(metrics.histograms[stage].samples, 0.50),
+            'p99_ms': percentile_ms(metrics.histograms[stage].samples, 0.99),
+            'dropped': self._dropped() - dropped_before,
+            'cpu_pct': round(100.0 * cpu / max(time.perf_counter() - wall_start, 1e-9), 1),
+        }
+        if allocations:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result['alloc_peak_kib'] = round(peak / 1024, 1)
+            result['alloc_net_blocks'] = sys.getallocatedblocks() - blocks_before
+        return result
+
+
+def wait_until(deadline):
+    # Sleep rather than spin so the injector doesn't dominate the CPU figure
+    delay = deadline - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def compare(results, baseline, tolerance):
+    """Regressions vs. a saved baseline: p99 latency up or output rate down by more than tolerance."""
+    previous = {r['scenario']: r for r in baseline}
+    failures = []
+    for r in results:
+        base = previous.get(r['scenario'])
+        if not base:
+            continue
+        if base.get('p99_ms') and r.get('p99_ms') and r['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            failures.append(f"{r['scenario']}: p99 {r['p99_ms']} ms vs {base['p99_ms']} ms")
+        if base.get('out_per_s') and r['out_per_s'] < base['out_per_s'] * (1 - tolerance):
+            failures.append(f"{r['scenario']}: {r['out_per_s']} out/s vs {base['out_per_s']} out/s")
+    return failures
+
+
+def print_table(results):
+    columns = ('scenario', 'in', 'out', 'dropped', 'in_per_s', 'out_per_s', 'p50_ms', 'p99_ms', 'cpu_pct',
+               'alloc_peak_kib', 'alloc_net_blocks')
+    columns = [c for c in columns if any(c in r for r in results)]
+    widths = {c: max(len(c), *(len(str(r.get(c, ''))) for r in results)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for r in results:
+        print('  '.join(str(r.get(c, '')).ljust(widths[c]) for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the MIDI <-> OSC bridge against a virtual X-Touch.')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                        help='scenario to run (repeatable; default: all)')
+    parser.add_argument('--count', type=int, default=10000, help='messages per scenario')
+    parser.add_argument('--rate', type=float, default=0, help='input messages per second (0 = as fast as possible)')
+    parser.add_argument('--input-mode', choices=('async', 'thread'), default='async')
+    parser.add_argument('--server-mode', choices=('async', 'thread'), default='async')
+    parser.add_argument('--midi-interval-ms', type=float, default=1.0, help='MIDI output pacing (device limit)')
+    parser.add_argument('--no-bundle', action='store_true', help='one datagram per OSC message')
+    parser.add_argument('--allocations', action='store_true', help='trace allocations (slows the run down)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--save', metavar='FILE', help='write results to FILE as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a saved baseline, exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    bench = Bench(args.input_mode, args.server_mode, args.midi_interval_ms, bundle=not args.no_bundle,
+                  mapping=bench_mapping())
+    try:
+        time.sleep(0.1)  # sender sockets and listener threads up
+        results = [bench.run(s, args.count, args.rate, args.allocations) for s in (args.scenario or SCENARIOS)]
+    finally:
+        bench.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"Baseline {args.compare} not found")
+            return 2
+        with open(args.compare) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# replay.py
+"""
+Replay a session capture (backend/utils/capture.py) through the bridge.
+
+Captured midi_in events go to MidiHandler.handle_message and osc_in events to
+XctlOSC._default_handler, paced by their original timestamps divided by
+--speed (or back to back with --speed max). The bridge runs against the
+bench's stand-ins (virtual X-Touch, local UDP sink), so nothing reaches the
+real device or OSC peer. Captured midi_out / osc_out events are not replayed;
+their counts are printed next to what the replayed bridge produced.
+
+Usage (from src/):
+    python -m backend.tools.replay session.xcap
+    python -m backend.tools.replay session.xcap --speed 4
+    python -m backend.tools.replay session.xcap --speed max --only midi_in
+By default the user's active layer and active_mapping.json are used;
+--bench-mapping replays captures of backend.tools.bench runs.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+import mido
+from pythonosc.osc_message import OscMessage
+
+from backend.tools.bench import Bench, bench_mapping, count_osc_messages, percentile_ms, wait_until
+from backend.utils.capture import KIND_NAMES, MIDI_IN, MIDI_OUT, OSC_IN, OSC_OUT, read_capture
+from backend.utils.metrics import metrics
+
+
+def parse_speed(value):
+    if value == 'max':
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be > 0 or 'max'")
+    return speed
+
+
+def replay(bench, records, speed=1.0, kinds=(MIDI_IN, OSC_IN)):
+    """Feed captured input events into the bridge; returns (replayed per kind, errors)."""
+    replayed = {kind: 0 for kind in kinds}
+    errors = 0
+    if not records:
+        return replayed, errors
+    t0 = records[0][0]
+    start = time.perf_counter()
+    for t_ns, kind, payload, surface in records:
+        if kind not in replayed:
+            continue
+        if speed:
+            wait_until(start + (t_ns - t0) / 1e9 / speed)
+        try:
+            if kind == MIDI_IN:
+                bench.midi.handle_message(mido.Message.from_bytes(payload), surface=surface)
+            else:
+                msg = OscMessage(payload)
+                bench.osc._default_handler(msg.address, *msg.params)
+        except Exception as e:
+            errors += 1
+            logging.getLogger('Replay').debug(f"Replay of {KIND_NAMES[kind]} event failed: {e}")
+            continue
+        replayed[kind] += 1
+    return replayed, errors
+
+
+def captured_outputs(records):
+    """Output counts in the capture, comparable with the replay's (bundles counted per element)."""
+    midi_out = sum(1 for record in records if record[1] == MIDI_OUT)
+    osc_out = sum(count_osc_messages(record[2]) for record in records if record[1] == OSC_OUT)
+    return midi_out, osc_out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a captured MIDI/OSC session through the bridge.')
+    parser.add_argument('file', help='capture file (.xcap)')
+    parser.add_argument('--speed', type=parse_speed, default=1.0, help="playback speed factor, or 'max'")
+    parser.add_argument('--only', choices=('midi_in', 'osc_in'), action='append',
+                        help='replay only this input kind (repeatable; default: both)')
+    parser.add_argument('--bench-mapping', action='store_true', help='use the benchmark mapping')
+    parser.add_argument('--input-mode', choices=('async', 'thread'), default='async')
+    parser.add_argument('--midi-interval-ms', type=float, default=1.0, help='MIDI output pacing (device limit)')
+    parser.add_argument('--settle', type=float, default=0.5, help='seconds to wait for output after the last event')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        started, records = read_capture(args.file)
+    except (OSError, ValueError) as e:
+        print(e)
+        return 2
+    kinds = tuple(KIND_NAMES.index(name) for name in (args.only or ('midi_in', 'osc_in')))
+
+    bench = Bench(args.input_mode, 'async', args.midi_interval_ms,
+                  mapping=bench_mapping() if args.bench_mapping else None)
+    try:
+        time.sleep(0.1)  # sender sockets and listener threads up
+        bench.record_latencies()
+        wall_start = time.perf_counter()
+        replayed, errors = replay(bench, records, args.speed, kinds)
+        elapsed = time.perf_counter() - wall_start
+        time.sleep(args.settle)
+        midi_out = sum(bench.xtouch.output.counts.values())
+        osc_out = bench.sink.messages
+        dropped = bench._dropped()
+    finally:
+        bench.close()
+
+    captured_midi_out, captured_osc_out = captured_outputs(records)
+    report = {
+        'file': args.file,
+        'captured_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started)),
+        'captured_s': round((records[-1][0] - records[0][0]) / 1e9, 3) if records else 0.0,
+        'replayed_s': round(elapsed, 3),
+        'speed': args.speed or 'max',
+        'replayed': {KIND_NAMES[kind]: n for kind, n in replayed.items()},
+        'errors': errors,
+        'dropped': dropped,
+        'midi_out': {'captured': captured_midi_out, 'replayed': midi_out},
+        'osc_out': {'captured': captured_osc_out, 'replayed': osc_out},
+        'latency_ms': {
+            stage: {'p50': percentile_ms(h.samples, 0.50), 'p99': percentile_ms(h.samples, 0.99)}
+            for stage, h in metrics.histograms.items() if stage != 'ws_delivery'
+        },
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:12} {value}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
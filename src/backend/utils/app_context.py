@@ -0,0 +1,315 @@
+# app_context.py
+"""
+Application context for XCTL_ backend.
+Owns the single shared config and builds the heavy objects (MIDI handler, OSC
+server, meter engine, file watchers) lazily and only once, so importing the
+API/WebSocket modules has no side effects. Also records startup timings up to
+the first accepted WebSocket.
+"""
+import logging
+import os
+import threading
+import time
+
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'config.yaml'))
+DEFAULT_FIRST_WS_TARGET_MS = 1000
+
+_IMPORT_TIME = time.perf_counter()  # the backend imports this module first
+
+
+class StartupTimer:
+    """Named milestones, in ms since the backend started importing."""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else _IMPORT_TIME
+        self.marks = []  # (label, seconds since start)
+        self._labels = set()
+
+    def mark(self, label):
+        """Record a milestone the first time it is reached; later calls are ignored."""
+        if label in self._labels:
+            return
+        self._labels.add(label)
+        self.marks.append((label, time.perf_counter() - self.start))
+
+    def elapsed_ms(self, label):
+        for name, t in self.marks:
+            if name == label:
+                return round(t * 1000.0, 1)
+        return None
+
+    def report(self):
+        return [{'step': label, 'ms': round(t * 1000.0, 1)} for label, t in self.marks]
+
+
+class AppContext:
+    """
+    Lazily built, process-wide objects. Properties construct on first access
+    (thread-safe); *_if_built accessors never construct anything.
+    main sets broadcast_ws, publish, ws_hub and trace_topics; BridgeService sets event_loop and
+    drives start_handlers()/stop_handlers().
+    """
+
+    def __init__(self, config_path=CONFIG_PATH):
+        self.config_path = config_path
+        self.logger = logging.getLogger('AppContext')
+        self.timer = StartupTimer()
+        self.event_loop = None
+        self.broadcast_ws = None
+        self.publish = None  # synchronous broadcast for code already on the event loop
+        self.ws_hub = None
+        self.trace_topics = set()
+        self.mapping_watcher = None
+        self.preset_watcher = None
+        self.handlers_started = False
+        self._config = None
+        self._midi = None
+        self._osc = None
+        self._bridge = None
+        self._lock = threading.RLock()
+
+    # --- Config ---
+    @property
+    def config(self):
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    from backend.utils.config import load_config
+                    self._config = load_config(self.config_path)
+                    self.timer.mark('config loaded')
+        return self._config
+
+    def reload_config(self):
+        """Drop the cached config (after it was rewritten on disk) and load it again."""
+        with self._lock:
+            self._config = None
+        return self.config
+
+    @property
+    def first_ws_target_ms(self):
+        return self.config.get('startup', {}).get('first_ws_target_ms', DEFAULT_FIRST_WS_TARGET_MS)
+
+    # --- Heavy objects ---
+    @property
+    def midi(self):
+        if self._midi is None:
+            with self._lock:
+                if self._midi is None:
+                    from backend.midi.midi_handler import MidiHandler
+                    midi_cfg = self.config['midi']
+                    midi = MidiHandler(
+                        midi_cfg.get('input_port'),
+                        midi_cfg.get('output_port'),
+                        event_loop=self.event_loop,
+                        broadcast_ws=self.broadcast_ws,
+                        min_send_interval=midi_cfg.get('min_interval_ms', 1.0) / 1000.0,
+                        input_mode=midi_cfg.get('input_mode', 'thread'),
+                        publish=self.publish,
+                        surfaces=midi_cfg.get('surfaces')
+                    )
+                    midi.trace_topics = self.trace_topics
+                    self._midi = midi
+                    self.timer.mark('midi handler built')
+        return self._midi
+
+    @property
+    def midi_if_built(self):
+        return self._midi
+
+    @property
+    def osc(self):
+        if self._osc is None:
+            with self._lock:
+                if self._osc is None:
+                    from backend.osc.osc_server import XctlOSC
+                    osc = XctlOSC(config_path=self.config_path, config=self.config,
+                                  event_loop=self.event_loop, broadcast_ws=self.broadcast_ws,
+                                  midi_handler=self._midi)
+                    osc.trace_topics = self.trace_topics
+                    osc.publish = self.publish
+                    self._osc = osc
+                    self.timer.mark('osc handler built')
+        return self._osc
+
+    @property
+    def osc_if_built(self):
+        return self._osc
+
+    def start_handlers(self):
+        """
+        Open MIDI, start the watchers, the OSC server and the meter engine (once).
+        A part that fails doesn't stop the others; returns the errors hit (empty
+        list on success).
+        """
+        errors = []
+        with self._lock:
+            if self.handlers_started:
+                return errors
+            self.handlers_started = True
+            from backend.utils.metrics import metrics
+            from backend.utils.trace import tracer
+            metrics.configure(self.config.get('metrics', {}))
+            tracer.configure(self.config.get('trace', {}))
+            if self.config.get('capture', {}).get('autostart'):
+                try:
+                    self.start_capture()
+                except Exception as e:
+                    self.logger.error(f"Could not start capture: {e}")
+            midi = None
+            try:
+                midi = self.midi
+                midi.open()
+                self.timer.mark('midi ports open')
+                self._start_watchers(midi)
+            except Exception as e:
+                self.logger.error(f"MIDI initialization failed: {e}")
+                errors.append(f"MIDI initialization failed: {e}")
+                midi = None
+            try:
+                osc = self.osc
+                osc.midi_handler = midi
+                osc.start_osc_server()
+                self.logger.debug("OSC server started")
+                self.timer.mark('osc server started')
+                if midi:
+                    osc.meter_engine = self._build_meter_engine(midi)
+                    # Ensure MIDI handler can send OSC
+                    midi.osc = osc
+            except Exception as e:
+                self.logger.error(f"OSC initialization failed: {e}")
+                errors.append(f"OSC initialization failed: {e}")
+        return errors
+
+    def _start_watchers(self, midi):
+        from backend.mapping.mapping_watcher import MappingWatcher, DirectoryWatcher
+
+        def on_mapping_change():
+            self.logger.info('Mapping change detected, reloading')
+            midi.reload_mapping()
+            if self._osc:
+                self._osc.invalidate_mapping()
+        self.mapping_watcher = MappingWatcher(midi.mapping_path, on_mapping_change, poll_interval=1.0)
+        self.mapping_watcher.start()
+
+        # --- Watch the preset directory: recompile only the layers that changed ---
+        def on_preset_change(names):
+            self.logger.info(f'Preset files changed: {sorted(names)}')
+            midi.reload_mapping(changed_files=names)
+        layer_cache = midi.layer_cache
+        if layer_cache.packed:
+            # Single-file preset: watch its parent folder for that one file
+            pack_name = os.path.basename(layer_cache.pack_path)
+            watch_dir, name_filter = os.path.dirname(layer_cache.pack_path), (lambda name: name == pack_name)
+        else:
+            watch_dir, name_filter = layer_cache.preset_dir, (lambda name: name.endswith('.json'))
+        self.preset_watcher = DirectoryWatcher(watch_dir, on_preset_change, name_filter=name_filter)
+        self.preset_watcher.start()
+
+    def _build_meter_engine(self, midi):
+        from backend.midi.meter_engine import MeterEngine
+        meter_cfg = self.config.get('meters', {})
+        return MeterEngine(
+            midi.send,
+            event_loop=self.event_loop,
+            broadcast_ws=self.broadcast_ws,
+            refresh_hz=meter_cfg.get('refresh_hz', 30),
+            peak_hold=meter_cfg.get('peak_hold_ms', 500) / 1000.0,
+            decay_db_per_s=meter_cfg.get('decay_db_per_s', 30.0),
+            keepalive=meter_cfg.get('keepalive_ms', 100) / 1000.0,
+            strips=midi.surfaces.strips
+        )
+
+    # --- Startup report ---
+    def mark_first_websocket(self):
+        """Record the first accepted WebSocket and log the startup report once."""
+        if self.timer.elapsed_ms('first websocket accepted') is not None:
+            return
+        self.timer.mark('first websocket accepted')
+        self.log_startup_report()
+
+    def startup_report(self):
+        return {
+            'marks': self.timer.report(),
+            'first_ws_ms': self.timer.elapsed_ms('first websocket accepted'),
+            'first_ws_target_ms': self.first_ws_target_ms,
+        }
+
+    def log_startup_report(self):
+        report = self.startup_report()
+        steps = ', '.join(f"{m['step']} {m['ms']} ms" for m in report['marks'])
+        self.logger.info(f"Startup timing: {steps}")
+        first_ws = report['first_ws_ms']
+        if first_ws is not None and first_ws > report['first_ws_target_ms']:
+            self.logger.warning(f"First WebSocket accepted after {first_ws} ms (target {report['first_ws_target_ms']} ms)")
+
+    def stop_handlers(self):
+        """
+        Stop everything start_handlers() started and forget the handlers, so a
+        later start_handlers() builds fresh ones (e.g. with a reloaded config).
+        """
+        with self._lock:
+            osc, midi = self._osc, self._midi
+            if osc and osc.meter_engine:
+                osc.meter_engine.stop()
+                osc.meter_engine = None
+            if midi:
+                midi.close()
+            if osc:
+                osc.shutdown()
+            for watcher in (self.mapping_watcher, self.preset_watcher):
+                try:
+                    if watcher:
+                        watcher.stop()
+                except Exception as e:
+                    self.logger.error(f"Error stopping watcher: {e}")
+            self.mapping_watcher = self.preset_watcher = None
+            self._osc = self._midi = None
+            self.handlers_started = False
+
+    def shutdown(self):
+        if self._bridge is not None and self._bridge.state != 'stopped':
+            self._bridge.stop_sync()
+        else:
+            self.stop_handlers()
+        from backend.utils.capture import capture
+        capture.stop()
+
+    # --- Session capture ---
+    @property
+    def capture_dir(self):
+        """capture.directory, or 'captures' next to the user's preset folder."""
+        from backend.utils.user_data import get_user_data_dir
+        directory = self.config.get('capture', {}).get('directory')
+        return directory or os.path.join(os.path.dirname(get_user_data_dir()), 'captures')
+
+    def start_capture(self, name=None):
+        """Start capturing to <capture_dir>/<name or timestamp>.xcap; returns the capture status."""
+        from backend.utils.capture import capture, CAPTURE_EXT
+        name = name or time.strftime('capture-%Y%m%d-%H%M%S')
+        path = os.path.join(self.capture_dir, os.path.basename(name) + CAPTURE_EXT)
+        max_mb = self.config.get('capture', {}).get('max_mb')
+        return capture.start(path, max_bytes=int(max_mb * 1024 * 1024) if max_mb else None)
+
+    @property
+    def bridge(self):
+        """The BridgeService that owns the handlers' lifecycle."""
+        if self._bridge is None:
+            with self._lock:
+                if self._bridge is None:
+                    from backend.bridge_service import BridgeService
+                    self._bridge = BridgeService(self)
+        return self._bridge
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_app_context():
+    """The process-wide AppContext (created on first call, cheap)."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = AppContext()
+    return _context
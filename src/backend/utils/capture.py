@@ -0,0 +1,182 @@
+# capture.py
+"""
+Session capture for XCTL_ backend: every inbound/outbound MIDI and OSC event
+with a monotonic timestamp, in a compact binary log that
+backend/tools/replay.py can feed back into the bridge.
+
+File layout (little-endian):
+    header  8s magic b'XCTLCAP\\x01', d wall-clock start (time.time()), Q reserved
+    record  Q ns since capture start, B kind | surface << 4, I payload length, payload
+Payloads are raw MIDI bytes (midi_in / midi_out) or an OSC datagram
+(osc_in: the received message; osc_out: the datagram as sent, possibly a bundle).
+MIDI events also carry the index of the unit (midi.surfaces) they came from
+or went to.
+
+The live path only does `if capture.active:` and, when capturing, one
+perf_counter_ns() and a deque append of the event object. Encoding and file
+I/O happen on a background writer thread.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+CAPTURE_MAGIC = b'XCTLCAP\x01'
+CAPTURE_EXT = '.xcap'
+_HEADER = struct.Struct('<8sdQ')
+_RECORD = struct.Struct('<QBI')
+
+MIDI_IN, MIDI_OUT, OSC_IN, OSC_OUT = range(4)
+KIND_NAMES = ('midi_in', 'midi_out', 'osc_in', 'osc_out')
+
+MAX_PENDING = 65536  # events waiting for the writer before new ones are dropped
+WRITE_INTERVAL = 0.05  # seconds between writer wakeups
+
+
+def _encode(kind, obj):
+    if kind in (MIDI_IN, MIDI_OUT):
+        return bytes(obj.bytes())
+    if kind == OSC_IN:
+        from pythonosc.osc_message_builder import OscMessageBuilder
+        address, args = obj
+        builder = OscMessageBuilder(address=address)
+        for arg in args:
+            builder.add_arg(arg)
+        return builder.build().dgram
+    return bytes(obj)  # OSC_OUT: already a datagram
+
+
+class Capture:
+    """Process-wide capture switch plus its background writer."""
+
+    def __init__(self):
+        self.active = False
+        self.path = None
+        self.events = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.max_bytes = None
+        self.logger = logging.getLogger('Capture')
+        self._pending = deque()
+        self._start_ns = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._file = None
+
+    def record(self, kind, obj, surface=0):
+        """Queue one event (call only when `active`): a mido message, (address, args) or a datagram."""
+        pending = self._pending
+        if len(pending) >= MAX_PENDING:
+            self.dropped += 1
+            return
+        pending.append((time.perf_counter_ns(), kind | surface << 4, obj))
+
+    def start(self, path, max_bytes=None):
+        with self._lock:
+            if self.active:
+                raise RuntimeError(f"Already capturing to {self.path}")
+            if self._thread is not None:
+                self._thread.join()  # writer that stopped at the size limit, closing its file
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(CAPTURE_MAGIC, time.time(), 0))
+            self.path = path
+            self.max_bytes = max_bytes
+            self.events = self.dropped = 0
+            self.bytes_written = _HEADER.size
+            self._pending.clear()
+            self._start_ns = time.perf_counter_ns()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='CaptureWriter', daemon=True)
+            self._thread.start()
+            self.active = True
+        self.logger.info(f"Capturing bridge traffic to {path}")
+        return self.status()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return self.status()
+            self.active = False
+            self._stop_event.set()
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+        self.logger.info(f"Capture stopped: {self.events} events, {self.bytes_written} bytes in {self.path}")
+        return self.status()
+
+    def status(self):
+        return {
+            'active': self.active,
+            'path': self.path,
+            'events': self.events,
+            'dropped': self.dropped,
+            'bytes': self.bytes_written,
+            'pending': len(self._pending),
+        }
+
+    def _run(self):
+        while not self._stop_event.wait(WRITE_INTERVAL):
+            if not self._write_pending():
+                # Size limit reached: stop recording from the writer itself
+                self.active = False
+                self.logger.warning(f"Capture size limit reached ({self.max_bytes} bytes), stopping")
+                self._finish()
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                return
+        self._write_pending()
+        self._finish()
+
+    def _finish(self):
+        """Flush and close the capture file (writer thread, on stop() or at the size limit)."""
+        self._file.flush()
+        self._file.close()
+        self._file = None
+
+    def _write_pending(self):
+        pending = self._pending
+        chunks = []
+        size = 0
+        while pending:
+            t_ns, kind, obj = pending.popleft()
+            try:
+                payload = _encode(kind & 0x0F, obj)
+            except Exception as e:
+                self.logger.debug(f"Skipping unencodable {KIND_NAMES[kind & 0x0F]} event: {e}")
+                continue
+            chunks.append(_RECORD.pack(max(0, t_ns - self._start_ns), kind, len(payload)))
+            chunks.append(payload)
+            size += _RECORD.size + len(payload)
+            self.events += 1
+        if chunks:
+            self._file.write(b''.join(chunks))
+            self.bytes_written += size
+        return self.max_bytes is None or self.bytes_written < self.max_bytes
+
+
+def read_capture(path):
+    """Return (wall-clock start, [(ns since start, kind, payload bytes, surface), ...]) for a capture file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: not a capture file")
+    magic, started, _ = _HEADER.unpack_from(data, 0)
+    if magic != CAPTURE_MAGIC:
+        raise ValueError(f"{path}: not a capture file")
+    records = []
+    offset = _HEADER.size
+    while offset + _RECORD.size <= len(data):
+        t_ns, kind, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > len(data):
+            break  # truncated tail (capture still running or crashed)
+        records.append((t_ns, kind & 0x0F, data[offset:offset + length], kind >> 4))
+        offset += length
+    return started, records
+
+
+capture = Capture()
@@ -0,0 +1,198 @@
+# metrics.py
+"""
+Bridge latency instrumentation for XCTL_ backend.
+
+Three paths are timed from the moment a message enters the bridge:
+    midi_to_osc   MIDI input callback -> OSC datagram handed to the kernel
+    osc_to_midi   OSC datagram read   -> MIDI message written to the port
+    ws_delivery   event published     -> WebSocket frame sent
+Messages are stamped with time.perf_counter_ns() (0 = not stamped) and the
+stamp travels with them through the queues. OSC addresses are counted per
+direction; queue depths are read from the handlers only when scraped.
+
+Recording is off until /api/metrics is first scraped and switches itself off
+again after idle_timeout seconds without a scrape, so while nobody is looking
+the hot paths only test `metrics.enabled`. Counters are updated without locks
+and may lose the odd increment under contention.
+"""
+import bisect
+import threading
+import time
+
+STAGES = ('midi_to_osc', 'osc_to_midi', 'ws_delivery')
+BUCKET_BOUNDS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+DIRECTIONS = ('osc_in', 'osc_out')
+MAX_ADDRESSES = 512  # per direction; further addresses are counted as '_other'
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+now_ns = time.perf_counter_ns
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (nanosecond observations)."""
+
+    def __init__(self, bounds_us=BUCKET_BOUNDS_US):
+        self.bounds_us = tuple(bounds_us)
+        self._bounds_ns = [b * 1000 for b in self.bounds_us]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self._bounds_ns) + 1)  # last bucket = +Inf
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def observe(self, ns):
+        i = bisect.bisect_left(self._bounds_ns, ns)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum_ns += ns
+            if ns > self.max_ns:
+                self.max_ns = ns
+
+    def quantile_ms(self, q):
+        """Upper bound (ms) of the bucket holding the q-quantile; max for the +Inf bucket."""
+        if not self.count:
+            return None
+        max_ms = round(self.max_ns / 1e6, 3)
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                if i < len(self.bounds_us):
+                    return min(self.bounds_us[i] / 1000.0, max_ms)
+                break
+        return max_ms
+
+    def summary(self):
+        count = self.count
+        return {
+            'count': count,
+            'mean_ms': round(self.sum_ns / count / 1e6, 3) if count else None,
+            'p50_ms': self.quantile_ms(0.5),
+            'p95_ms': self.quantile_ms(0.95),
+            'p99_ms': self.quantile_ms(0.99),
+            'max_ms': round(self.max_ns / 1e6, 3) if count else None,
+            'buckets_us': {str(b): n for b, n in zip(self.bounds_us + ('+Inf',), self.counts)},
+        }
+
+
+class Metrics:
+    """Process-wide latency histograms and per-address counters (see module docstring)."""
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.enabled = False
+        self.always_on = False
+        self.idle_timeout = idle_timeout
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.addresses = {direction: {} for direction in DIRECTIONS}
+        self._expires_ns = 0
+        self._last_rates = None  # (monotonic, {direction: {address: count}}) at the previous JSON scrape
+
+    def configure(self, cfg):
+        """Apply the `metrics` config section (always_on, idle_timeout_s)."""
+        self.always_on = bool(cfg.get('always_on', False))
+        self.idle_timeout = float(cfg.get('idle_timeout_s', DEFAULT_IDLE_TIMEOUT))
+        if self.always_on:
+            self.enabled = True
+
+    def stamp(self):
+        """Entry timestamp for a message, or 0 while recording is off."""
+        return now_ns() if self.enabled else 0
+
+    def observe(self, stage, stamp):
+        """Record the time since `stamp` for a stage; stamps of 0 are ignored."""
+        if not stamp:
+            return
+        now = now_ns()
+        self.histograms[stage].observe(now - stamp)
+        if now > self._expires_ns and not self.always_on:
+            self.enabled = False  # nobody scraped for idle_timeout: stop stamping
+
+    def count(self, direction, address):
+        """Count one message on an OSC address. Callers check `enabled` first."""
+        counts = self.addresses[direction]
+        if address in counts:
+            counts[address] += 1
+        elif len(counts) < MAX_ADDRESSES:
+            counts[address] = 1
+        else:
+            counts['_other'] = counts.get('_other', 0) + 1
+
+    def touch(self):
+        """A scrape happened: keep recording for another idle_timeout seconds."""
+        self._expires_ns = now_ns() + int(self.idle_timeout * 1e9)
+        self.enabled = True
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        for counts in self.addresses.values():
+            counts.clear()
+        self._last_rates = None
+
+    # --- Export ---
+    def snapshot(self, gauges=None):
+        """JSON-friendly view. Address rates (Hz) are averaged since the previous snapshot."""
+        mono = time.monotonic()
+        previous = self._last_rates
+        current = {d: dict(c) for d, c in self.addresses.items()}
+        self._last_rates = (mono, current)
+        addresses = {}
+        for direction, counts in current.items():
+            prev_counts = previous[1].get(direction, {}) if previous else {}
+            elapsed = mono - previous[0] if previous else 0.0
+            addresses[direction] = {
+                address: {
+                    'count': n,
+                    'rate_hz': round((n - prev_counts.get(address, 0)) / elapsed, 2) if elapsed > 0 else None,
+                }
+                for address, n in sorted(counts.items())
+            }
+        return {
+            'enabled': self.enabled,
+            'always_on': self.always_on,
+            'stages': {stage: h.summary() for stage, h in self.histograms.items()},
+            'addresses': addresses,
+            'queues': gauges or {},
+        }
+
+    def prometheus(self, gauges=None):
+        """Prometheus text exposition (version 0.0.4)."""
+        lines = [
+            '# HELP xctl_latency_seconds Time from a message entering the bridge to its output.',
+            '# TYPE xctl_latency_seconds histogram',
+        ]
+        for stage, h in self.histograms.items():
+            cumulative = 0
+            for bound, n in zip(h.bounds_us, h.counts):
+                cumulative += n
+                lines.append(f'xctl_latency_seconds_bucket{{stage="{stage}",le="{bound / 1e6:g}"}} {cumulative}')
+            lines.append(f'xctl_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+            lines.append(f'xctl_latency_seconds_sum{{stage="{stage}"}} {h.sum_ns / 1e9:.9f}')
+            lines.append(f'xctl_latency_seconds_count{{stage="{stage}"}} {h.count}')
+        lines.append('# HELP xctl_osc_messages_total OSC messages per address.')
+        lines.append('# TYPE xctl_osc_messages_total counter')
+        for direction, counts in self.addresses.items():
+            for address, n in sorted(dict(counts).items()):  # copy: senders may add addresses meanwhile
+                lines.append(f'xctl_osc_messages_total{{direction="{direction}",address="{_escape(address)}"}} {n}')
+        lines.append('# HELP xctl_queue_depth Messages waiting in a bridge queue.')
+        lines.append('# TYPE xctl_queue_depth gauge')
+        for queue, value in (gauges or {}).items():
+            if isinstance(value, dict):
+                for name, depth in value.items():
+                    lines.append(f'xctl_queue_depth{{queue="{queue}",name="{_escape(name)}"}} {depth}')
+            else:
+                lines.append(f'xctl_queue_depth{{queue="{queue}"}} {value}')
+        lines.append(f'xctl_metrics_enabled {int(self.enabled)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
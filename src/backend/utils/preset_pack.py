@@ -0,0 +1,125 @@
+# preset_pack.py
+"""
+Single-file packed preset container (<name>.xctlpreset).
+
+Layout (little-endian):
+    header   8s magic b'XCTLPK\\x00\\x01', I section count, I reserved
+    table    one (Q offset, I length) entry per section
+    sections section 0: compact JSON list of layer names
+             section i: compact JSON of layer i-1 ({"name": ..., "mappings": {...}})
+
+The file is memory-mapped and only the offset table and layer names are read
+on open; a layer's JSON is decoded on first use. get_preset can splice the raw
+sections into a response without decoding them at all.
+"""
+import json
+import mmap
+import os
+import struct
+
+from backend.utils.preset_store import atomic_write, layer_file, INDEX_FILE
+
+PACK_EXT = ".xctlpreset"
+PACK_MAGIC = b"XCTLPK\x00\x01"
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<QI")
+
+
+def _compact(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def encode_packed(layer_names, layers):
+    """Return the bytes of a packed preset."""
+    sections = [_compact(list(layer_names))] + [_compact(layer) for layer in layers]
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    table = []
+    for data in sections:
+        table.append(_ENTRY.pack(offset, len(data)))
+        offset += len(data)
+    return b"".join([_HEADER.pack(PACK_MAGIC, len(sections), 0)] + table + sections)
+
+
+def write_packed(path, layer_names, layers):
+    atomic_write(path, encode_packed(layer_names, layers))
+
+
+class PackedPreset:
+    """Read-only view of a packed preset file with lazily decoded layers."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"{path}: not a packed preset")
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, count, _ = _HEADER.unpack_from(self._buf, 0)
+            if magic != PACK_MAGIC or count < 1:
+                raise ValueError(f"{path}: not a packed preset")
+            if _HEADER.size + count * _ENTRY.size > size:
+                raise ValueError(f"{path}: truncated section table")
+            self._table = [_ENTRY.unpack_from(self._buf, _HEADER.size + i * _ENTRY.size) for i in range(count)]
+            for offset, length in self._table:
+                if offset + length > size:
+                    raise ValueError(f"{path}: truncated section")
+            self.layer_names = json.loads(self._section(0))
+            if len(self.layer_names) != count - 1:
+                raise ValueError(f"{path}: {len(self.layer_names)} layer names for {count - 1} layers")
+        except BaseException:
+            self._buf.close()
+            raise
+        self._layers = [None] * (count - 1)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def _section(self, i):
+        offset, length = self._table[i]
+        return self._buf[offset:offset + length]
+
+    def raw_layer(self, i):
+        """Compact JSON bytes of layer i (0-based), without decoding."""
+        return self._section(i + 1)
+
+    def layer(self, i):
+        """Decoded layer dict, decoded on first access and then cached."""
+        layer = self._layers[i]
+        if layer is None:
+            layer = self._layers[i] = json.loads(self.raw_layer(i))
+        return layer
+
+    def layer_mappings(self, i):
+        return self.layer(i).get("mappings", {})
+
+    def layers(self):
+        return [self.layer(i) for i in range(len(self))]
+
+    def preset_json(self):
+        """The /api/presets/{name} response body, spliced from the raw sections."""
+        return b'{"layers":[' + b",".join(self.raw_layer(i) for i in range(len(self))) + b"]}"
+
+    def close(self):
+        self._buf.close()
+
+
+def pack_directory(preset_dir, pack_path):
+    """Export a directory preset (layer_index.json + layer_N.json) to a packed file."""
+    with open(os.path.join(preset_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+        layer_names = json.load(f)
+    layers = []
+    for i in range(len(layer_names)):
+        with open(os.path.join(preset_dir, layer_file(i)), "r", encoding="utf-8") as f:
+            layers.append(json.load(f))
+    write_packed(pack_path, layer_names, layers)
+    return len(layers)
+
+
+def read_packed_layers(pack_path):
+    """Decode every layer of a packed file (for import into the directory layout)."""
+    pack = PackedPreset(pack_path)
+    try:
+        return pack.layers()
+    finally:
+        pack.close()
@@ -0,0 +1,247 @@
+# preset_store.py
+"""
+Preset persistence for XCTL_ backend.
+A preset is a folder with layer_index.json (list of layer names) and one
+layer_N.json per layer. Writes go to a temp file that is renamed into place, so
+readers (and the preset watcher) never see a half-written file; only layers
+whose serialized content changed are rewritten. Reads are served from an
+in-memory cache that commits update directly and that is re-validated with a
+stat() per file, so hand edits on disk are still picked up.
+Presets can also live in a single packed file (see preset_pack.py); a
+directory takes precedence over a packed file of the same name.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+
+INDEX_FILE = "layer_index.json"
+
+
+def layer_file(i):
+    """File name of the i-th (0-based) layer."""
+    return f"layer_{i+1}.json"
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _serialize(obj):
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory + rename."""
+    directory = os.path.dirname(path)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PresetNotFound(Exception):
+    pass
+
+
+class PresetStore:
+    """
+    Thread-safe store for the preset folders under root. Methods block on disk
+    I/O and are meant to be called through asyncio.to_thread() from handlers.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.logger = logging.getLogger('PresetStore')
+        self._lock = threading.Lock()
+        self._list_cache = None  # (root stamp, [names])
+        # name -> {"files": {file name: (stamp, bytes)}, "layers": [layer dicts]}
+        self._presets = {}
+        self._packed = {}  # name -> (stamp, response body) for single-file presets
+
+    def list_presets(self):
+        stamp = _file_stamp(self.root)
+        with self._lock:
+            if self._list_cache and self._list_cache[0] == stamp:
+                return list(self._list_cache[1])
+        from backend.utils.preset_pack import PACK_EXT
+        names = set()
+        for f in os.listdir(self.root):
+            if os.path.isdir(os.path.join(self.root, f)):
+                names.add(f)
+            elif f.endswith(PACK_EXT):
+                names.add(f[:-len(PACK_EXT)])
+        names = sorted(names)
+        with self._lock:
+            self._list_cache = (stamp, names)
+        return list(names)
+
+    def get_preset(self, name):
+        """Return {"layers": [...]}; raises PresetNotFound or ValueError (missing layer file)."""
+        preset_dir = self._preset_dir(name)
+        with self._lock:
+            cached = self._presets.get(name)
+            if cached and self._is_current(preset_dir, cached):
+                return {"layers": cached["layers"]}
+            index_path = os.path.join(preset_dir, INDEX_FILE)
+            if not os.path.exists(index_path):
+                self._presets.pop(name, None)
+                raise PresetNotFound(name)
+            files = {}
+            index_data = self._read(index_path)
+            files[INDEX_FILE] = (_file_stamp(index_path), index_data)
+            layers = []
+            for i, _ in enumerate(json.loads(index_data)):
+                path = os.path.join(preset_dir, layer_file(i))
+                if not os.path.exists(path):
+                    raise ValueError(f"Missing layer file: {layer_file(i)}")
+                data = self._read(path)
+                files[layer_file(i)] = (_file_stamp(path), data)
+                layers.append(json.loads(data))
+            self._presets[name] = {"files": files, "layers": layers}
+            return {"layers": layers}
+
+    def get_packed_preset_json(self, name):
+        """
+        Response body for a preset that only exists as a packed file, spliced
+        from its raw layer sections; None if the preset is a directory (or absent).
+        """
+        from backend.utils.preset_pack import PackedPreset
+        if os.path.isdir(self._preset_dir(name)):
+            return None
+        pack_path = self.pack_path(name)
+        stamp = _file_stamp(pack_path)
+        if stamp is None:
+            return None
+        with self._lock:
+            cached = self._packed.get(name)
+            if cached and cached[0] == stamp:
+                return cached[1]
+            pack = PackedPreset(pack_path)
+            try:
+                body = pack.preset_json()
+            finally:
+                pack.close()
+            self._packed[name] = (stamp, body)
+            return body
+
+    def pack_preset(self, name):
+        """Export directory preset `name` to <root>/<name>.xctlpreset; returns the layer count."""
+        from backend.utils.preset_pack import pack_directory
+        preset_dir = self._preset_dir(name)
+        if not os.path.exists(os.path.join(preset_dir, INDEX_FILE)):
+            raise PresetNotFound(name)
+        with self._lock:
+            count = pack_directory(preset_dir, self.pack_path(name))
+            self._packed.pop(name, None)
+            self._list_cache = None
+        return count
+
+    def unpack_preset(self, name):
+        """Import <root>/<name>.xctlpreset into the directory layout; returns the files written."""
+        from backend.utils.preset_pack import read_packed_layers
+        pack_path = self.pack_path(name)
+        if not os.path.isfile(pack_path):
+            raise PresetNotFound(name)
+        return self.save_preset(name, read_packed_layers(pack_path))
+
+    def pack_path(self, name):
+        from backend.utils.preset_pack import PACK_EXT
+        return os.path.join(self.root, name + PACK_EXT)
+
+    def save_preset(self, name, layers):
+        """
+        Commit a preset. Layer files are written before the index so the index
+        rename is the commit point. Returns the list of files actually written.
+        """
+        preset_dir = self._preset_dir(name)
+        os.makedirs(preset_dir, exist_ok=True)
+        layer_names = [layer.get("name", f"Layer {i+1}") for i, layer in enumerate(layers)]
+        wanted = [(layer_file(i), _serialize(layer)) for i, layer in enumerate(layers)]
+        wanted.append((INDEX_FILE, _serialize(layer_names)))
+        written = []
+        with self._lock:
+            cached = self._presets.get(name)
+            known = cached["files"] if cached else {}
+            files = {}
+            for file_name, data in wanted:
+                path = os.path.join(preset_dir, file_name)
+                stamp = _file_stamp(path)
+                previous = known.get(file_name)
+                if previous and previous[0] == stamp:
+                    on_disk = previous[1]
+                elif stamp is not None:
+                    on_disk = self._read(path)
+                else:
+                    on_disk = None
+                if on_disk != data:
+                    atomic_write(path, data)
+                    stamp = _file_stamp(path)
+                    written.append(file_name)
+                files[file_name] = (stamp, data)
+            if written:
+                self._fsync_dir(preset_dir)
+            self._presets[name] = {"files": files, "layers": [json.loads(d) for _, d in wanted[:-1]]}
+            self._list_cache = None
+        self.logger.info(f"Saved preset '{name}': {written or 'no changes'}")
+        return written
+
+    def delete_preset(self, name):
+        preset_dir = self._preset_dir(name)
+        with self._lock:
+            pack_path = self.pack_path(name)
+            if not os.path.isdir(preset_dir) and not os.path.isfile(pack_path):
+                raise PresetNotFound(name)
+            if os.path.isdir(preset_dir):
+                shutil.rmtree(preset_dir)
+            if os.path.isfile(pack_path):
+                os.unlink(pack_path)
+            self._presets.pop(name, None)
+            self._packed.pop(name, None)
+            self._list_cache = None
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._presets.clear()
+                self._packed.clear()
+            else:
+                self._presets.pop(name, None)
+                self._packed.pop(name, None)
+            self._list_cache = None
+
+    def _preset_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _is_current(self, preset_dir, cached):
+        return all(_file_stamp(os.path.join(preset_dir, f)) == stamp for f, (stamp, _) in cached["files"].items())
+
+    @staticmethod
+    def _read(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _fsync_dir(path):
+        # Persist the renames themselves (POSIX only)
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
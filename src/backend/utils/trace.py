@@ -0,0 +1,149 @@
+# trace.py
+"""
+Structured, sampled trace facility for XCTL_ backend's per-message paths.
+
+Call sites pass a %-style format string and its arguments, never a formatted
+string:
+
+    tracer.debug('midi', 'in %s', msg)
+
+An event below its subsystem's level returns after one dict lookup. A kept
+event is stored unformatted in a bounded ring buffer, and formatting only
+happens when the buffer is dumped (/api/trace) or when echo is on. With the
+default levels (WARNING) the bridge does no string formatting per message.
+Below WARNING, a subsystem can be sampled to keep 1 event in N.
+
+Subsystems in use: midi, osc, handshake, layer, scribble.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'off': logging.CRITICAL + 10,
+}
+DEFAULT_CAPACITY = 2048
+
+
+def parse_level(value):
+    """'debug' / 'INFO' / 20 -> logging level number."""
+    if isinstance(value, int):
+        return value
+    try:
+        return LEVELS[str(value).lower()]
+    except KeyError:
+        raise ValueError(f"Unknown trace level: {value}")
+
+
+def level_name(level):
+    for name, number in LEVELS.items():
+        if number == level:
+            return name
+    return str(level)
+
+
+class Tracer:
+    """Per-subsystem levels and sampling in front of a ring buffer of raw events."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, default_level=logging.WARNING):
+        self.default_level = default_level
+        self.levels = {}  # subsystem -> level
+        self.sample = {}  # subsystem -> keep 1 event in N (below WARNING)
+        self.echo = False  # also hand kept events to logging (lazy %-formatting)
+        self.ring = deque(maxlen=capacity)
+        self.dropped = 0  # events evicted from the ring
+        self._sample_counts = {}
+        self._lock = threading.Lock()
+
+    def configure(self, cfg):
+        """Apply the `trace` config section (capacity, default_level, levels, sample, echo)."""
+        with self._lock:
+            capacity = int(cfg.get('capacity', self.ring.maxlen))
+            if capacity != self.ring.maxlen:
+                self.ring = deque(self.ring, maxlen=capacity)
+            self.default_level = parse_level(cfg.get('default_level', 'warning'))
+            self.levels = {name: parse_level(level) for name, level in (cfg.get('levels') or {}).items()}
+            self.sample = {name: max(1, int(n)) for name, n in (cfg.get('sample') or {}).items()}
+            self.echo = bool(cfg.get('echo', False))
+            self._sample_counts = {}
+
+    def enabled(self, subsystem, level=logging.DEBUG):
+        """For call sites that must build something costly before tracing it."""
+        return level >= self.levels.get(subsystem, self.default_level)
+
+    def event(self, subsystem, level, fmt, *args):
+        if level < self.levels.get(subsystem, self.default_level):
+            return
+        if level < logging.WARNING:
+            every = self.sample.get(subsystem)
+            if every:
+                n = self._sample_counts.get(subsystem, 0) + 1
+                self._sample_counts[subsystem] = n
+                if n % every:
+                    return
+        ring = self.ring
+        if len(ring) == ring.maxlen:
+            self.dropped += 1
+        ring.append((time.time(), subsystem, level, fmt, args))
+        if self.echo:
+            logging.getLogger(subsystem).log(level, fmt, *args)
+
+    def debug(self, subsystem, fmt, *args):
+        self.event(subsystem, logging.DEBUG, fmt, *args)
+
+    def info(self, subsystem, fmt, *args):
+        self.event(subsystem, logging.INFO, fmt, *args)
+
+    def warning(self, subsystem, fmt, *args):
+        self.event(subsystem, logging.WARNING, fmt, *args)
+
+    def set_levels(self, levels):
+        """Change subsystem levels at runtime, e.g. {'midi': 'debug', 'osc': 'off'}."""
+        with self._lock:
+            for name, level in levels.items():
+                if name == 'default':
+                    self.default_level = parse_level(level)
+                else:
+                    self.levels[name] = parse_level(level)
+
+    def clear(self):
+        self.ring.clear()
+        self.dropped = 0
+
+    def dump(self, subsystem=None, limit=None):
+        """Format the buffered events (oldest first), optionally filtered and limited to the newest `limit`."""
+        events = list(self.ring)
+        if subsystem:
+            events = [e for e in events if e[1] == subsystem]
+        if limit:
+            events = events[-limit:]
+        return [
+            {'t': t, 'subsystem': name, 'level': level_name(level), 'message': _format(fmt, args)}
+            for t, name, level, fmt, args in events
+        ]
+
+    def status(self):
+        return {
+            'default_level': level_name(self.default_level),
+            'levels': {name: level_name(level) for name, level in self.levels.items()},
+            'sample': dict(self.sample),
+            'echo': self.echo,
+            'capacity': self.ring.maxlen,
+            'buffered': len(self.ring),
+            'dropped': self.dropped,
+        }
+
+
+def _format(fmt, args):
+    try:
+        return fmt % args if args else fmt
+    except (TypeError, ValueError):
+        return f"{fmt} {args!r}"
+
+
+tracer = Tracer()
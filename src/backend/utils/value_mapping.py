@@ -32,3 +32,124 @@ def remap_from_mapping(value, mapping_entry, direction="midi_to_osc"):
     else:
         raise ValueError(f"Unknown direction: {direction}")
     return remap_value(value, in_min, in_max, out_min, out_max)
+
+
+def linear_coefficients(mapping_entry, direction="midi_to_osc", midi_range=(0, 127)):
+    """
+    Return (scale, offset) such that value * scale + offset equals
+    remap_from_mapping(value, mapping_entry, direction). Used to precompute
+    the scaling of compiled routes once per mapping load.
+    midi_range supplies the midi_min/midi_max defaults (e.g. 14-bit pitch bend).
+    """
+    midi_min, midi_max = midi_range
+    if direction == "midi_to_osc":
+        in_min = mapping_entry.get("midi_min", midi_min)
+        in_max = mapping_entry.get("midi_max", midi_max)
+        out_min = mapping_entry.get("osc_min", 0.0)
+        out_max = mapping_entry.get("osc_max", 1.0)
+    elif direction == "osc_to_midi":
+        in_min = mapping_entry.get("osc_min", 0.0)
+        in_max = mapping_entry.get("osc_max", 1.0)
+        out_min = mapping_entry.get("midi_min", midi_min)
+        out_max = mapping_entry.get("midi_max", midi_max)
+    else:
+        raise ValueError(f"Unknown direction: {direction}")
+    if in_max == in_min:
+        return 0.0, float(out_min)
+    scale = (out_max - out_min) / float(in_max - in_min)
+    return scale, out_min - in_min * scale
+
+
+# --- Compiled mappers (hot path) ---
+
+DB_UNITY_POSITION = 0.75  # fader travel (0..1) where a 'db' curve reaches 0 dB
+DB_TAPER_EXPONENT = 3.0   # gain ~ position**3 below unity (60 dB per decade of travel)
+
+
+def _curve_function(curve, osc_min, osc_max, unity=DB_UNITY_POSITION):
+    """
+    Return f(n) mapping normalized control travel n (0..1) to an OSC value.
+    - 'linear': straight line from osc_min to osc_max
+    - 'log': exponential sweep for same-sign ranges (e.g. 20..20000 Hz)
+    - 'db': audio fader taper for dB ranges spanning 0 (e.g. -128..10): cubic
+      gain law below the unity position, linear in dB above it
+    Unsupported combinations fall back to 'linear'.
+    """
+    import math
+    span = osc_max - osc_min
+    if curve == 'log' and osc_min and osc_max and (osc_min > 0) == (osc_max > 0):
+        ratio = osc_max / osc_min
+        return lambda n: osc_min * ratio ** n
+    if curve == 'db' and min(osc_min, osc_max) < 0 < max(osc_min, osc_max) and 0 < unity < 1:
+        floor, top = min(osc_min, osc_max), max(osc_min, osc_max)
+        slope = 20.0 * DB_TAPER_EXPONENT
+
+        def db_taper(n):
+            if n >= unity:
+                return top * (n - unity) / (1.0 - unity)
+            if n <= 0:
+                return floor
+            return max(floor, slope * math.log10(n / unity))
+        if osc_min < osc_max:
+            return db_taper
+        return lambda n: db_taper(1.0 - n)
+    return lambda n: osc_min + n * span
+
+
+class CompiledMapper:
+    """
+    Precompiled scaling for one mapping entry, built once per mapping load.
+
+    midi_to_osc is a table lookup over every possible MIDI input (128 values,
+    or 16384 for 14-bit pitch bend), so any curve costs the same per message.
+    osc_to_midi uses precomputed slope/offset with clamping and rounding for
+    linear curves, and a binary search of the same table for non-linear ones.
+    """
+    __slots__ = ('lo', 'hi', 'curve', '_table', '_search', '_descending', '_scale', '_offset')
+
+    def __init__(self, mapping_entry, midi_range=(0, 127), midi_to_osc=True):
+        from array import array
+        self.lo, self.hi = midi_range
+        midi_min = mapping_entry.get("midi_min", self.lo)
+        midi_max = mapping_entry.get("midi_max", self.hi)
+        osc_min = mapping_entry.get("osc_min", 0.0)
+        osc_max = mapping_entry.get("osc_max", 1.0)
+        self.curve = mapping_entry.get("curve", "linear") or "linear"
+        self._scale, self._offset = linear_coefficients(mapping_entry, direction="osc_to_midi", midi_range=midi_range)
+        self._table = self._search = None
+        self._descending = osc_max < osc_min
+        if self.curve == 'linear' and not midi_to_osc:
+            return  # osc_to_midi-only mapper: slope/offset is all it needs
+
+        if self.curve == 'linear':
+            # Linear keeps remap_from_mapping's extrapolation outside midi_min..midi_max
+            scale, offset = linear_coefficients(mapping_entry, direction="midi_to_osc", midi_range=midi_range)
+            values = (v * scale + offset for v in range(self.lo, self.hi + 1))
+        else:
+            f = _curve_function(self.curve, osc_min, osc_max, mapping_entry.get("curve_unity", DB_UNITY_POSITION))
+            width = float(midi_max - midi_min) or 1.0
+            values = (f(min(1.0, max(0.0, (v - midi_min) / width))) for v in range(self.lo, self.hi + 1))
+        self._table = array('d', values)
+        if self.curve != 'linear':
+            self._search = array('d', (-x for x in self._table)) if self._descending else self._table
+
+    def to_osc(self, value):
+        """MIDI value -> OSC value (single table lookup)."""
+        lo = self.lo
+        if lo <= value <= self.hi:
+            return self._table[value - lo]
+        return self._table[0 if value < lo else -1]  # out of range: clamp to the nearest end
+
+    def to_midi(self, value):
+        """OSC value -> clamped, rounded MIDI value."""
+        if self._search is None:
+            return max(self.lo, min(self.hi, int(round(value * self._scale + self._offset))))
+        from bisect import bisect_left
+        table = self._search
+        x = -value if self._descending else value
+        i = bisect_left(table, x)
+        if i >= len(table):
+            i = len(table) - 1
+        elif i > 0 and x - table[i - 1] <= table[i] - x:
+            i -= 1
+        return self.lo + i
@@ -0,0 +1,35 @@
+# surface_state.py
+"""
+Server-side model of the control surface (faders, knobs, buttons, meters,
+scribble strips) used to send browsers frame-rate-limited diffs instead of
+one WebSocket frame per MIDI/OSC event.
+Only touched from the event loop thread.
+"""
+
+
+class SurfaceState:
+    """Last known value per (event, channel), plus the set changed since the last diff."""
+
+    def __init__(self):
+        self.values = {}
+        self._dirty = {}
+
+    def update(self, event, channel, value):
+        key = (event, channel)
+        if self.values.get(key, _MISSING) == value:
+            return
+        self.values[key] = value
+        self._dirty[key] = value
+
+    def take_diff(self):
+        """Return the changes since the previous call as a list of control dicts."""
+        if not self._dirty:
+            return None
+        dirty, self._dirty = self._dirty, {}
+        return [{'event': e, 'channel': c, 'value': v} for (e, c), v in dirty.items()]
+
+    def snapshot(self):
+        return [{'event': e, 'channel': c, 'value': v} for (e, c), v in self.values.items()]
+
+
+_MISSING = object()
@@ -0,0 +1,207 @@
+# ws_hub.py
+"""
+WebSocket fan-out for XCTL_ backend.
+Each connected client gets its own bounded outbound queue and writer task, so
+a slow browser only delays itself. Messages are serialized once per broadcast.
+
+Control changes (ui_update) are folded into a SurfaceState model and sent as
+frame-rate-limited 'state_diff' frames, with a 'state_snapshot' on connect.
+Raw 'midi'/'osc' trace frames are only sent to clients that subscribed to them.
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+
+from backend.utils.metrics import metrics
+from backend.websocket.surface_state import SurfaceState
+
+TRACE_TOPICS = ('midi', 'osc')
+
+
+class _Client:
+    """Outbound queue + writer task for one WebSocket connection."""
+
+    def __init__(self, hub, websocket):
+        self.hub = hub
+        self.websocket = websocket
+        # key -> serialized frame. Surface state frames share the 'state' key so
+        # a lagging client gets one up-to-date snapshot instead of a diff backlog;
+        # everything else gets a unique key.
+        self.pending = OrderedDict()
+        self.stamps = {}  # key -> metrics stamp of the oldest event behind the pending frame
+        self.topics = set()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.closed = False
+
+    def enqueue(self, key, data, stamp=0):
+        if stamp and key not in self.stamps:
+            self.stamps[key] = stamp
+        if key in self.pending:
+            self.pending[key] = data
+            return True
+        if len(self.pending) >= self.hub.max_lag:
+            self.stamps.pop(key, None)
+            return False
+        self.pending[key] = data
+        self.wakeup.set()
+        return True
+
+    async def run(self):
+        try:
+            while not self.closed:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending:
+                    key, data = self.pending.popitem(last=False)
+                    await self.websocket.send_text(data)
+                    if self.stamps:
+                        metrics.observe('ws_delivery', self.stamps.pop(key, 0))
+        except Exception as e:
+            self.hub.logger.debug(f"WebSocket writer stopped: {e}")
+        finally:
+            self.hub._drop(self)
+
+
+class WebSocketHub:
+    """
+    Broadcast hub: publish() is cheap and non-blocking (must run on the event loop);
+    per-client writer tasks do the actual sends.
+
+    Clients whose backlog exceeds max_lag distinct frames are disconnected.
+    """
+
+    def __init__(self, max_lag=256, state_rate_hz=30):
+        self.max_lag = max_lag
+        self.state_rate_hz = state_rate_hz
+        self.logger = logging.getLogger('WebSocketHub')
+        self.state = SurfaceState()
+        # Topics with at least one subscriber. Producers on other threads check
+        # membership before building trace frames, so keep this the same object.
+        self.trace_topics = set()
+        self._clients = {}
+        self._seq = 0
+        self._flush_task = None
+        self._state_stamp = 0  # metrics stamp of the first surface change since the last flush
+
+    def __len__(self):
+        return len(self._clients)
+
+    def queue_depths(self):
+        """Pending frames per connected client."""
+        return [len(c.pending) for c in self._clients.values()]
+
+    def add(self, websocket):
+        if not self._clients:
+            self.state.take_diff()  # the snapshot below already covers these
+        client = _Client(self, websocket)
+        self._clients[websocket] = client
+        loop = asyncio.get_running_loop()
+        client.task = loop.create_task(client.run())
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_loop())
+        client.enqueue('state', json.dumps({'type': 'state_snapshot', 'controls': self.state.snapshot()}))
+        return client
+
+    def remove(self, websocket):
+        client = self._clients.get(websocket)
+        if client:
+            self._drop(client)
+
+    def subscribe(self, websocket, topics, enabled=True):
+        """Opt a client in to (or out of) raw trace topics such as 'midi' and 'osc'."""
+        client = self._clients.get(websocket)
+        if not client:
+            return
+        topics = {t for t in topics if t in TRACE_TOPICS}
+        if enabled:
+            client.topics |= topics
+        else:
+            client.topics -= topics
+        self._update_trace_topics()
+
+    def publish(self, message):
+        msg_type = message.get('type')
+        if msg_type == 'ui_update':
+            self.state.update(message.get('event'), message.get('channel'), message.get('value'))
+            if not self._state_stamp and metrics.enabled:
+                self._state_stamp = metrics.stamp()
+            return
+        if not self._clients:
+            return
+        if msg_type in TRACE_TOPICS:
+            clients = [c for c in self._clients.values() if msg_type in c.topics]
+            if not clients:
+                return
+        else:
+            clients = list(self._clients.values())
+        data = json.dumps(message)
+        stamp = metrics.stamp()
+        self._seq += 1
+        for client in clients:
+            if not client.enqueue(self._seq, data, stamp):
+                self._drop_lagging(client)
+
+    def send_to(self, websocket, message):
+        """Queue a reply for a single client behind its pending broadcasts."""
+        client = self._clients.get(websocket)
+        if client:
+            self._seq += 1
+            if not client.enqueue(self._seq, json.dumps(message)):
+                self._drop_lagging(client)
+
+    def flush_state(self):
+        """Send accumulated surface changes to every client as one diff frame."""
+        changes = self.state.take_diff()
+        stamp, self._state_stamp = self._state_stamp, 0
+        if not changes or not self._clients:
+            return
+        data = json.dumps({'type': 'state_diff', 'changes': changes})
+        snapshot = None
+        for client in list(self._clients.values()):
+            if 'state' in client.pending:
+                # Previous state frame not sent yet: replace it with a snapshot
+                # so this client catches up in one frame.
+                if snapshot is None:
+                    snapshot = json.dumps({'type': 'state_snapshot', 'controls': self.state.snapshot()})
+                client.pending['state'] = snapshot
+            elif not client.enqueue('state', data, stamp):
+                self._drop_lagging(client)
+
+    async def _flush_loop(self):
+        interval = 1.0 / self.state_rate_hz
+        while self._clients:
+            self.flush_state()
+            await asyncio.sleep(interval)
+
+    def _drop_lagging(self, client):
+        self.logger.warning(f"Dropping lagging WebSocket client ({len(client.pending)} queued frames)")
+        self._drop(client)
+
+    def _drop(self, client):
+        if self._clients.get(client.websocket) is not client:
+            return
+        del self._clients[client.websocket]
+        client.closed = True
+        client.pending.clear()
+        client.stamps.clear()
+        client.wakeup.set()
+        if client.topics:
+            self._update_trace_topics()
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        asyncio.get_running_loop().create_task(self._close(client.websocket))
+
+    def _update_trace_topics(self):
+        active = set()
+        for client in self._clients.values():
+            active |= client.topics
+        self.trace_topics.intersection_update(active)
+        self.trace_topics.update(active)
+
+    async def _close(self, websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
@@ -4,25 +4,23 @@ WebSocket endpoint logic for XCTL_ backend, separated from FastAPI app.
 """
 from fastapi import WebSocket, WebSocketDisconnect, APIRouter
 import json
-from backend.osc.osc_server import XctlOSC
 from backend.mapping.default_mapping import get_osc_mapping
-from backend.utils.config import load_config
-import os
-
-# Load config and instantiate modular XctlOSC (shared instance for OSC communication)
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.yaml')
-config = load_config(CONFIG_PATH)
-osc = XctlOSC(config_path=CONFIG_PATH)
+from backend.utils.app_context import get_app_context
 
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    ctx = get_app_context()
     try:
         while True:
             data = await websocket.receive_text()
             try:
                 msg = json.loads(data)
+                # The bridge's XctlOSC; never built from here, None while the bridge is stopped/restarting
+                osc = ctx.osc_if_built
+                if osc is None and msg.get('type') in ('osc_send', 'ui_event'):
+                    await websocket.send_text(json.dumps({'type': 'error', 'message': 'bridge not running'}))
                 # Example: handle OSC send request from frontend
-                if msg.get('type') == 'osc_send':
+                elif msg.get('type') == 'osc_send':
                     address = msg.get('address')
                     args = msg.get('args', [])
                     osc.send_message(address, *args)
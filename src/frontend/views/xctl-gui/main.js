@@ -101,6 +101,40 @@ if (oscSettingsPanelEl) {
   });
 }
 
+// --- Backend control state -> UI ---
+function applyUiUpdate(data) {
+  const channelIdx = data.channel;
+  const channelEl = document.querySelector(`x-channel[channel="${channelIdx}"]`);
+  if (!channelEl) return;
+  if (data.event === 'fader') {
+    // Update fader value
+    channelEl.value = data.value;
+    const fader = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('x-fader');
+    if (fader) fader.value = data.value;
+  } else if (["mute", "solo", "rec", "select"].includes(data.event)) {
+    // Update button group for all button events
+    const buttonGroup = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('x-button-group');
+    if (buttonGroup) {
+      buttonGroup.state = { [data.event]: data.value };
+    }
+    // Optionally, set a property on the channel for mute
+    if (data.event === 'mute' && 'muted' in channelEl) {
+      channelEl.muted = !!data.value;
+    }
+  } else if (data.event === 'knob') {
+    // Update knob value
+    const knob = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('rotary-knob');
+    if (knob) knob.value = data.value;
+  } else if (data.event === 'scribble') {
+    const strip = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('scribble-strip');
+    if (strip) strip.value = data.value;
+  } else if (data.event === 'meter') {
+    // 0..1, already peak-held and decayed by the backend meter engine
+    if (typeof channelEl.setVuLevel === 'function') channelEl.setVuLevel(data.value);
+  }
+  // Add more event types as needed
+}
+
 // --- Dynamic WebSocket logic ---
 function getWebSocketURLs() {
   let wsPort = window.location.port || 8000; // Use the port the frontend was loaded from
@@ -150,7 +184,6 @@ function connectWebSocket(urls = getWebSocketURLs(), attempt = 0) {
   };
 
   window.xctlSocket.onmessage = (msg) => {
-    console.log("WebSocket MESSAGE", msg.data);
     try {
       const data = JSON.parse(msg.data);
       if (data.type === 'layer_change') {
@@ -230,34 +263,13 @@ function connectWebSocket(urls = getWebSocketURLs(), attempt = 0) {
       }
       // --- End Centralized Mapping ---
 
-      // Legacy UI update for backend-generated ui_update events
-      else if (data.type === 'ui_update') {
-        // Handle mapped UI updates from backend
-        const channelIdx = data.channel;
-        const channelEl = document.querySelector(`x-channel[channel="${channelIdx}"]`);
-        if (channelEl) {
-          if (data.event === 'fader') {
-            // Update fader value
-            channelEl.value = data.value;
-            const fader = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('x-fader');
-            if (fader) fader.value = data.value;
-          } else if (["mute", "solo", "rec", "select"].includes(data.event)) {
-            // Update button group for all button events
-            const buttonGroup = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('x-button-group');
-            if (buttonGroup) {
-              buttonGroup.state = { [data.event]: data.value };
-            }
-            // Optionally, set a property on the channel for mute
-            if (data.event === 'mute' && 'muted' in channelEl) {
-              channelEl.muted = !!data.value;
-            }
-          } else if (data.event === 'knob') {
-            // Update knob value
-            const knob = channelEl.shadowRoot && channelEl.shadowRoot.querySelector('rotary-knob');
-            if (knob) knob.value = data.value;
-          }
-          // Add more event types as needed
-        }
+      // Backend surface state: full snapshot on connect, throttled diffs afterwards
+      else if (data.type === 'state_snapshot') {
+        data.controls.forEach(applyUiUpdate);
+      } else if (data.type === 'state_diff') {
+        data.changes.forEach(applyUiUpdate);
+      } else if (data.type === 'ui_update') {
+        applyUiUpdate(data);
       } else if (data.type === 'midi') {
         console.log('[MIDI]', data.message, data.data);
       } else {
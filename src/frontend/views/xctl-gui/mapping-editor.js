@@ -247,6 +247,8 @@ class MappingEditor extends HTMLElement {
           <th>MIDI Max</th>
           <th>OSC Min</th>
           <th>OSC Max</th>
+          <th>Curve</th>
+          <th>Coalesce ms</th>
           <th>Actions</th>
         </tr>
       </thead>
@@ -261,6 +263,8 @@ class MappingEditor extends HTMLElement {
         <td><input type="number" name="midi_max" value="${entry.midi_max ?? ''}" /></td>
         <td><input type="number" name="osc_min" value="${entry.osc_min ?? ''}" /></td>
         <td><input type="number" name="osc_max" value="${entry.osc_max ?? ''}" /></td>
+        <td><select name="curve">${['linear', 'log', 'db'].map(c => `<option value="${c}"${(entry.curve || 'linear') === c ? ' selected' : ''}>${c}</option>`).join('')}</select></td>
+        <td><input type="number" name="coalesce_ms" min="0" placeholder="default" value="${entry.coalesce_ms ?? ''}" /></td>
         <td><button class="del-mapping">🗑️</button></td>
       </tr>`;
     });
@@ -268,7 +272,7 @@ class MappingEditor extends HTMLElement {
     html += `<button class="add-mapping">Add Mapping</button>`;
     panel.innerHTML = html;
     // Wire up mapping input changes
-    panel.querySelectorAll('input').forEach(input => {
+    panel.querySelectorAll('input, select').forEach(input => {
       input.addEventListener('change', e => {
         const tr = e.target.closest('tr');
         const key = tr.dataset.key;
@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+import pytest
+from mido.ports import BaseOutput
+
+# The backend is imported as `backend.*` from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+class RecordingOutput(BaseOutput):
+    """mido output port that keeps every message sent to it in .sent."""
+
+    def _open(self, **kwargs):
+        self.sent = []
+
+    def _send(self, msg):
+        self.sent.append(msg)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.fixture
+def output():
+    return RecordingOutput('test out')
+
+
+@pytest.fixture
+def wait_for():
+    """Poll predicate() until it is true or timeout seconds have passed; returns its last value."""
+    return _wait_for
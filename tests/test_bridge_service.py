@@ -0,0 +1,74 @@
+import asyncio
+import socket
+
+from backend.bridge_service import BridgeService
+from backend.utils.app_context import StartupTimer
+
+
+class FakeContext:
+    def __init__(self, errors):
+        self.errors = errors
+        self.event_loop = None
+        self.broadcast_ws = None
+        self.midi_if_built = None
+        self.osc_if_built = None
+        self.timer = StartupTimer()
+        self.stopped = 0
+
+    def start_handlers(self):
+        return list(self.errors)
+
+    def stop_handlers(self):
+        self.stopped += 1
+
+
+def test_failed_start_reports_failed_state():
+    bridge = BridgeService(FakeContext(['MIDI initialization failed: no ports']))
+    status = asyncio.run(bridge.start())
+    assert status['state'] == 'failed'
+    assert 'no ports' in status['error']
+
+
+def test_retry_after_failure_stops_leftovers_first():
+    ctx = FakeContext(['OSC initialization failed: address in use'])
+    bridge = BridgeService(ctx)
+
+    async def run():
+        await bridge.start()
+        ctx.errors = []
+        return await bridge.start()
+    status = asyncio.run(run())
+    assert status['state'] == 'running' and status['error'] is None
+    assert ctx.stopped == 1
+
+
+def test_osc_port_in_use_reports_failed(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    from backend.midi.midi_handler import MidiHandler
+    from backend.tools.bench import StubInput, StubOutput
+    from backend.utils.app_context import AppContext
+
+    class StubMidiContext(AppContext):
+        @property
+        def midi(self):
+            if self._midi is None:
+                midi = MidiHandler(None, None, min_send_interval=0.0)
+                open_ports = midi.open
+                midi.open = lambda: open_ports(input_port=StubInput('in'), output_port=StubOutput('out'))
+                self._midi = midi
+            return self._midi
+
+    taken = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    taken.bind(('127.0.0.1', 0))
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(f"osc:\n  input_port: {taken.getsockname()[1]}\n  output_port: 9\n")
+    ctx = StubMidiContext(config_path=str(config_path))
+    bridge = BridgeService(ctx)
+    try:
+        status = asyncio.run(bridge.start())
+    finally:
+        ctx.stop_handlers()
+        taken.close()
+    assert status['state'] == 'failed'
+    assert 'OSC initialization failed' in status['error'] and 'MIDI' not in status['error']
+    assert not status['osc']
@@ -0,0 +1,37 @@
+import mido
+
+from backend.utils.capture import Capture, MIDI_IN, OSC_IN, read_capture
+
+
+def test_round_trip_and_truncated_tail(tmp_path):
+    path = tmp_path / 'session.xcap'
+    capture = Capture()
+    capture.start(str(path))
+    capture.record(MIDI_IN, mido.Message('note_on', channel=0, note=16, velocity=127), 1)
+    capture.record(OSC_IN, ('/ch/1/mix/fader', [0.5]))
+    capture.stop()
+
+    _, records = read_capture(str(path))
+    assert [(kind, surface) for _, kind, _, surface in records] == [(MIDI_IN, 1), (OSC_IN, 0)]
+    assert mido.Message.from_bytes(records[0][2]) == mido.Message('note_on', channel=0, note=16, velocity=127)
+
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])  # writer killed mid-record
+    _, truncated = read_capture(str(path))
+    assert truncated == records[:1]
+
+
+def test_size_limit_closes_the_file_and_allows_a_new_capture(tmp_path, wait_for):
+    capture = Capture()
+    capture.start(str(tmp_path / 'first.xcap'), max_bytes=64)
+    first_file = capture._file
+    for note in range(20):
+        capture.record(MIDI_IN, mido.Message('note_on', note=note))
+    assert wait_for(lambda: capture._thread is None)
+    assert not capture.active and first_file.closed
+    assert len(read_capture(str(tmp_path / 'first.xcap'))[1]) == 20
+
+    capture.start(str(tmp_path / 'second.xcap'))
+    capture.record(MIDI_IN, mido.Message('note_off', note=1))
+    capture.stop()
+    assert len(read_capture(str(tmp_path / 'second.xcap'))[1]) == 1
@@ -0,0 +1,11 @@
+import asyncio
+
+from backend.api import layer_status
+from backend.utils.app_context import AppContext
+
+
+def test_layer_status_does_not_build_a_midi_handler(monkeypatch, tmp_path):
+    ctx = AppContext(config_path=str(tmp_path / 'config.yaml'))
+    monkeypatch.setattr(layer_status, 'get_app_context', lambda: ctx)
+    assert asyncio.run(layer_status.layer_status()) == {"error": "MidiHandler not initialized"}
+    assert ctx.midi_if_built is None
@@ -0,0 +1,40 @@
+from backend.midi.meter_engine import MeterEngine
+
+
+def test_reset_blanks_held_peaks(wait_for):
+    sent = []
+    engine = MeterEngine(lambda msg, surface=0: sent.append(msg.value), refresh_hz=100,
+                         peak_hold=30.0, keepalive=30.0)
+    try:
+        engine.feed(1, 0.0)  # 0 dB: all 8 segments
+        assert wait_for(lambda: sent == [8])
+        engine.reset()
+        # Without the reset the peak would hold for 30 s
+        assert wait_for(lambda: sent == [8, 0])
+    finally:
+        engine.stop()
+
+
+def test_layer_switch_resets_the_meters(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    from backend.midi.midi_handler import MidiHandler
+    from backend.utils.default_preset import create_default_preset
+    from backend.utils.user_data import get_user_data_dir
+    create_default_preset(get_user_data_dir())
+
+    class FakeEngine:
+        resets = 0
+
+        def reset(self):
+            self.resets += 1
+
+    class FakeOsc:
+        meter_engine = FakeEngine()
+
+    midi = MidiHandler(None, None)
+    midi.osc = FakeOsc()
+    try:
+        midi.set_active_layer(list(midi.layers_index)[-1])
+        assert midi.osc.meter_engine.resets == 1
+    finally:
+        midi.close()
@@ -0,0 +1,118 @@
+import mido
+import pytest
+
+from backend.midi.midi_scheduler import (MidiOutScheduler, PRIORITY_BUTTON, PRIORITY_CONTROL, PRIORITY_METER,
+                                         PRIORITY_SYSTEM, classify)
+
+
+@pytest.fixture
+def scheduler(output):
+    scheduler = MidiOutScheduler(output, min_interval=0.0)
+    yield scheduler
+    scheduler.stop()
+
+
+def test_classify_targets_and_priorities():
+    assert classify(mido.Message('note_on', channel=0, note=16)) == (('note', 0, 16), PRIORITY_BUTTON)
+    assert classify(mido.Message('note_off', channel=0, note=16)) == (('note', 0, 16), PRIORITY_BUTTON)
+    assert classify(mido.Message('control_change', channel=1, control=48)) == (('cc', 1, 48), PRIORITY_CONTROL)
+    assert classify(mido.Message('pitchwheel', channel=7)) == (('pitch', 7), PRIORITY_CONTROL)
+    assert classify(mido.Message('aftertouch', channel=0, value=0x35)) == (('meter', 0, 3), PRIORITY_METER)
+    scribble = mido.Message('sysex', data=[0x00, 0x20, 0x32, 0x15, 0x4C, 2, 0x41, 0x42])
+    assert classify(scribble) == (('scribble', 2), PRIORITY_CONTROL)
+    assert classify(mido.Message('sysex', data=[0x00, 0x00, 0x66, 0x14, 0x00])) == (None, PRIORITY_SYSTEM)
+
+
+def test_pending_updates_to_one_target_merge(scheduler, output, wait_for):
+    # Holding the condition keeps the writer from draining while updates queue up
+    with scheduler._cond:
+        for pitch in (-4000, 0, 4000):
+            scheduler.submit(mido.Message('pitchwheel', channel=0, pitch=pitch))
+        scheduler.submit(mido.Message('aftertouch', channel=0, value=0x05))
+        scheduler.submit(mido.Message('note_on', note=16, velocity=127))
+    assert scheduler.merged == 2
+    assert wait_for(lambda: len(output.sent) == 3)
+    # Buttons first, meters last; the fader only gets its latest position
+    assert [m.type for m in output.sent] == ['note_on', 'pitchwheel', 'aftertouch']
+    assert output.sent[1].pitch == 4000
+
+
+def test_reverted_update_is_skipped_but_meters_always_go_out(scheduler, output, wait_for):
+    scheduler.submit(mido.Message('note_on', note=16, velocity=0))
+    scheduler.submit(mido.Message('aftertouch', channel=0, value=0x05))
+    assert wait_for(lambda: len(output.sent) == 2)
+    with scheduler._cond:
+        scheduler.submit(mido.Message('note_on', note=16, velocity=127))
+        scheduler.submit(mido.Message('note_on', note=16, velocity=0))  # back to what the LED shows
+    scheduler.submit(mido.Message('aftertouch', channel=0, value=0x05))
+    assert wait_for(lambda: len(output.sent) == 3)
+    assert output.sent[2].type == 'aftertouch'
+    assert scheduler.skipped == 1
+
+
+def test_same_value_is_skipped_until_invalidated(scheduler, output, wait_for):
+    scheduler.submit(mido.Message('pitchwheel', channel=0, pitch=0))
+    assert wait_for(lambda: len(output.sent) == 1)
+    scheduler.submit(mido.Message('pitchwheel', channel=0, pitch=0))
+    assert scheduler.skipped == 1
+    scheduler.invalidate(('pitch', 0))
+    scheduler.submit(mido.Message('pitchwheel', channel=0, pitch=0))
+    assert wait_for(lambda: len(output.sent) == 2)
+
+
+def test_invalidation_during_a_send_is_not_undone(output, wait_for):
+    scheduler = MidiOutScheduler(output, min_interval=0.0)
+    real_send = output._send
+
+    def send_then_reconnect(msg):
+        real_send(msg)
+        scheduler.invalidate()  # handshake reply lands between dequeue and shadow update
+    output._send = send_then_reconnect
+    try:
+        scheduler.submit(mido.Message('note_on', note=16, velocity=127))
+        assert wait_for(lambda: scheduler.sent == 1)
+        output._send = real_send
+        scheduler.submit(mido.Message('note_on', note=16, velocity=127))
+        assert wait_for(lambda: len(output.sent) == 2)
+    finally:
+        scheduler.stop()
+
+
+def test_user_moved_fader_then_host_writes_old_value(tmp_path, monkeypatch, wait_for):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    from backend.midi.midi_handler import MidiHandler
+    from backend.tools.bench import StubInput, StubOutput
+
+    midi = MidiHandler(None, None, min_send_interval=0.0)
+    midi.open(input_port=StubInput('in'), output_port=StubOutput('out'))
+    try:
+        out = midi.output_port
+        midi.send_fader(0, 0)
+        assert wait_for(lambda: out.counts.get('pitchwheel') == 1)
+        # The user pulls the fader down by hand, well after the motor write
+        midi._motor_positions.clear()
+        midi.handle_message(mido.Message('pitchwheel', channel=0, pitch=-6000))
+        # The host sends the old position back: the motor must move again
+        midi.send_fader(0, 0)
+        assert wait_for(lambda: out.counts.get('pitchwheel') == 2)
+    finally:
+        midi.close()
+
+
+def test_handshake_reply_invalidates_the_unit(tmp_path, monkeypatch, wait_for):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    from backend.midi.midi_handler import MidiHandler
+    from backend.tools.bench import StubInput, StubOutput
+
+    midi = MidiHandler(None, None, min_send_interval=0.0)
+    midi.open(input_port=StubInput('in'), output_port=StubOutput('out'))
+    try:
+        note = mido.Message('note_on', note=16, velocity=127)
+        midi.send(note)
+        assert wait_for(lambda: midi.output_port.counts.get('note_on') == 1)
+        # Power cycle: the unit answers the handshake again and shows nothing
+        midi.handle_message(mido.Message('sysex', data=[0x00, 0x00, 0x66, 0x14, 0x01]))
+        midi.send(note)
+        assert wait_for(lambda: midi.output_port.counts.get('note_on') == 2)
+    finally:
+        midi.close()
@@ -0,0 +1,20 @@
+import json
+
+from backend.osc.osc_server import XctlOSC
+
+
+def test_invalidate_rebuilds_the_index_off_the_receive_path(tmp_path, monkeypatch, wait_for):
+    osc = XctlOSC(config={'osc': {'input_port': 0, 'output_port': 9}, 'logging': {'level': 'WARNING'}})
+    mapping_path = tmp_path / 'active_mapping.json'
+    mapping_path.write_text(json.dumps({"fader_1": {"midi_pitchbend": True, "osc": "/ch/1/fader"}}))
+    osc.mapping_path = str(mapping_path)
+    previous = osc._get_osc_routes()
+
+    loads = []
+    real_load = osc._load_osc_routes
+    monkeypatch.setattr(osc, '_load_osc_routes', lambda: (loads.append(1), real_load())[1])
+    osc.invalidate_mapping()
+    # Lookups never load the file themselves: they see the old or the new index
+    assert osc._get_osc_routes() is previous or "/ch/1/fader" in osc._get_osc_routes()
+    assert wait_for(lambda: "/ch/1/fader" in osc._get_osc_routes())
+    assert len(loads) == 1
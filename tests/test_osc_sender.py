@@ -0,0 +1,54 @@
+import socket
+
+from pythonosc.osc_message import OscMessage
+
+from backend.osc.osc_sender import OscSender
+
+
+def receive_all(sock):
+    received = []
+    try:
+        while True:
+            dgram = sock.recv(65536)
+            received.append((OscMessage(dgram).address, OscMessage(dgram).params))
+    except socket.timeout:
+        return received
+
+
+def test_full_queue_keeps_the_final_fader_value():
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(('127.0.0.1', 0))
+    sink.settimeout(0.3)
+    sender = OscSender('127.0.0.1', sink.getsockname()[1], max_queue=4)
+    try:
+        # Holding the condition keeps the worker from draining while the queue fills
+        with sender._cond:
+            sender.send('/ch/1/fader', [0.25], coalesce=True)
+            for i in range(10):
+                sender.send('/button', [i])
+            sender.send('/ch/1/fader', [0.75], coalesce=True)
+            sender.send('/ch/2/fader', [0.5], coalesce=True)
+            for i in range(10):
+                sender.send('/button', [i])
+            assert sender.dropped > 0
+        received = receive_all(sink)
+    finally:
+        sender.stop()
+        sink.close()
+    assert ('/ch/1/fader', [0.75]) in received
+    assert ('/ch/2/fader', [0.5]) in received
+    assert ('/ch/1/fader', [0.25]) not in received
+
+
+def test_full_queue_of_coalesced_values_refuses_new_events():
+    sender = OscSender('127.0.0.1', 9, max_queue=2)
+    try:
+        with sender._cond:
+            sender.send('/ch/1/fader', [0.1], coalesce=True)
+            sender.send('/ch/2/fader', [0.2], coalesce=True)
+            sender.send('/button', [1])
+            sender.send('/ch/3/fader', [0.3], coalesce=True)
+            assert sender.dropped == 1
+            assert list(sender._pending) == ['/ch/1/fader', '/ch/2/fader', '/ch/3/fader']
+    finally:
+        sender.stop()
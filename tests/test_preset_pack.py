@@ -0,0 +1,77 @@
+import json
+import mmap
+import struct
+
+import pytest
+
+from backend.utils import preset_pack
+from backend.utils.preset_pack import PackedPreset, encode_packed, write_packed
+from backend.utils.preset_store import PresetStore
+
+LAYERS = [
+    {"name": "Main", "mappings": {"fader_1": {"midi_pitchbend": True, "osc": "/ch/1/fader"}}},
+    {"name": "FX", "mappings": {"encoder_1": {"midi_cc": 16, "osc": "/fx/1/mix"}}},
+]
+
+
+def test_pack_round_trip(tmp_path):
+    path = tmp_path / "Show.xctlpreset"
+    write_packed(str(path), ["Main", "FX"], LAYERS)
+    pack = PackedPreset(str(path))
+    try:
+        assert pack.layer_names == ["Main", "FX"] and len(pack) == 2
+        assert pack.layer_mappings(1) == LAYERS[1]["mappings"]
+        assert pack.layers() == LAYERS
+        assert json.loads(pack.preset_json()) == {"layers": LAYERS}
+    finally:
+        pack.close()
+
+
+def test_store_pack_and_unpack_match_the_directory_preset(tmp_path):
+    store = PresetStore(str(tmp_path))
+    store.save_preset("Show", LAYERS)
+    assert store.pack_preset("Show") == 2
+    assert store.get_packed_preset_json("Show") is None  # the directory takes precedence
+
+    store.delete_preset("Show")
+    write_packed(store.pack_path("Show"), ["Main", "FX"], LAYERS)
+    assert store.list_presets() == ["Show"]
+    assert json.loads(store.get_packed_preset_json("Show")) == {"layers": LAYERS}
+    store.unpack_preset("Show")
+    assert store.get_preset("Show") == {"layers": LAYERS}
+
+
+@pytest.mark.parametrize('mangle, error', [
+    (lambda data: data[:10], "not a packed preset"),
+    (lambda data: b"NOTAPACK" + data[8:], "not a packed preset"),
+    (lambda data: data[:-5], "truncated section"),
+    (lambda data: data[:8] + struct.pack("<I", 0) + data[12:], "not a packed preset"),
+])
+def test_header_validation(tmp_path, mangle, error):
+    path = tmp_path / "bad.xctlpreset"
+    path.write_bytes(mangle(encode_packed(["Main", "FX"], LAYERS)))
+    with pytest.raises(ValueError, match=error):
+        PackedPreset(str(path))
+
+
+def test_layer_names_must_match_the_section_count(tmp_path):
+    path = tmp_path / "bad.xctlpreset"
+    path.write_bytes(encode_packed(["Main"], LAYERS))
+    with pytest.raises(ValueError, match="1 layer names for 2 layers"):
+        PackedPreset(str(path))
+
+
+def test_oversized_count_is_rejected_and_the_map_closed(tmp_path, monkeypatch):
+    opened = []
+    real_mmap = mmap.mmap
+
+    def tracking_mmap(*args, **kwargs):
+        opened.append(real_mmap(*args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr(preset_pack.mmap, 'mmap', tracking_mmap)
+    path = tmp_path / "bad.xctlpreset"
+    data = encode_packed(["Main", "FX"], LAYERS)
+    path.write_bytes(data[:8] + struct.pack("<I", 1_000_000) + data[12:])
+    with pytest.raises(ValueError, match="truncated section table"):
+        PackedPreset(str(path))
+    assert opened and opened[0].closed
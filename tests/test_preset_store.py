@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+from backend.utils import preset_store
+from backend.utils.preset_store import INDEX_FILE, PresetNotFound, PresetStore
+
+
+def layers(*names):
+    return [{"name": name, "mappings": {"fader_1": {"osc": f"/{name}/fader"}}} for name in names]
+
+
+def test_save_writes_layers_before_the_index(tmp_path, monkeypatch):
+    order = []
+    real_write = preset_store.atomic_write
+    monkeypatch.setattr(preset_store, 'atomic_write', lambda path, data: (order.append(os.path.basename(path)),
+                                                                          real_write(path, data)))
+    store = PresetStore(str(tmp_path))
+    assert store.save_preset("Show", layers("A", "B")) == ["layer_1.json", "layer_2.json", INDEX_FILE]
+    assert order == ["layer_1.json", "layer_2.json", INDEX_FILE]
+    assert json.loads((tmp_path / "Show" / INDEX_FILE).read_text()) == ["A", "B"]
+
+
+def test_only_changed_files_are_rewritten(tmp_path):
+    store = PresetStore(str(tmp_path))
+    store.save_preset("Show", layers("A", "B"))
+    changed = layers("A", "B")
+    changed[1]["mappings"]["fader_1"]["osc"] = "/moved"
+    assert store.save_preset("Show", changed) == ["layer_2.json"]
+    assert store.save_preset("Show", changed) == []
+    assert PresetStore(str(tmp_path)).get_preset("Show") == {"layers": changed}
+
+
+def test_failed_write_keeps_the_previous_preset(tmp_path, monkeypatch):
+    store = PresetStore(str(tmp_path))
+    store.save_preset("Show", layers("A"))
+    real_write = preset_store.atomic_write
+
+    def failing_write(path, data):
+        if path.endswith("layer_2.json"):
+            raise OSError("disk full")
+        real_write(path, data)
+    monkeypatch.setattr(preset_store, 'atomic_write', failing_write)
+    with pytest.raises(OSError):
+        store.save_preset("Show", layers("A", "B"))
+    # The index (commit point) was never reached: readers still see the old preset
+    assert PresetStore(str(tmp_path)).get_preset("Show") == {"layers": layers("A")}
+    assert not [f for f in os.listdir(tmp_path / "Show") if f.endswith(".tmp")]
+
+
+def test_atomic_write_leaves_no_temp_file_on_failure(tmp_path):
+    target = tmp_path / "layer_1.json"
+    target.write_bytes(b"old")
+    with pytest.raises(TypeError):
+        preset_store.atomic_write(str(target), "not bytes")
+    assert target.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["layer_1.json"]
+
+
+def test_hand_edits_are_picked_up(tmp_path):
+    store = PresetStore(str(tmp_path))
+    store.save_preset("Show", layers("A"))
+    store.get_preset("Show")
+    edited = layers("Edited")
+    (tmp_path / "Show" / "layer_1.json").write_text(json.dumps(edited[0]) + "\n")
+    assert store.get_preset("Show") == {"layers": edited}
+    with pytest.raises(PresetNotFound):
+        store.get_preset("Missing")
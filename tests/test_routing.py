@@ -0,0 +1,71 @@
+from backend.mapping.routing import compile_midi_routes, compile_osc_routes
+from backend.utils.value_mapping import remap_from_mapping
+
+
+def test_first_entry_wins_on_duplicate_midi_keys():
+    routes = compile_midi_routes({
+        "button_1": {"midi_note": 16, "midi_channel": 0, "osc": "/first"},
+        "button_2": {"midi_note": 16, "midi_channel": 0, "osc": "/second"},
+    })
+    assert routes[(0, 'note_on', 0, 16)].osc == "/first"
+    assert routes[(0, 'note_off', 0, 16)].osc == "/first"
+
+
+def test_entry_without_channel_answers_on_every_channel():
+    routes = compile_midi_routes({
+        "encoder_1": {"midi_cc": 16, "osc": "/any"},
+        "encoder_2": {"midi_cc": 17, "midi_channel": 3, "osc": "/ch4"},
+    })
+    assert all(routes[(0, 'control_change', ch, 16)].osc == "/any" for ch in range(16))
+    assert [key for key in routes if key[3] == 17] == [(0, 'control_change', 3, 17)]
+
+
+def test_pitchbend_fader_is_keyed_with_number_none():
+    entry = {"midi_pitchbend": True, "midi_channel": 2, "osc": "/ch/3/fader"}
+    routes = compile_midi_routes({"fader_3": entry, "button_9": {"surface": 1, "midi_note": 9, "osc": "/b"}})
+    route = routes[(0, 'pitchwheel', 2, None)]
+    assert (route.event, route.channel) == ('fader', 3)
+    assert route.to_osc(-8192) == 0.0 and route.to_osc(8191) == 1.0
+    assert (1, 'note_on', 5, 9) in routes and (0, 'note_on', 5, 9) not in routes
+
+
+def test_route_scaling_matches_remap_from_mapping():
+    entry = {"midi_cc": 7, "midi_channel": 0, "osc": "/gain", "osc_min": -90.0, "osc_max": 10.0}
+    route = compile_midi_routes({"knob_1": entry})[(0, 'control_change', 0, 7)]
+    for value in range(128):
+        assert abs(route.to_osc(value) - remap_from_mapping(value, entry)) < 1e-9
+
+
+def test_osc_routes_first_wins_and_precedence():
+    routes = compile_osc_routes({
+        "fader_1": {"midi_pitchbend": True, "midi_cc": 70, "osc": "/ch/1/fader"},
+        "fader_1_dup": {"midi_cc": 71, "osc": "/ch/1/fader"},
+        "mute_1": {"midi_cc": 5, "midi_note": 16, "osc": "/ch/1/mute"},
+        "select_1": {"midi_note": 24, "osc": "/ch/1/select"},
+        "meter_1": {"meter": True, "osc": "/ch/1/meter"},
+        "label": {"osc": "/ch/1/name"},
+    })
+    assert (routes["/ch/1/fader"].key, routes["/ch/1/fader"].msg_type) == ("fader_1", 'pitchwheel')
+    assert (routes["/ch/1/mute"].msg_type, routes["/ch/1/mute"].number) == ('control_change', 5)
+    assert (routes["/ch/1/select"].msg_type, routes["/ch/1/select"].number) == ('note', 24)
+    assert (routes["/ch/1/meter"].msg_type, routes["/ch/1/meter"].number) == ('meter', 'db')
+    assert "/ch/1/name" not in routes
+
+
+def test_osc_route_scaling_matches_remap_from_mapping():
+    entry = {"midi_cc": 16, "osc": "/pan", "osc_min": -100.0, "osc_max": 100.0}
+    route = compile_osc_routes({"encoder_1": entry})["/pan"]
+    for osc in (-100.0, -37.3, 0.0, 12.9, 100.0, 150.0):
+        expected = max(0, min(127, int(round(remap_from_mapping(osc, entry, "osc_to_midi")))))
+        assert route.to_midi(osc) == expected
+
+
+def test_editor_default_entry_compiles_no_route():
+    mapping = {
+        "fader_2": {"midi_cc": "", "midi_note": "", "osc": "/ch/2/fader"},
+        "mute_2": {"midi_cc": "", "midi_note": 17, "osc": "/ch/2/mute"},
+    }
+    assert {key[1] for key in compile_midi_routes(mapping)} == {'note_on', 'note_off'}
+    routes = compile_osc_routes(mapping)
+    assert "/ch/2/fader" not in routes
+    assert (routes["/ch/2/mute"].msg_type, routes["/ch/2/mute"].number) == ('note', 17)
@@ -0,0 +1,23 @@
+import mido
+import pytest
+
+from backend.midi import surface_manager
+from backend.midi.surface_manager import Surface
+
+
+def test_failed_input_open_closes_the_output_and_starts_nothing(monkeypatch, output):
+    def no_input(name, **kwargs):
+        raise OSError(f"cannot open {name}")
+    monkeypatch.setattr(surface_manager.mido, 'get_input_names', lambda: ['xtouch in'])
+    monkeypatch.setattr(surface_manager.mido, 'get_output_names', lambda: ['xtouch out'])
+    monkeypatch.setattr(surface_manager.mido, 'open_output', lambda name: output)
+    monkeypatch.setattr(surface_manager.mido, 'open_input', no_input)
+
+    surface = Surface(0, 'xtouch', 'xtouch in', 'xtouch out', handle=lambda *args: None)
+    with pytest.raises(OSError):
+        surface.open()
+    assert output.closed
+    assert not surface.running
+    assert surface.scheduler is None and surface.thread is None
+    surface.send(mido.Message('note_on', note=1))
+    assert output.sent == []
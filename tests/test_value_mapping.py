@@ -0,0 +1,39 @@
+import pytest
+
+from backend.utils.value_mapping import CompiledMapper, remap_from_mapping
+
+ENTRIES = [
+    {},
+    {"osc_min": -90.0, "osc_max": 10.0},
+    {"midi_min": 10, "midi_max": 100, "osc_min": 1.0, "osc_max": 0.0},
+]
+
+
+@pytest.mark.parametrize('entry', ENTRIES)
+def test_linear_mapper_matches_remap_from_mapping(entry):
+    mapper = CompiledMapper(entry)
+    for value in range(128):
+        assert mapper.to_osc(value) == pytest.approx(remap_from_mapping(value, entry, "midi_to_osc"))
+    for i in range(98):
+        # i / 97 steers clear of exact .5 ties, where float error picks the rounding side
+        osc = entry.get("osc_min", 0.0) + i / 97 * (entry.get("osc_max", 1.0) - entry.get("osc_min", 0.0))
+        expected = max(0, min(127, int(round(remap_from_mapping(osc, entry, "osc_to_midi")))))
+        assert mapper.to_midi(osc) == expected
+
+
+def test_to_osc_clamps_out_of_range_input():
+    mapper = CompiledMapper({"osc_min": 0.0, "osc_max": 1.0})
+    assert mapper.to_osc(-1) == mapper.to_osc(0) == 0.0
+    assert mapper.to_osc(-5) == 0.0  # not wrapped around to the top of the table
+    assert mapper.to_osc(128) == mapper.to_osc(127) == 1.0
+
+    pitch = CompiledMapper({}, midi_range=(-8192, 8191))
+    assert pitch.to_osc(-9000) == 0.0 and pitch.to_osc(9000) == 1.0
+
+
+@pytest.mark.parametrize('entry', [{"curve": "db", "osc_min": -128.0, "osc_max": 10.0},
+                                   {"curve": "log", "osc_min": 20.0, "osc_max": 20000.0}])
+def test_curved_mapper_round_trips(entry):
+    mapper = CompiledMapper(entry)
+    for value in range(128):
+        assert mapper.to_midi(mapper.to_osc(value)) == value